@@ -1,7 +1,10 @@
 from .soupNode import SoupNode
+from .compactTree import CompactTree
 from treelib import Tree
 from . import helper
-from .cleanHTML import clean_html
+from .cleanHTML import clean_html, compile_remove_rules, tags_to_remove as default_tags_to_remove
+from .streamCleaner import preclean_stream
+from .structuredData import StructuredPayload, extract_info, find_payloads
 
 from bs4 import Tag
 MEDIA_TAGS = ['img', 'audio', 'video', 'embed', 'source', 'svg']
@@ -10,6 +13,7 @@ class NodeIdentifier:
     def __init__(self):
         self.counter = 1  # Initialize the counter to start from 1
         self.number_csspath_mapping = {}
+        self.tree = None
         
     def get_next_id(self, csspath):
         node_id = self.counter
@@ -18,126 +22,372 @@ class NodeIdentifier:
         return node_id
     
     def get_csspath(self, number):
+        if self.tree is not None:
+            return self.tree.get_csspath(number)
         return self.number_csspath_mapping[number]
+
+    def attach(self, tree):
+        """Answer get_csspath from a CompactTree holding the numbered nodes and drop the mapping."""
+        self.tree = tree
+        self.number_csspath_mapping = {}
     
 class HTMLTree:
-    def __init__(self, soup):
-        self.soup = clean_html(soup)
+    def __init__(self, soup, parser=None, tags_to_remove=None, url=None, boilerplate=None, structured_data=False,
+                 compact=False, keep_soup=True):
+        """
+        :param soup: BeautifulSoup of the page, or its raw HTML (str or bytes).
+        :param parser: Parser backend used while cleaning, see DomBuilder.parserBackend.
+        :param tags_to_remove: Removal rules for clean_html (None means cleanHTML.tags_to_remove),
+            e.g. a RuleProfiles with per-site rules, see DomBuilder.removeRules.
+        :param url: URL of the page, picks the site's rules from a RuleProfiles.
+        :param boilerplate: Optional BoilerplateLearner that strips what the site repeats on every
+            page, see DomBuilder.boilerplate.
+        :param structured_data: True reads the JSON payloads of the page's scripts (JSON-LD,
+            __NEXT_DATA__, ...) into self.structured_data before cleaning drops them; a list is
+            used as is. Off by default, since it parses every script. See DomBuilder.structuredData.
+        :param compact: Keep the tree as a CompactTree, see compact().
+        :param keep_soup: Keep the cleaned BeautifulSoup in self.soup after the tree is built;
+            False releases it, see release_soup().
+        """
+        if structured_data is True:
+            structured_data = find_payloads(soup)
+        self.structured_data = structured_data or []
+        if tags_to_remove is None:
+            tags_to_remove = default_tags_to_remove
+        self.soup = clean_html(soup, tags_to_remove, parser=parser, url=url, boilerplate=boilerplate)
         self.tree = Tree()
         self.node_identifier = NodeIdentifier()
         self.build_tree()
+        if not keep_soup:
+            self.release_soup()
+        if compact:
+            self.compact()
+
+    @classmethod
+    def from_html(cls, html, parser=None, tags_to_remove=None, url=None, boilerplate=None, structured_data=False,
+                  compact=False, keep_soup=True):
+        """
+        Build the tree straight from raw HTML (str or bytes).
+
+        The page is parsed exactly once, inside clean_html, instead of being parsed by the
+        fetcher, serialized again and reparsed.
+        """
+        return cls(html, parser=parser, tags_to_remove=tags_to_remove, url=url, boilerplate=boilerplate,
+                   structured_data=structured_data, compact=compact, keep_soup=keep_soup)
+
+    @classmethod
+    def from_stream(cls, chunks, parser=None, max_output_chars=None, tags_to_remove=None, url=None,
+                    boilerplate=None, structured_data=False, compact=False, keep_soup=True):
+        """
+        Build the tree from a page arriving in chunks (bytes or str), e.g. response.iter_content().
+
+        Styles, scripts without HTML and the other tags clean_html removes are dropped while the
+        page streams in (see DomBuilder.streamCleaner), so very large pages never reach the
+        parser in full.
+
+        :param max_output_chars: Ignore the rest of the page once this much HTML was kept.
+        :param structured_data: Collect the JSON payloads of the scripts while they stream past.
+        """
+        if tags_to_remove is None:
+            tags_to_remove = default_tags_to_remove
+        rules = compile_remove_rules(tags_to_remove, url)
+        payloads = [] if structured_data else None
+        html = preclean_stream(chunks, rules, max_output_chars=max_output_chars, payloads=payloads)
+        return cls(html, parser=parser, tags_to_remove=rules, url=url, boilerplate=boilerplate,
+                   structured_data=payloads, compact=compact, keep_soup=keep_soup)
+
+    def compact(self):
+        """
+        Replace self.tree by a CompactTree (see DomBuilder.compactTree) holding the same nodes.
+
+        The compact tree takes a fraction of the memory of the treelib one and answers the
+        read-only treelib methods, show_tree, print_tree, get_string_tree and traverse_up, but it
+        cannot be edited (e.g. by the Pruner). The indexes used while building are released too.
+        """
+        if not isinstance(self.tree, CompactTree):
+            self.tree = CompactTree.from_tree(self.tree, self.node_identifier.number_csspath_mapping)
+            self.node_identifier.attach(self.tree)
+            self._release_indexes()
+        return self
+
+    def to_bytes(self):
+        """
+        The built tree in the binary format of DomBuilder.compactTree: nodes with their numbers,
+        parent links, tags, texts, hrefs and CSS paths (which give the NodeIdentifier mapping), and
+        the structured data. The soup is not included.
+        """
+        tree = self.tree
+        if not isinstance(tree, CompactTree):
+            tree = CompactTree.from_tree(tree, self.node_identifier.number_csspath_mapping)
+        tree.metadata = {'structured_data': [{'kind': payload.kind, 'name': payload.name, 'data': payload.data}
+                                             for payload in self.structured_data]}
+        return tree.to_bytes()
+
+    def save(self, path):
+        """Write the built tree to a file, see to_bytes and load."""
+        with open(path, 'wb') as handle:
+            handle.write(self.to_bytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        An HTMLTree from to_bytes output, without rebuilding it.
+
+        The tree is a read-only CompactTree (see compact()) and there is no soup, as after
+        release_soup().
+        """
+        return cls._from_compact_tree(CompactTree.from_bytes(data))
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Load a tree written by save.
+
+        :param mmap: Memory-map the file read-only instead of reading it, see CompactTree.load.
+        """
+        return cls._from_compact_tree(CompactTree.load(path, mmap=mmap))
+
+    @classmethod
+    def _from_compact_tree(cls, tree):
+        html_tree = cls.__new__(cls)
+        html_tree.soup = None
+        html_tree.tree = tree
+        html_tree.node_identifier = NodeIdentifier()
+        html_tree.node_identifier.attach(tree)
+        html_tree.structured_data = [StructuredPayload(payload['kind'], payload['data'], payload['name'])
+                                     for payload in tree.metadata.get('structured_data', [])]
+        html_tree._release_indexes()
+        return html_tree
+
+    def release_soup(self):
+        """
+        Drop the cleaned BeautifulSoup and the indexes built from it, once the tree is built.
+
+        The nodes hold copies of their texts, CSS paths and hrefs, so the tree, the node numbers
+        and the structured data stay usable; build_tree, mark_sections and rank_nodes cannot be
+        called any more. The soup is decomposed, so its memory is freed right away instead of
+        waiting for the garbage collector to find its reference cycles.
+        """
+        if self.soup is not None:
+            self.soup.decompose()
+            self.soup = None
+        self._release_indexes()
+        return self
+
+    def _release_indexes(self):
+        self.css_paths = None
+        self.text_index = None
+        self.href_index = None
+
+    def extract_structured(self, info_types):
+        """
+        Answer info types from the page's structured data, see structuredData.extract_info. Only
+        finds something when the tree was built with structured_data=True.
+
+        :return: Dict info type -> {'info', 'node_number', 'source'} or None when not found.
+        """
+        return extract_info(self.structured_data, info_types)
 
     def mark_sections(self):
-        """Identify and mark important sections like tables, lists, and media elements."""
-        tables = self.soup.find_all('table')
-        
-        for table in tables:
-            if helper.is_single_row_or_column_table(table):
+        """
+        Identify and mark important sections like tables, lists, and media elements.
+
+        One walk over the document finds the tables (with their row and cell counts), media
+        elements, lists and list items. The attributes are then written in the order of the
+        former one-pass-per-kind implementation, so a tag matching several kinds (e.g. a list that
+        is also the smallest parent of an image) gets the same type_of_section as before.
+        """
+        tables = []
+        media_elements = []
+        lists = []
+        list_items = []
+        # id(tag) -> (tr below it, first tr below it, whether each tr below it has one td, td below it),
+        # only kept inside tables
+        rows = {}
+        # (tag, below a list, below a table); below a table is None once the children are done.
+        # The visiting order does not matter: every rule writes the same value wherever it matches
+        stack = [(self.soup, False, False)]
+        while stack:
+            tag, in_list, in_table = stack.pop()
+            if in_table is None:
+                self._count_rows(tag, rows, tables)
                 continue
-            
+            name = tag.name
+            if name in MEDIA_TAGS:
+                media_elements.append(tag)
+            elif name == 'ul' or name == 'ol':
+                lists.append(tag)
+                in_list = True
+            elif name == 'li' and in_list:
+                list_items.append(tag)
+            elif name == 'table':
+                in_table = True
+            if in_table:
+                stack.append((tag, in_list, None))
+            stack.extend((child, in_list, in_table) for child in tag.contents if isinstance(child, Tag))
+
+        for table in tables:
             table['type_of_section'] = 'table'
 
-                
-        media_tags = ['img', 'audio', 'video', 'embed', 'source', 'svg']
-        for tag in media_tags:
-            media_elements = self.soup.find_all(tag)
-            for media in media_elements:
-                media_section = helper.find_smallest_parent_with_extra_text(media)
-                if media_section:
-                    media_section['type_of_section'] = 'media'
-
-        lists = self.soup.find_all(['ul', 'ol'])
-        
+        for media in media_elements:
+            media_section = helper.find_smallest_parent_with_extra_text(media, self.text_index)
+            if media_section:
+                media_section['type_of_section'] = 'media'
+
         for lst in lists:
             lst['type_of_section'] = 'list'
             lst['is_repetitive'] = True
-            items = lst.find_all('li')
-            for item in items:
-                if isinstance(item, Tag) and not item.get('type_of_section') and not helper.isSingleTextNode(item):
-                    item['type_of_section'] = 'list_item'
+        for item in list_items:
+            if not item.get('type_of_section') and not helper.isSingleTextNode(item, self.text_index):
+                item['type_of_section'] = 'list_item'
 
 
+    @staticmethod
+    def _count_rows(tag, rows, tables):
+        """
+        Row and cell counts of a tag inside a table, from those of its children; collects the
+        tables with several rows and columns.
+        """
+        tr_count = td_count = 0
+        first_tr = None
+        single_cells = True
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                child_trs, child_first_tr, child_single_cells, child_tds = rows[id(child)]
+                if child.name == 'tr':
+                    tr_count += 1
+                    if first_tr is None:
+                        first_tr = child
+                    single_cells = single_cells and child_tds == 1
+                elif child.name == 'td':
+                    td_count += 1
+                tr_count += child_trs
+                td_count += child_tds
+                if first_tr is None:
+                    first_tr = child_first_tr
+                single_cells = single_cells and child_single_cells
+        rows[id(tag)] = (tr_count, first_tr, single_cells, td_count)
+
+        # helper.is_single_row_or_column_table; a table without rows is no section either
+        if tag.name == 'table' and tr_count > 1 and not (rows[id(first_tr)][3] == 1 and single_cells):
+            tables.append(tag)
+
     def rank_nodes(self, node, rank=1):
-        if not isinstance(node, Tag):
-            return rank
-        
+        """
+        Give header and single text nodes a rank, walking the document in order.
+
+        The walk uses an explicit stack, so arbitrarily deep pages do not reach the recursion
+        limit. One counter runs through the whole walk; children of a section (a tag with a
+        type_of_section) that are not single text nodes move it on by one before they are visited.
+
+        :return: The next free rank.
+        """
         current_rank = rank
-        
-        if isinstance(node, Tag) and (helper.isHeaderText(node) or node.attrs.get('header')):
-            node['rank'] = current_rank
-            current_rank += 1
-            return current_rank
-        
-        if isinstance(node, Tag) and not node.attrs.get('rank') and helper.isSingleTextNode(node):
-            node['rank'] = current_rank
-            return current_rank
-        
-        if node.attrs.get('type_of_section'):
-            header_nodes = None
-            
-            if node.attrs.get('type_of_section') in ['media', 'list_item', 'script']:
-                header_nodes = helper.getHeaderNode(node)
-                if header_nodes:
-                    header_nodes['rank'] = current_rank
-                    current_rank += 1
-            
-            for child in node.children:
-                if isinstance(child, Tag):
-                    if header_nodes and child is header_nodes:
-                        continue
-                    if helper.isSingleTextNode(child):
-                        child['rank'] = current_rank
-                    else:
+        # (tag, whether it is a child of a section); children are pushed reversed to pop in order
+        stack = [(node, False)]
+        while stack:
+            node, in_section = stack.pop()
+            if not isinstance(node, Tag):
+                continue
+
+            if in_section:
+                if helper.isSingleTextNode(node, self.text_index):
+                    node['rank'] = current_rank
+                    continue
+                current_rank += 1
+
+            if helper.isHeaderText(node, self.text_index) or node.attrs.get('header'):
+                node['rank'] = current_rank
+                current_rank += 1
+                continue
+
+            if not node.attrs.get('rank') and helper.isSingleTextNode(node, self.text_index):
+                node['rank'] = current_rank
+                continue
+
+            if node.attrs.get('type_of_section'):
+                header_nodes = None
+
+                if node.attrs.get('type_of_section') in ['media', 'list_item', 'script']:
+                    header_nodes = helper.getHeaderNode(node, self.text_index)
+                    if header_nodes:
+                        header_nodes['rank'] = current_rank
                         current_rank += 1
 
-                        current_rank = self.rank_nodes(child, current_rank)
-        else:
-            for child in node.children:
-                current_rank = self.rank_nodes(child, current_rank)
-        
+                stack.extend((child, True) for child in reversed(node.contents)
+                             if isinstance(child, Tag) and not (header_nodes and child is header_nodes))
+            else:
+                stack.extend((child, False) for child in reversed(node.contents))
+
         return current_rank
-    
+
+    def _is_ranked_leaf(self, node):
+        return node.attrs.get('rank') and helper.isSingleTextNode(node, self.text_index)
+
+    def _add_ranked_leaf(self, node, current_node, current_rank):
+        """Add a ranked single text node below the node its rank places it under."""
+        level_distance = current_rank - int(node['rank'])
+        new_node = SoupNode(bs_tag=node, node_identifier = self.node_identifier, css_path=self.css_paths.path(node),
+                            text=helper.cleanText(self.text_index.text(node)), hrefs=self.href_index.hrefs(node))
+        parent = None
+        if level_distance <= -1:
+            parent = current_node
+
+        if level_distance >= 0:
+            parent = self.traverse_up(current_node.identifier, level_distance + 1)
+
+        self.tree.add_node(new_node, parent=parent.identifier)
+        return new_node, int(node['rank'])
+
     def top_down(self, node, current_node, current_rank=1):
-        """Recursively traverse the tree top-down and build structure."""
+        """
+        Traverse the tree top-down and build structure.
+
+        Every frame of the explicit stack keeps the current node and rank its children see: a
+        ranked leaf updates them for its later siblings, while what happens inside a nested tag
+        stays inside it.
+
+        :return: (new node, its rank) when `node` itself is a ranked leaf, else (None, None).
+        """
         if not isinstance(node, Tag):  # ✅ Skip text nodes
             return None, None,None
 
         if not current_node:
             return None, None, None
 
-        if node.attrs.get('rank') and helper.isSingleTextNode(node):
-            level_distance = current_rank - int(node['rank'])
-            new_node = SoupNode(bs_tag=node, node_identifier = self.node_identifier)
-            parent = None
-            if level_distance <= -1:
-                parent = current_node
+        if self._is_ranked_leaf(node):
+            return self._add_ranked_leaf(node, current_node, current_rank)
 
-            if level_distance >= 0:
-                parent = self.traverse_up(current_node.identifier, level_distance + 1)
+        # [children iterator, current node, current rank]
+        stack = [[iter(node.contents), current_node, current_rank]]
+        while stack:
+            frame = stack[-1]
+            child = next(frame[0], None)
+            if child is None:
+                stack.pop()
+            elif isinstance(child, Tag):
+                if self._is_ranked_leaf(child):
+                    frame[1], frame[2] = self._add_ranked_leaf(child, frame[1], frame[2])
+                else:
+                    stack.append([iter(child.contents), frame[1], frame[2]])
 
-            self.tree.add_node(new_node, parent=parent.identifier)
-
-            current_node = new_node
-            current_rank = int(node['rank'])
-            return current_node, current_rank
-
-        for child in node.children:
-            if isinstance(child, Tag):
-                tempt, rank= self.top_down(child, current_node, current_rank)
-                if tempt:
-                    current_node = tempt
-                    current_rank = rank
-                    
         return None, None
                 
     def build_tree(self):
         """Construct the tree from the BeautifulSoup object."""
+        # Building the tree only adds attributes, so the paths and text statistics stay valid throughout
+        self.css_paths = helper.CssPathIndex(self.soup)
+        self.text_index = helper.TextIndex(self.soup)
+        self.href_index = helper.HrefIndex(self.soup)
         self.mark_sections()
         self.rank_nodes(self.soup)
         title_node = self.soup.find('title')
         
         if title_node:
-            root_node = SoupNode(bs_tag=title_node, is_title= True, node_identifier = self.node_identifier)
+            root_node = SoupNode(bs_tag=title_node, is_title= True, node_identifier = self.node_identifier,
+                                 css_path=self.css_paths.path(title_node),
+                                 text=helper.cleanText(self.text_index.text(title_node)),
+                                 hrefs=self.href_index.hrefs(title_node))
             self.tree.add_node(root_node)
             body_node = self.soup.find('body')
             if body_node:
@@ -165,37 +415,68 @@ class HTMLTree:
             level_distance -= 1
         return current_node
     
-    def print_tree(self, node_id='root', prefix='', last=True):
+    def iter_string_tree(self, node_id='root', prefix='', last=True, max_chars=None, max_tokens=None,
+                         count_tokens=None):
+        """
+        Yield the lines of the string tree below node_id, each ending with a newline.
+
+        The tree is walked in pre-order with an explicit stack and every line is produced once,
+        so rendering takes time linear in the output, and stopping early costs nothing. With a
+        budget only whole lines are yielded, up to the first line that would exceed it.
+
+        :param max_chars: Stop before the output would exceed this many characters.
+        :param max_tokens: Stop before the output would exceed this many tokens.
+        :param count_tokens: Callable giving the number of tokens of a line (e.g. from the LLM's
+            tokenizer); defaults to helper.estimate_tokens.
+        """
         node = self.tree.get_node(node_id)
-        
         if not node:
             return
+        count_tokens = count_tokens or helper.estimate_tokens
+        chars = tokens = 0
+        stack = [(node, prefix, last)]
+        while stack:
+            node, prefix, last = stack.pop()
+            line = prefix + ("└── " if last else "├── ") + str(node.number) + ":" + node.text + "\n"
+            if max_chars is not None:
+                chars += len(line)
+                if chars > max_chars:
+                    return
+            if max_tokens is not None:
+                tokens += count_tokens(line)
+                if tokens > max_tokens:
+                    return
+            yield line
 
-        print(prefix + ("└── " if last else "├── ") + str(node.number) + ":" + node.text)
+            children = list(self.tree.children(node.identifier))
+            child_prefix = prefix + ("    " if last else "│   ")
+            for i in range(len(children) - 1, -1, -1):
+                stack.append((children[i], child_prefix, i == len(children) - 1))
 
-        children = list(self.tree.children(node.identifier))
-        for i, child in enumerate(children):
-            is_last = i == len(children) - 1
-            self.print_tree(child.identifier, prefix + ("    " if last else "│   "), is_last)
-            
-    def get_string_tree(self, node_id='root', prefix='', last=True, result=None):
-        # Initialize the result string if it's the first call
-        if result is None:
-            result = ""
+    def write_string_tree(self, sink, node_id='root', max_chars=None, max_tokens=None, count_tokens=None):
+        """
+        Write the string tree to a file-like object (anything with a write method).
 
-        node = self.tree.get_node(node_id)
-        
-        if not node:
-            return result
+        :return: Number of characters written.
+        """
+        written = 0
+        for line in self.iter_string_tree(node_id, max_chars=max_chars, max_tokens=max_tokens,
+                                          count_tokens=count_tokens):
+            sink.write(line)
+            written += len(line)
+        return written
 
-        # Append the current node's representation to the result string
-        result += prefix + ("└── " if last else "├── ") + str(node.number) + ":" + node.text + "\n"
+    def print_tree(self, node_id='root', prefix='', last=True, max_chars=None, max_tokens=None):
+        for line in self.iter_string_tree(node_id, prefix, last, max_chars=max_chars, max_tokens=max_tokens):
+            print(line, end='')
 
-        # Get the children of the current node
-        children = list(self.tree.children(node.identifier))
-        for i, child in enumerate(children):
-            is_last = i == len(children) - 1
-            # Recursively build the string for the children
-            result = self.get_string_tree(child.identifier, prefix + ("    " if last else "│   "), is_last, result)
+    def get_string_tree(self, node_id='root', prefix='', last=True, result=None, max_chars=None, max_tokens=None,
+                        count_tokens=None):
+        """
+        The string tree below node_id, see iter_string_tree for the budget.
 
-        return result
+        :param result: Text the tree is appended to.
+        """
+        lines = self.iter_string_tree(node_id, prefix, last, max_chars=max_chars, max_tokens=max_tokens,
+                                      count_tokens=count_tokens)
+        return (result or "") + "".join(lines)
@@ -0,0 +1,745 @@
+"""
+Benchmarks for the DomBuilder stages.
+
+Run against a directory (or list) of saved HTML pages:
+
+    python -m DomBuilder.benchmark path/to/pages/*.html
+
+Without arguments it runs on the fixture pages in DomBuilder/benchmark_pages.
+
+A non-zero exit status means an optimized path disagreed with its reference on some page.
+"""
+import copy
+import gc
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from . import helper
+from .cleanHTML import (HEADER_TAGS, clean_empty_lines, clean_html, clean_html_comments, compile_remove_rules,
+                        convert_script_to_html_node, getNumberTextNode, remove_tags, tags_to_remove,
+                        unwrap_siblings_of_text)
+from .HTMLTree import HTMLTree, NodeIdentifier
+from .parserBackend import HTML_PARSER, available_parsers, parse_html
+from .removeRules import RuleSet, normalize_rules
+
+from bs4 import NavigableString, Tag, UnicodeDammit
+from treelib import Tree
+
+PAGES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_pages')
+
+
+def load_pages(paths):
+    """Read HTML files; directories are expanded to the *.html files they contain."""
+    pages = []
+    for path in paths:
+        files = sorted(glob.glob(path.rstrip('/') + '/*.html')) or [path]
+        for file_path in files:
+            with open(file_path, encoding='utf-8', errors='replace') as handle:
+                pages.append((file_path, handle.read()))
+    return pages
+
+
+def time_call(function, *args, repeat=3):
+    """Best wall-clock time of `repeat` calls in milliseconds, and the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def process_tags_with_mixed_content_multipass(soup):
+    """
+    Reference implementation of process_tags_with_mixed_content, used by clean_html_multipass.
+    Lives here only to check the single-pass version against.
+
+    Searches through an HTML soup to find all tags that directly contain both
+    text nodes and other HTML elements, then processes them using the
+    unwrap_siblings_of_text function.
+
+    Args:
+        soup: A BeautifulSoup object representing the HTML document.
+
+    Returns:
+        int: The number of tags that were processed.
+    """
+    processed_count = 0
+
+    # Find all tags in the document
+    all_tags = soup.find_all(True)
+
+    list_node_to_modify = []
+    for tag in all_tags:
+        # Check if the tag has contents
+        if hasattr(tag, 'contents') and tag.contents and getNumberTextNode(tag) < 50:
+            # Check for direct text nodes (non-empty after stripping)
+            has_text = any(
+                isinstance(child, NavigableString) and child.strip()
+                for child in tag.contents
+            )
+
+            # Check for direct HTML element children
+            has_elements = any(
+                isinstance(child, Tag) and child.get_text().strip()
+                for child in tag.contents
+            )
+
+            # If the tag has both direct text and HTML elements, process it
+            if has_text and has_elements:
+                list_node_to_modify.append(tag)
+    list_node_to_modify.sort(key=lambda tag: len(tag.get_text()))
+    for node in list_node_to_modify:
+        while True:
+            unwrap_siblings_of_text(node)
+            has_text = any(
+                isinstance(child, NavigableString) and child.strip()
+                for child in node.contents
+            )
+
+            # Check for direct HTML element children
+            has_elements = any(
+                isinstance(child, Tag) and child.get_text().strip()
+                for child in node.contents
+            )
+
+            # If the tag has both direct text and HTML elements, process it
+            if not (has_text and has_elements):
+                break
+
+    return processed_count
+
+
+def wrap_header_and_siblings_reparsing(soup, header_tags=HEADER_TAGS, parser=None):
+    """
+    Reference implementation of wrap_header_and_siblings, used by clean_html_multipass: the page
+    is serialized and parsed again, the headers are wrapped in the new soup and its contents are
+    copied back into `soup`.
+    """
+    # First, convert the HTML to string and then parse it again
+    # This ensures we have a clean starting point
+    new_soup = parse_html(str(soup), parser)
+
+    # Find all headers in the new soup
+    headers = new_soup.find_all(header_tags)
+
+    # Keep track of which elements we've processed
+    processed = set()
+
+    # Create sections for each header
+    for header in headers:
+        # Skip if already processed
+        if header in processed:
+            continue
+
+        # Create a container div and move the header into it
+        container = new_soup.new_tag("div")
+        header.insert_before(container)
+        container.append(header)
+        processed.add(header)
+
+        # Move the next siblings into it, until another header
+        next_elem = container.next_sibling
+        while next_elem:
+            next_next = next_elem.next_sibling  # Store before we modify
+            if isinstance(next_elem, Tag) and next_elem.name in header_tags:
+                break
+            container.append(next_elem)
+            next_elem = next_next
+
+    # Replace the original soup's contents with the new soup's contents
+    soup.clear()
+    for element in new_soup.contents:
+        soup.append(copy.copy(element))
+
+
+def clean_html_multipass(soup, tags_to_remove=tags_to_remove, parser=None, url=None, boilerplate=None):
+    """
+    Reference implementation of clean_html: the cleaner as it used to run, with one full pass
+    per rule, a serialize-and-reparse inside header wrapping and a final serialize-and-reparse
+    to drop empty lines. Lives here only to check clean_html against and to time it.
+    """
+    if not isinstance(tags_to_remove, dict):
+        tags_to_remove = compile_remove_rules(tags_to_remove, url)
+    if isinstance(soup, (bytes, bytearray)):
+        html_string = UnicodeDammit(bytes(soup), is_html=True).unicode_markup
+    else:
+        html_string = soup if isinstance(soup, str) else str(soup)
+
+    # Remove HTML comments, empty lines and '::markup', then parse
+    cleaned_html = clean_html_comments(html_string)
+    cleaned_html = clean_empty_lines(cleaned_html)
+    cleaned_html = re.sub(r'::markup', '', cleaned_html, flags=re.DOTALL)
+    soup = parse_html(cleaned_html, parser)
+    if boilerplate is not None:
+        boilerplate.process(soup, url)
+
+    for font in soup.find_all('font'):
+        font.unwrap()
+
+    wrap_header_and_siblings_reparsing(soup, parser=parser)
+    for script in soup.find_all('script'):
+        result = convert_script_to_html_node(script, parser)
+        if result:
+            script.insert_before(result)  # Insert the new content before the <script> tag
+        script.decompose()  # Remove the <script> tag completely
+
+    if tags_to_remove:
+        soup = remove_tags(soup, tags_to_remove)
+
+    process_tags_with_mixed_content_multipass(soup)
+
+    # Serialize, drop the empty lines and parse again
+    return parse_html(clean_empty_lines(str(soup)), parser)
+
+
+def benchmark_clean_html(pages, repeat=3):
+    """
+    Compare clean_html with the multi-pass reference implementation on every page.
+
+    :param pages: List of (name, html) pairs.
+    :return: List of dicts with both timings and whether the outputs are identical.
+    """
+    rows = []
+    for name, html in pages:
+        reference_ms, reference = time_call(clean_html_multipass, html, repeat=repeat)
+        engine_ms, cleaned = time_call(clean_html, html, repeat=repeat)
+        rows.append({
+            'page': name,
+            'bytes': len(html),
+            'multipass_ms': reference_ms,
+            'clean_html_ms': engine_ms,
+            'identical': str(reference) == str(cleaned),
+        })
+    return rows
+
+
+def benchmark_preclean(pages):
+    """
+    Compare building the tree from the full page with building it from the page run through
+    the streaming pre-cleaner.
+
+    :return: List of dicts with the time and peak traced memory of both, and whether the
+        string trees are the same.
+    """
+    rows = []
+    for name, html in pages:
+        data = html.encode('utf-8')
+        chunks = [data[start:start + 65536] for start in range(0, len(data), 65536)]
+        full_ms, full_peak, full_tree = measure(HTMLTree.from_html, data)
+        stream_ms, stream_peak, stream_tree = measure(HTMLTree.from_stream, chunks)
+        rows.append({
+            'page': name,
+            'bytes': len(data),
+            'full_ms': full_ms,
+            'full_peak_kb': full_peak // 1024,
+            'preclean_ms': stream_ms,
+            'preclean_peak_kb': stream_peak // 1024,
+            'same_tree': full_tree.get_string_tree() == stream_tree.get_string_tree(),
+        })
+    return rows
+
+
+def measure(function, *args):
+    """Wall-clock time in milliseconds, peak traced memory in bytes, and the result of one call."""
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def retained_memory(function, *args):
+    """Bytes still allocated after one call once the garbage is collected, and the result."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return retained, result
+
+
+def benchmark_compact_tree(pages):
+    """
+    Memory kept per page by the treelib tree of an HTMLTree and by its CompactTree.
+
+    :return: List of dicts with both sizes and whether both trees print the same string tree.
+    """
+    rows = []
+    for name, html in pages:
+        treelib_bytes, tree = retained_memory(lambda: HTMLTree.from_html(html).tree)
+        compact_bytes, compact = retained_memory(lambda: HTMLTree.from_html(html, compact=True).tree)
+        rows.append({
+            'page': name,
+            'nodes': len(compact),
+            'treelib_kb': treelib_bytes / 1024,
+            'compact_kb': compact_bytes / 1024,
+            'identical': [(node.identifier, node.number, node.text) for node in tree.all_nodes()]
+                         == [(node.identifier, node.number, node.text) for node in compact.all_nodes()],
+        })
+    return rows
+
+
+def benchmark_tree_memory(pages):
+    """
+    Memory an HTMLTree keeps per page when it holds on to its soup, when the soup is released
+    after building and when the tree is also compacted.
+
+    :return: List of dicts with the three sizes in KiB.
+    """
+    rows = []
+    for name, html in pages:
+        kept_bytes, _ = retained_memory(HTMLTree.from_html, html)
+        released_bytes, _ = retained_memory(lambda: HTMLTree.from_html(html, keep_soup=False))
+        compact_bytes, _ = retained_memory(lambda: HTMLTree.from_html(html, keep_soup=False, compact=True))
+        rows.append({
+            'page': name,
+            'bytes': len(html),
+            'keep_soup_kb': kept_bytes / 1024,
+            'released_kb': released_bytes / 1024,
+            'released_compact_kb': compact_bytes / 1024,
+        })
+    return rows
+
+
+def benchmark_saved_trees(pages, repeat=3):
+    """
+    Save every page's tree in the binary format and load it back, read and memory-mapped.
+
+    :return: List of dicts with the build, save and load timings, the file size and whether the
+        loaded trees render the same string tree.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'page.tree')
+        for name, html in pages:
+            build_ms, html_tree = time_call(HTMLTree.from_html, html, repeat=1)
+            save_ms, _ = time_call(html_tree.save, path, repeat=repeat)
+            load_ms, loaded = time_call(HTMLTree.load, path, repeat=repeat)
+            mmap_ms, mapped = time_call(lambda: HTMLTree.load(path, mmap=True), repeat=repeat)
+            expected = html_tree.get_string_tree()
+            rows.append({
+                'page': name,
+                'file_bytes': os.path.getsize(path),
+                'build_ms': build_ms,
+                'save_ms': save_ms,
+                'load_ms': load_ms,
+                'mmap_load_ms': mmap_ms,
+                'identical': loaded.get_string_tree() == expected and mapped.get_string_tree() == expected,
+            })
+            # Release the mapping before the file is replaced or removed
+            del mapped
+    return rows
+
+
+def benchmark_rule_scaling(pages, rule_counts=(4, 32, 128), repeat=3):
+    """
+    Time matching removal rules against every tag of the pages, as one find_all per rule
+    (remove_tags with a dictionary) and as a single traversal with a compiled RuleSet.
+
+    The default rules are padded with class rules that match nothing, so both sides do the same
+    work on every row. Nothing is removed.
+
+    :return: List of dicts with both timings per number of rules.
+    """
+    soups = [parse_html(html) for _, html in pages]
+    rows = []
+    for count in rule_counts:
+        rules = normalize_rules(tags_to_remove)
+        rules += [('class', f'unused-rule-{index}') for index in range(count - len(rules))]
+
+        def per_rule():
+            matched = 0
+            for soup in soups:
+                for kind, word in rules:
+                    if kind == 'name':
+                        matched += len(soup.find_all(word))
+                    else:
+                        matched += len(soup.find_all(class_=word))
+            return matched
+
+        def compiled():
+            rule_set = RuleSet(rules)
+            return sum(len(soup.find_all(rule_set)) for soup in soups)
+
+        per_rule_ms, _ = time_call(per_rule, repeat=repeat)
+        compiled_ms, _ = time_call(compiled, repeat=repeat)
+        rows.append({'rules': len(rules), 'find_all_per_rule_ms': per_rule_ms, 'rule_set_ms': compiled_ms})
+    return rows
+
+
+def remove_rule_stats(pages, rules=tags_to_remove):
+    """Clean every page with one timed RuleSet and return its per-rule hits and time."""
+    rule_set = RuleSet(rules, timed=True)
+    for _, html in pages:
+        clean_html(html, rule_set)
+    return rule_set.stats()
+
+
+def list_page(items=10000):
+    """A synthetic page holding one list with `items` entries, the worst case for sibling counting."""
+    entries = ''.join(f'<li><a href="/item/{index}">Item number {index}</a></li>' for index in range(items))
+    return f'<html><head><title>List page</title></head><body><h1>Items</h1><ul>{entries}</ul></body></html>'
+
+
+def benchmark_css_paths(pages, repeat=1):
+    """
+    Compute the CSS path of every tag with get_css_path and with a CssPathIndex.
+
+    :return: List of dicts with both timings and whether all paths are equal.
+    """
+    rows = []
+    for name, html in pages:
+        soup = clean_html(html)
+        tags = soup.find_all(True)
+
+        def one_by_one():
+            return [helper.get_css_path(tag) for tag in tags]
+
+        def indexed():
+            index = helper.CssPathIndex(soup)
+            return [index.path(tag) for tag in tags]
+
+        get_css_path_ms, expected = time_call(one_by_one, repeat=repeat)
+        index_ms, paths = time_call(indexed, repeat=repeat)
+        rows.append({
+            'page': name,
+            'tags': len(tags),
+            'get_css_path_ms': get_css_path_ms,
+            'css_path_index_ms': index_ms,
+            'identical': paths == expected,
+        })
+    return rows
+
+
+class RecursiveHTMLTree(HTMLTree):
+    """HTMLTree with the former recursive traversals, the reference for benchmark_traversals."""
+
+    def rank_nodes(self, node, rank=1):
+        if not isinstance(node, Tag):
+            return rank
+        current_rank = rank
+        if helper.isHeaderText(node, self.text_index) or node.attrs.get('header'):
+            node['rank'] = current_rank
+            return current_rank + 1
+        if not node.attrs.get('rank') and helper.isSingleTextNode(node, self.text_index):
+            node['rank'] = current_rank
+            return current_rank
+        if node.attrs.get('type_of_section'):
+            header_nodes = None
+            if node.attrs.get('type_of_section') in ['media', 'list_item', 'script']:
+                header_nodes = helper.getHeaderNode(node, self.text_index)
+                if header_nodes:
+                    header_nodes['rank'] = current_rank
+                    current_rank += 1
+            for child in node.children:
+                if isinstance(child, Tag):
+                    if header_nodes and child is header_nodes:
+                        continue
+                    if helper.isSingleTextNode(child, self.text_index):
+                        child['rank'] = current_rank
+                    else:
+                        current_rank = self.rank_nodes(child, current_rank + 1)
+        else:
+            for child in node.children:
+                current_rank = self.rank_nodes(child, current_rank)
+        return current_rank
+
+    def top_down(self, node, current_node, current_rank=1):
+        if self._is_ranked_leaf(node):
+            return self._add_ranked_leaf(node, current_node, current_rank)
+        for child in node.children:
+            if isinstance(child, Tag):
+                new_node, rank = self.top_down(child, current_node, current_rank)
+                if new_node:
+                    current_node, current_rank = new_node, rank
+        return None, None
+
+    def get_string_tree(self, node_id='root', prefix='', last=True, result=None):
+        result = "" if result is None else result
+        node = self.tree.get_node(node_id)
+        if not node:
+            return result
+        result += prefix + ("└── " if last else "├── ") + str(node.number) + ":" + node.text + "\n"
+        children = list(self.tree.children(node.identifier))
+        for i, child in enumerate(children):
+            result = self.get_string_tree(child.identifier, prefix + ("    " if last else "│   "),
+                                          i == len(children) - 1, result)
+        return result
+
+
+class MultiWalkHTMLTree(HTMLTree):
+    """HTMLTree with the former mark_sections, one walk per kind of section; the reference for the single walk."""
+
+    def mark_sections(self):
+        tables = self.soup.find_all('table')
+
+        for table in tables:
+            # Tables without rows made this raise IndexError; the single walk leaves them unmarked
+            if not table.find('tr') or helper.is_single_row_or_column_table(table):
+                continue
+
+            table['type_of_section'] = 'table'
+
+        media_tags = ['img', 'audio', 'video', 'embed', 'source', 'svg']
+        for tag in media_tags:
+            media_elements = self.soup.find_all(tag)
+            for media in media_elements:
+                media_section = helper.find_smallest_parent_with_extra_text(media, self.text_index)
+                if media_section:
+                    media_section['type_of_section'] = 'media'
+
+        lists = self.soup.find_all(['ul', 'ol'])
+
+        for lst in lists:
+            lst['type_of_section'] = 'list'
+            lst['is_repetitive'] = True
+            items = lst.find_all('li')
+            for item in items:
+                if isinstance(item, Tag) and not item.get('type_of_section') and not helper.isSingleTextNode(item, self.text_index):
+                    item['type_of_section'] = 'list_item'
+
+
+def build_only(tree_class, soup):
+    """Build an HTMLTree (or subclass) from an already cleaned soup, which is edited in place."""
+    html_tree = tree_class.__new__(tree_class)
+    html_tree.soup = soup
+    html_tree.structured_data = []
+    html_tree.tree = Tree()
+    html_tree.node_identifier = NodeIdentifier()
+    html_tree.build_tree()
+    return html_tree
+
+
+def time_build(tree_class, soup, repeat=3):
+    """Best build_only time in milliseconds over fresh copies of `soup`, and the last tree."""
+    best = None
+    html_tree = None
+    for _ in range(repeat):
+        fresh = copy.copy(soup)
+        start = time.perf_counter()
+        html_tree = build_only(tree_class, fresh)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, html_tree
+
+
+def benchmark_traversals(pages, repeat=3):
+    """
+    Build every page's tree with the explicit-stack traversals of HTMLTree and with the former
+    recursive ones (RecursiveHTMLTree), from the same cleaned soup, and render both string trees.
+
+    :return: List of dicts with the timings and whether trees and ranked soups are identical.
+    """
+    rows = []
+    for name, html in pages:
+        soup = clean_html(html)
+        recursive_ms, reference = time_build(RecursiveHTMLTree, soup, repeat)
+        iterative_ms, html_tree = time_build(HTMLTree, soup, repeat)
+        recursive_string_ms, expected = time_call(reference.get_string_tree, repeat=repeat)
+        iterative_string_ms, string_tree = time_call(html_tree.get_string_tree, repeat=repeat)
+        rows.append({
+            'page': name,
+            'nodes': html_tree.tree.size(),
+            'recursive_build_ms': recursive_ms,
+            'build_ms': iterative_ms,
+            'recursive_string_ms': recursive_string_ms,
+            'string_ms': iterative_string_ms,
+            'identical': string_tree == expected and str(html_tree.soup) == str(reference.soup),
+        })
+    return rows
+
+
+def benchmark_rendering(pages, max_tokens=4000, repeat=3):
+    """
+    Render every page's string tree in full, with a token budget (as for a prompt) and with the
+    former recursive get_string_tree.
+
+    :return: List of dicts with the timings and the characters rendered.
+    """
+    rows = []
+    for name, html in pages:
+        html_tree = build_only(RecursiveHTMLTree, clean_html(html))
+        recursive_ms, expected = time_call(html_tree.get_string_tree, repeat=repeat)
+        full_ms, string_tree = time_call(lambda: HTMLTree.get_string_tree(html_tree), repeat=repeat)
+        budget_ms, prompt = time_call(lambda: HTMLTree.get_string_tree(html_tree, max_tokens=max_tokens),
+                                      repeat=repeat)
+        rows.append({
+            'page': name,
+            'chars': len(string_tree),
+            'recursive_ms': recursive_ms,
+            'full_ms': full_ms,
+            f'{max_tokens}_tokens_ms': budget_ms,
+            f'{max_tokens}_tokens_chars': len(prompt),
+            'identical': string_tree == expected and string_tree.startswith(prompt),
+        })
+    return rows
+
+
+def deep_page(depth=5000):
+    """A synthetic page nesting `depth` divs, each with a heading and a paragraph, so the tree is as deep."""
+    levels = ''.join(f'<div><h2>Heading {level}</h2><p>Text of level {level}</p>' for level in range(depth))
+    return (f'<html><head><title>Deep page</title></head><body>{levels}{"</div>" * depth}'
+            f'</body></html>')
+
+
+def bulky_page(megabytes=8):
+    """
+    A synthetic page whose bulk is an inline <style> and a minified <script> of `megabytes` MB
+    each around a little text, the case the streaming pre-cleaner is for.
+    """
+    size = megabytes << 20
+    style = '.c{color:#333;margin:0 4px} ' * (size // 29)
+    script = 'function f(a,b){return a<b?a:b}; ' * (size // 34)
+    text = ''.join(f'<h2>Section {index}</h2><p>Text of section {index} with a few words</p>' for index in range(50))
+    return (f'<html><head><title>Bulky page</title><style>{style}</style></head><body>{text}'
+            f'<script>{script}</script></body></html>')
+
+
+def synthetic_pages():
+    """
+    The generated pages every stage runs on next to the fixtures: the 10000-item list and a page
+    nested 200 levels deep (below the 256 levels the native backend keeps).
+    """
+    return [('list_page(10000)', list_page()), ('deep_page(200)', deep_page(200))]
+
+
+def stress_deep_page(depth=5000, parser=None):
+    """
+    Build and render the tree of deep_page(depth) under the interpreter's recursion limit.
+
+    Most of the time goes into clean_html wrapping headers, which moves ever larger subtrees.
+
+    :return: Dict with the timings, the depth of the tree, and the error if one was raised.
+    """
+    html = deep_page(depth)
+    row = {'depth': depth, 'recursion_limit': sys.getrecursionlimit(), 'error': None}
+    try:
+        row['from_html_ms'], html_tree = time_call(HTMLTree.from_html, html, parser, repeat=1)
+        row['tree_depth'] = html_tree.tree.depth()
+        row['string_ms'], string_tree = time_call(html_tree.get_string_tree, repeat=1)
+        row['lines'] = string_tree.count('\n')
+    except RecursionError as error:
+        row['error'] = repr(error)
+    return row
+
+
+def check_parser_conformance(pages, parsers=None, reference=HTML_PARSER):
+    """
+    Build every page's HTMLTree with each parser backend and compare get_string_tree against
+    the reference backend.
+
+    :param parsers: Backends to check; defaults to every installed one.
+    :return: List of dicts with the time each backend took and whether its tree matched.
+    """
+    parsers = [parser for parser in (parsers or available_parsers()) if parser != reference]
+    rows = []
+    for name, html in pages:
+        reference_ms, reference_tree = time_call(HTMLTree.from_html, html, reference, repeat=1)
+        row = {'page': name, reference + '_ms': reference_ms}
+        for parser in parsers:
+            elapsed, tree = time_call(HTMLTree.from_html, html, parser, repeat=1)
+            row[parser + '_ms'] = elapsed
+            row[parser + '_matches'] = tree.get_string_tree() == reference_tree.get_string_tree()
+        rows.append(row)
+    return rows
+
+
+def print_rows(rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    print('\t'.join(columns))
+    for row in rows:
+        print('\t'.join(f'{row[c]:.1f}' if isinstance(row[c], float) else str(row[c]) for c in columns))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    pages = load_pages(argv or [PAGES_DIRECTORY])
+    generated = pages + synthetic_pages()
+    failures = 0
+
+    rows = benchmark_clean_html(generated)
+    print_rows(rows)
+    total_reference = sum(row['multipass_ms'] for row in rows)
+    total_engine = sum(row['clean_html_ms'] for row in rows)
+    identical = sum(row['identical'] for row in rows)
+    failures += len(rows) - identical
+    print(f"clean_html: {total_engine:.1f} ms vs multipass {total_reference:.1f} ms "
+          f"({total_reference / max(total_engine, 1e-9):.2f}x), identical on {identical}/{len(rows)} pages")
+    print()
+
+    rows = check_parser_conformance(pages)
+    print_rows(rows)
+    for column in [column for column in (rows[0] if rows else ()) if column.endswith('_matches')]:
+        matches = sum(row[column] for row in rows)
+        failures += len(rows) - matches
+        print(f"{column[:-len('_matches')]}: string tree matches {HTML_PARSER} on {matches}/{len(rows)} pages")
+    print()
+
+    rows = benchmark_css_paths(generated)
+    print_rows(rows)
+    failures += sum(not row['identical'] for row in rows)
+    print()
+
+    rows = benchmark_compact_tree(generated)
+    print_rows(rows)
+    failures += sum(not row['identical'] for row in rows)
+    print(f"compact trees: {sum(row['compact_kb'] for row in rows):.0f} KiB vs treelib "
+          f"{sum(row['treelib_kb'] for row in rows):.0f} KiB")
+    print()
+
+    print_rows(benchmark_tree_memory(generated))
+    print()
+
+    rows = benchmark_saved_trees(generated)
+    print_rows(rows)
+    failures += sum(not row['identical'] for row in rows)
+    print()
+
+    rows = benchmark_traversals(generated)
+    print_rows(rows)
+    failures += sum(not row['identical'] for row in rows)
+    print()
+
+    rows = benchmark_rendering(generated)
+    print_rows(rows)
+    failures += sum(not row['identical'] for row in rows)
+    print()
+
+    # The native backend (libxml2) stops nesting at 256 levels, so the reference parser is used
+    row = stress_deep_page()
+    print_rows([row])
+    failures += row['error'] is not None
+    print()
+
+    print_rows(benchmark_rule_scaling(pages))
+    print()
+    print_rows(remove_rule_stats(pages))
+    print()
+
+    # The pre-cleaner may legitimately differ on some pages, so mismatches are reported only.
+    # It only pays off on pages of mostly styles and scripts; on the others it adds a tokenizing pass
+    rows = benchmark_preclean(pages + [('bulky_page(8)', bulky_page(8))])
+    print_rows(rows)
+    print(f"preclean: same string tree on {sum(row['same_tree'] for row in rows)}/{len(rows)} pages")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
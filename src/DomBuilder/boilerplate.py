@@ -0,0 +1,245 @@
+"""
+Cross-page boilerplate learning.
+
+Pages of one site repeat the same header, menus, cookie banner and sidebars. BoilerplateLearner
+fingerprints every subtree of the first pages it sees from a domain, keeps the fingerprints that
+occur on most of them as the domain's template, and from then on removes matching subtrees while
+cleaning, before the tree, the Pruner or any prompt sees them:
+
+    learner = BoilerplateLearner('boilerplate.json')
+    for url, html in pages:
+        tree = HTMLTree.from_html(html, url=url, boilerplate=learner)
+
+A fingerprint covers the tag names of a subtree and its whitespace-normalized text, not the
+attributes, so ids and tracking parameters that change between pages do not matter. Learn and
+strip with the same parser backend: backends repair broken markup differently.
+
+The pages sampled while a domain is being learned are returned unstripped, so they come out
+cleaned differently from the later pages of the site. Where that matters, teach the learner up
+front (learn() on a sample of pages, then finish()) before building any trees, as
+PageArchive.iter_trees does.
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup, Tag
+from bs4.element import PreformattedString
+
+from .parserBackend import parse_html
+
+# Never removed, whatever they contain
+PAGE_TAGS = frozenset([BeautifulSoup.ROOT_TAG_NAME, 'html', 'head', 'body'])
+
+
+def subtree_fingerprints(soup):
+    """
+    Fingerprint every tag in one bottom-up pass.
+
+    :return: Dict id(tag) -> (fingerprint, text length, number of tags in the subtree).
+    """
+    fingerprints = {}
+    stack = [(soup, False)]
+    while stack:
+        tag, children_done = stack.pop()
+        if not children_done:
+            stack.append((tag, True))
+            stack.extend((child, False) for child in tag.contents if isinstance(child, Tag))
+            continue
+
+        digest = hashlib.blake2b(tag.name.encode('utf-8'), digest_size=8)
+        text_length = 0
+        tag_count = 1
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                child_fingerprint, child_text, child_tags = fingerprints[id(child)]
+                digest.update(b'<' + child_fingerprint.encode('ascii'))
+                text_length += child_text
+                tag_count += child_tags
+            elif not isinstance(child, PreformattedString):
+                text = ' '.join(child.split())
+                if text:
+                    digest.update(b'"' + text.encode('utf-8'))
+                    text_length += len(text)
+        fingerprints[id(tag)] = (digest.hexdigest(), text_length, tag_count)
+    return fingerprints
+
+
+class BoilerplateLearner:
+    """
+    Learns which subtrees every page of a domain shares and removes them.
+
+    For each domain the first `sample_size` distinct pages are sampled; a subtree found on at
+    least `min_share` of them (and on two pages at least) becomes part of the domain's template.
+    Sampled pages are left untouched, later pages are stripped.
+
+    :param path: Optional JSON file the templates (and unfinished samples) are loaded from and saved to.
+    :param sample_size: Pages sampled per domain before the template is fixed.
+    :param min_share: Share of the sampled pages a subtree has to appear on.
+    :param min_text_length: Subtrees with less text are never boilerplate (e.g. table header rows).
+    :param min_tags: Subtrees with fewer tags are never boilerplate (e.g. a lone "Share" link).
+    :param save_every: The file is written when a domain's template is fixed, and otherwise after
+        this many sampled pages, so at most that many samples are lost on a crash.
+    """
+
+    def __init__(self, path=None, sample_size=20, min_share=0.6, min_text_length=20, min_tags=2,
+                 save_every=50):
+        self.path = path
+        self.sample_size = sample_size
+        self.min_share = min_share
+        self.min_text_length = min_text_length
+        self.min_tags = min_tags
+        self.save_every = save_every
+        # domain -> {'pages': int, 'urls': [...], 'counts': {fingerprint: pages}} while sampling,
+        # {'pages': int, 'template': [fingerprint, ...]} once learned
+        self.domains = {}
+        self._templates = {}
+        self._lock = threading.Lock()
+        # Serializes the file writes, which happen outside self._lock
+        self._file_lock = threading.Lock()
+        self._unsaved_pages = 0
+        self._snapshots = 0
+        self._saved_snapshot = 0
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                self.domains = json.load(handle)
+            for domain, state in self.domains.items():
+                if 'template' in state:
+                    self._templates[domain] = frozenset(state['template'])
+
+    @staticmethod
+    def domain_of(url):
+        return urlparse(url).netloc.lower()
+
+    def is_candidate(self, tag, text_length, tag_count):
+        return tag.name not in PAGE_TAGS and text_length >= self.min_text_length and tag_count >= self.min_tags
+
+    def template_for(self, url):
+        """The learned fingerprints of the url's domain, or None while it is still sampled."""
+        return self._templates.get(self.domain_of(url))
+
+    def process(self, soup, url):
+        """
+        Learn from a page or strip its boilerplate, depending on the state of its domain.
+
+        Pages sampled while the domain is learned are left as they are (see the module docstring).
+
+        :param soup: BeautifulSoup of the page, edited in place.
+        :return: Number of subtrees removed.
+        """
+        if not url:
+            return 0
+        template = self.template_for(url)
+        fingerprints = subtree_fingerprints(soup)
+        if template is None:
+            self._observe(url, soup, fingerprints)
+            return 0
+        return self._strip(soup, fingerprints, template)
+
+    def learn(self, url, html, parser=None):
+        """Sample a page without stripping it, e.g. to learn templates from an archive up front."""
+        soup = parse_html(html, parser) if isinstance(html, (str, bytes)) else html
+        if self.template_for(url) is None:
+            self._observe(url, soup, subtree_fingerprints(soup))
+
+    def _observe(self, url, soup, fingerprints):
+        seen = set()
+        stack = [soup]
+        while stack:
+            tag = stack.pop()
+            fingerprint, text_length, tag_count = fingerprints[id(tag)]
+            if self.is_candidate(tag, text_length, tag_count):
+                seen.add(fingerprint)
+            stack.extend(child for child in tag.contents if isinstance(child, Tag))
+
+        domain = self.domain_of(url)
+        snapshot = None
+        with self._lock:
+            state = self.domains.setdefault(domain, {'pages': 0, 'urls': [], 'counts': {}})
+            if 'template' in state or url in state['urls']:
+                return
+            state['pages'] += 1
+            state['urls'].append(url)
+            counts = state['counts']
+            for fingerprint in seen:
+                counts[fingerprint] = counts.get(fingerprint, 0) + 1
+            self._unsaved_pages += 1
+            if state['pages'] >= self.sample_size:
+                self._fix_template(domain, state)
+                snapshot = self._snapshot()
+            elif self._unsaved_pages >= self.save_every:
+                snapshot = self._snapshot()
+        self._write(snapshot)
+
+    def _fix_template(self, domain, state):
+        needed = max(2, math.ceil(self.min_share * state['pages']))
+        template = sorted(fingerprint for fingerprint, pages in state['counts'].items() if pages >= needed)
+        self.domains[domain] = {'pages': state['pages'], 'template': template}
+        self._templates[domain] = frozenset(template)
+
+    def _strip(self, soup, fingerprints, template):
+        removals = []
+        stack = [soup]
+        while stack:
+            tag = stack.pop()
+            fingerprint, text_length, tag_count = fingerprints[id(tag)]
+            if fingerprint in template and self.is_candidate(tag, text_length, tag_count):
+                # The whole subtree goes, nothing inside it needs checking
+                removals.append(tag)
+                continue
+            stack.extend(child for child in tag.contents if isinstance(child, Tag))
+        for tag in removals:
+            tag.decompose()
+        return len(removals)
+
+    def finish(self, domain=None):
+        """
+        Fix the templates of domains still being sampled (or of one domain) from the pages seen so
+        far, and save everything learned.
+        """
+        with self._lock:
+            for name, state in list(self.domains.items()):
+                if 'template' not in state and (domain is None or name == domain):
+                    self._fix_template(name, state)
+            snapshot = self._snapshot()
+        self._write(snapshot)
+
+    def forget(self, domain):
+        """Drop what was learned about a domain, e.g. after a redesign."""
+        with self._lock:
+            self.domains.pop(domain, None)
+            self._templates.pop(domain, None)
+            snapshot = self._snapshot()
+        self._write(snapshot)
+
+    def _snapshot(self):
+        """Serialize the state; called with self._lock held. Returns (sequence number, JSON) or None."""
+        if not self.path:
+            return None
+        self._unsaved_pages = 0
+        self._snapshots += 1
+        return self._snapshots, json.dumps(self.domains)
+
+    def _write(self, snapshot):
+        if snapshot is None:
+            return
+        sequence, text = snapshot
+        with self._file_lock:
+            if sequence <= self._saved_snapshot:
+                # A newer snapshot was written meanwhile
+                return
+            # Write a temporary file and swap it in, so a crash never leaves a truncated file behind
+            directory = os.path.dirname(os.path.abspath(self.path))
+            handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(handle, 'w', encoding='utf-8') as output:
+                    output.write(text)
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            self._saved_snapshot = sequence
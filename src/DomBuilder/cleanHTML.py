@@ -1,16 +1,18 @@
-from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4 import Comment, NavigableString, Tag, UnicodeDammit
 import re
-import copy
+from .parserBackend import NATIVE, parse_fragment, parse_html, resolve_parser
+from .removeRules import compile_rules
 # Define a dictionary of tags to remove based on class or tag name
+# A word matched both ways lists both kinds; lists of rule tuples (see removeRules) can also hold
+# attribute and CSS selector rules
 tags_to_remove = {
     'style': 'name',
     # 'header': 'name',
     # 'footer': 'name',
-    'nav': 'name',
+    'nav': ('name', 'class'),
     # 'script': 'name',
     'meta': 'name',
     # 'head': 'name',
-    'nav': 'class',
     'footer': 'name',
     'select': 'name'
     # 'aside': 'class',
@@ -39,16 +41,23 @@ def clean_empty_lines(input_string):
 
 
 def remove_tags(soup, tags_to_remove = tags_to_remove):
-    # Iterate through the tags in the dictionary and remove them
-    for tag, identifier in tags_to_remove.items():
-        if identifier == 'name':
-            # Remove tags by tag name
-            for matched_tag in soup.find_all(tag):
-                matched_tag.decompose()
-        elif identifier == 'class':
-            # Remove tags by class attribute
-            for matched_tag in soup.find_all(class_=tag):
+    if not isinstance(tags_to_remove, dict):
+        # Compiled rules (see removeRules) are matched in a single traversal
+        for matched_tag in soup.find_all(compile_rules(tags_to_remove)):
+            if not matched_tag.decomposed:
                 matched_tag.decompose()
+        return soup
+    # Iterate through the tags in the dictionary and remove them
+    for tag, identifiers in tags_to_remove.items():
+        for identifier in ((identifiers,) if isinstance(identifiers, str) else identifiers):
+            if identifier == 'name':
+                # Remove tags by tag name
+                for matched_tag in soup.find_all(tag):
+                    matched_tag.decompose()
+            elif identifier == 'class':
+                # Remove tags by class attribute
+                for matched_tag in soup.find_all(class_=tag):
+                    matched_tag.decompose()
     # # Find all tags with no content (i.e., empty tags)
     # empty_tags = [tag for tag in soup.find_all() if not tag.get_text(strip=True)]
 
@@ -72,7 +81,9 @@ inline_elements = [
     "time"
     # Add more inline elements as needed
 ]
-def wrap_header_and_siblings(soup, header_tags=("h1", "h2", "h3", "h4", "h5", "h6")):
+HEADER_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+def wrap_header_and_siblings(soup, header_tags=HEADER_TAGS, headers=None):
     """
     Wrap headers and their subsequent siblings in a <div>,
     until encountering another header.
@@ -80,17 +91,15 @@ def wrap_header_and_siblings(soup, header_tags=("h1", "h2", "h3", "h4", "h5", "h
     Args:
         soup (BeautifulSoup): The soup object containing the HTML structure.
         header_tags (tuple): A tuple of header tags to consider.
+        headers (list): Headers in document order, if the caller already collected them.
     
     Returns:
-        None: The function modifies the soup in place.
+        list: The container divs that were created. The soup is modified in place.
     """
-    # First, convert the HTML to string and then parse it again
-    # This ensures we have a clean starting point
-    html_str = str(soup)
-    new_soup = BeautifulSoup(html_str, 'html.parser')
-    
-    # Find all headers in the new soup
-    headers = new_soup.find_all(header_tags)
+    # Find all headers
+    if headers is None:
+        headers = soup.find_all(header_tags)
+    containers = []
     
     # Keep track of which elements we've processed
     processed = set()
@@ -102,7 +111,8 @@ def wrap_header_and_siblings(soup, header_tags=("h1", "h2", "h3", "h4", "h5", "h
             continue
         
         # Create a container div
-        container = new_soup.new_tag("div")
+        container = soup.new_tag("div")
+        containers.append(container)
         
         # Insert the container right before the header
         header.insert_before(container)
@@ -125,36 +135,120 @@ def wrap_header_and_siblings(soup, header_tags=("h1", "h2", "h3", "h4", "h5", "h
             
             # Update next element
             next_elem = next_next
-    
-    # Replace the original soup's contents with the new soup's contents
-    soup.clear()
-    for element in new_soup.contents:
-        soup.append(copy.copy(element))
+
+    return containers
 
 def unwrap_tags(soup, tags=inline_elements):
     for tag in tags:
         for element in soup.find_all(tag):
-            # Find the index of the element within its parent's contents
-            index = element.parent.contents.index(element)
+            parent = element.parent
             # # Insert a space before the element
             # element.insert_after(", ")
             # Unwrap the element
             element.unwrap()
+            # Merge the text that was split around the element, as a reparse would
+            merge_adjacent_strings(parent)
     return soup
-def convert_script_to_html_node(script_tag):
+
+def merge_adjacent_strings(tag, string_types=(NavigableString,)):
+    """Merge consecutive text children of a tag of the same class in string_types into one string (non-recursive)."""
+    contents = tag.contents
+    i = len(contents) - 1
+    while i > 0:
+        a, b = contents[i - 1], contents[i]
+        if type(a) is type(b) and type(a) in string_types:
+            b.extract()
+            a.replace_with(type(a)(a + b))
+        i -= 1
+
+_LINE_BREAK = re.compile(r'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+def clean_empty_text_lines(text):
+    """
+    clean_empty_lines for a single text node: drop the whitespace-only lines that lie entirely
+    inside the text. Its first and last line share a line with neighbouring markup and stay.
+    """
+    lines = _LINE_BREAK.split(text)
+    if len(lines) <= 2:
+        return '\n'.join(lines)
+    inner = [line for line in lines[1:-1] if line.strip()]
+    return '\n'.join([lines[0]] + inner + [lines[-1]])
+
+def normalize_text_nodes(soup):
+    """
+    Merge adjacent text nodes and drop empty lines inside text in one walk over the tree.
+
+    Produces the same tree as serializing the soup, applying clean_empty_lines and parsing it
+    again, without paying for the serialization and the second parse. That includes the class
+    of every string: text that unwrapping moved out of a <style>, <script>, <rt>, ... becomes
+    plain text again, as the parser only makes strings inside those tags Stylesheet, Script, ...
+    """
+    builder = getattr(soup, 'builder', None)
+    containers = builder.string_containers if builder is not None else {}
+    string_types = (NavigableString,) + tuple(containers.values())
+    # (tag, class the parser gives the strings directly inside it)
+    stack = [(soup, containers.get(soup.name, NavigableString))]
+    while stack:
+        tag, string_type = stack.pop()
+        for child in list(tag.contents):
+            if type(child) is not string_type and type(child) in string_types:
+                child.replace_with(string_type(child))
+        merge_adjacent_strings(tag, string_types)
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                stack.append((child, containers.get(child.name, string_type)))
+            elif type(child) is string_type and _LINE_BREAK.search(child):
+                cleaned = clean_empty_text_lines(child)
+                if cleaned != child:
+                    child.replace_with(string_type(cleaned))
+    return soup
+# Regular expression to extract all HTML-like content inside JavaScript variables
+html_pattern = r'"(<[a-z][\s\S]*?>)"'  # Matches HTML content inside quotes (non-greedy matching)
+_FRAGMENT_START = re.compile(r'"<[a-z]')
+
+def find_html_fragments(text):
+    """
+    Same matches as re.findall(html_pattern, text), in linear time.
+
+    The regex retries its lazy scan from every '"<x' in the text, which is quadratic on huge
+    minified scripts full of '"<' and without a '>"'. A fragment always ends at the first '>"'
+    after its start, and once there is none no later start can match either.
+    """
+    fragments = []
+    position = 0
+    while True:
+        start = _FRAGMENT_START.search(text, position)
+        if start is None:
+            return fragments
+        end = text.find('>"', start.start() + 3)
+        if end < 0:
+            return fragments
+        fragments.append(text[start.start() + 1:end + 1])
+        position = end + 2
+
+def has_html_fragment(text):
+    """Same as re.search(html_pattern, text) is not None, in linear time."""
+    start = _FRAGMENT_START.search(text)
+    return start is not None and text.find('>"', start.start() + 3) >= 0
+
+def script_has_html(text):
+    """Whether convert_script_to_html_node finds HTML in a script with this text, once the page went through parse_for_cleaning."""
+    text = re.sub(r'::markup', '', clean_html_comments(text), flags=re.DOTALL)
+    return has_html_fragment(text)
+
+def convert_script_to_html_node(script_tag, parser=None):
     """
     Check if a <script> tag contains HTML content as a string in a JavaScript variable,
     wrap all the content (relevant and non-relevant) in a <div>, and return that as a BeautifulSoup node.
     :param script_tag: BeautifulSoup object representing a <script> tag.
+    :param parser: Parser backend for the extracted HTML, see DomBuilder.parserBackend.
     :return: BeautifulSoup node (wrapped HTML content) if HTML is found, False otherwise.
     """
-    # Regular expression to extract all HTML-like content inside JavaScript variables
-    html_pattern = r'"(<[a-z][\s\S]*?>)"'  # Matches HTML content inside quotes (non-greedy matching)
 
     # Check if the script tag has a string and contains HTML-like content
     if script_tag.string:
         # Find all matches of HTML content inside JavaScript variables
-        matches = re.findall(html_pattern, script_tag.string)
+        matches = find_html_fragments(script_tag.string)
 
         if matches:
             # Join all matched HTML strings and wrap them in a <div>
@@ -162,7 +256,7 @@ def convert_script_to_html_node(script_tag):
             wrapped_html = f"<div>{combined_html}</div>"
 
             # Convert the combined HTML into a BeautifulSoup node
-            html_node = BeautifulSoup(wrapped_html, 'html.parser')
+            html_node = parse_fragment(wrapped_html, parser)
             html_node.div['type_of_section'] = 'script'  # Add the attribute to the <div> tag
             return html_node
     return False
@@ -191,135 +285,353 @@ def unwrap_siblings_of_text(node):
          
     # Collect all non-text elements first, then unwrap them
     # This avoids modifying the list while iterating
-    elements_to_unwrap = []
-    print("------------------------")
-    print(node)
-    print("++++++++++++++++++++++++++")
-
-    for child in node.contents:
-        if isinstance(child, Tag):
-            print(child.get_text())
-            elements_to_unwrap.append(child)
+    elements_to_unwrap = [child for child in node.contents if isinstance(child, Tag)]
     
     # Now unwrap all collected elements
     for element in elements_to_unwrap:
         element.unwrap()
-    print(node)
-    print("------------------")
-def getNumberTextNode(node):
+def getNumberTextNode(node, index=None):
     """Check if a node contains only one direct text child (not wrapped inside another tag)."""
     if not isinstance(node, Tag):
         return None
+    if index is not None:
+        return index.string_stats(node)[0]
     text_nodes = [child.strip() for child in node.stripped_strings]
     return len(text_nodes)
 
+def text_statistics(soup):
+    """
+    Count the strings below every tag in one bottom-up walk.
+
+    :return: (tags, stats) where tags lists every tag in document order (like find_all(True))
+        and stats maps id(tag) to (non-blank NavigableStrings, their total length, other) with
+        other None or {string type: [non-blank strings, total length]} for every other string
+        type (comments, script text, ...).
+    """
+    tags = []
+    stack = [child for child in reversed(soup.contents) if isinstance(child, Tag)]
+    while stack:
+        tag = stack.pop()
+        tags.append(tag)
+        stack.extend(child for child in reversed(tag.contents) if isinstance(child, Tag))
+
+    stats = {}
+    for tag in reversed(tags):
+        count = length = 0
+        other = None
+        for child in tag.contents:
+            if type(child) is NavigableString:
+                length += len(child)
+                if child and not child.isspace():
+                    count += 1
+            elif isinstance(child, Tag):
+                child_count, child_length, child_other = stats[id(child)]
+                count += child_count
+                length += child_length
+                if child_other:
+                    other = other or {}
+                    for string_type, (type_count, type_length) in child_other.items():
+                        entry = other.setdefault(string_type, [0, 0])
+                        entry[0] += type_count
+                        entry[1] += type_length
+            elif isinstance(child, NavigableString):
+                other = other or {}
+                entry = other.setdefault(type(child), [0, 0])
+                entry[0] += bool(child.strip())
+                entry[1] += len(child)
+        stats[id(tag)] = (count, length, other)
+    return tags, stats
+
+def own_text_statistics(tag, stats):
+    """
+    len(list(tag.stripped_strings)) and len(tag.get_text()) from text_statistics, counting only
+    the string types the tag considers text.
+    """
+    types = tag.interesting_string_types or Tag.MAIN_CONTENT_STRING_TYPES
+    count, length, other = stats[id(tag)]
+    if NavigableString not in types:
+        count = length = 0
+    if other:
+        for string_type, (type_count, type_length) in other.items():
+            if string_type in types:
+                count += type_count
+                length += type_length
+    return count, length
+
 def process_tags_with_mixed_content(soup):
     """
-    Searches through an HTML soup to find all tags that directly contain both
-    text nodes and other HTML elements, then processes them using the 
-    unwrap_siblings_of_text function.
-    
+    Find all tags that directly contain both text and elements holding text, and unwrap their
+    children until the tag only holds text (and empty elements).
+
+    Same result as the multi-pass reference in DomBuilder.benchmark, but the text of every tag is
+    counted once, bottom-up, instead of once per check. Unwrapping only moves strings within
+    the tag being processed, so the counts stay valid while nodes are processed.
+
     Args:
         soup: A BeautifulSoup object representing the HTML document.
-        
+
     Returns:
         int: The number of tags that were processed.
     """
+    tags, stats = text_statistics(soup)
+    has_text = {}
+    candidates = []
+    for tag in tags:
+        count, length = own_text_statistics(tag, stats)
+        has_text[id(tag)] = count > 0
+        if not tag.contents or count >= 50:
+            continue
+        if any(isinstance(child, NavigableString) and child.strip() for child in tag.contents):
+            candidates.append((length, tag))
+
+    def has_text_elements(node):
+        return any(isinstance(child, Tag) and has_text[id(child)] for child in node.contents)
+
+    # Same order as the reference: by text length, which puts tags before the tags around them
+    candidates = [tag for tag in candidates if has_text_elements(tag[1])]
+    candidates.sort(key=lambda candidate: candidate[0])
+
     processed_count = 0
-    
-    # Find all tags in the document
-    all_tags = soup.find_all(True)
-    
-    list_node_to_modify = []
-    for tag in all_tags:
-        # Check if the tag has contents
-        if hasattr(tag, 'contents') and tag.contents and getNumberTextNode(tag) < 50:
-            # Check for direct text nodes (non-empty after stripping)
-            has_text = any(
-                isinstance(child, NavigableString) and child.strip() 
-                for child in tag.contents
-            )
-            
-            # Check for direct HTML element children
-            has_elements = any(
-                isinstance(child, Tag) and child.get_text().strip() 
-                for child in tag.contents
-            )
-            
-            # If the tag has both direct text and HTML elements, process it
-            if has_text and has_elements:
-                # print(tag.get_text())
-                list_node_to_modify.append(tag)
-    list_node_to_modify.sort(key=lambda tag: len(tag.get_text()))
-    for node in list_node_to_modify:
-        while True:
-            unwrap_siblings_of_text(node)
-            has_text = any(
-                isinstance(child, NavigableString) and child.strip() 
-                for child in node.contents
-            )
-            
-            # Check for direct HTML element children
-            has_elements = any(
-                isinstance(child, Tag) and child.get_text().strip() 
-                for child in node.contents
-            )
-            
-            # If the tag has both direct text and HTML elements, process it
-            if not (has_text and has_elements):
-                break
+    for _, node in candidates:
+        # A node unwrapped by an earlier one is left empty and skipped here
+        if not has_text_elements(node):
+            continue
+        processed_count += 1
+        while has_text_elements(node):
+            for child in [child for child in node.contents if isinstance(child, Tag)]:
+                child.unwrap()
 
     return processed_count
-def clean_html(soup, tags_to_remove=tags_to_remove):
+
+def parse_for_cleaning(soup, parser=None, tags_to_remove=None):
+    """
+    Run the string level cleaning (comments, empty lines, '::markup') and parse the result.
+
+    :param soup: BeautifulSoup object, or the raw HTML as str or bytes.
+    :param parser: Parser backend, see DomBuilder.parserBackend.
+    :param tags_to_remove: Removal rules (any form compile_rules accepts) the 'native' backend
+        already applies on the lxml tree.
+    """
+    if isinstance(soup, (bytes, bytearray)):
+        html_string = UnicodeDammit(bytes(soup), is_html=True).unicode_markup
+    elif isinstance(soup, str):
+        html_string = soup
+    else:
+        html_string = str(soup)
+
     # Remove HTML comments
-    html_string = str(soup)
     cleaned_html = clean_html_comments(html_string)
 
     # Clean empty lines
     cleaned_html = clean_empty_lines(cleaned_html)
     cleaned_html = re.sub(r'::markup', '', cleaned_html, flags=re.DOTALL)
 
+    if resolve_parser(parser) == NATIVE:
+        return native_parse_for_cleaning(cleaned_html, compile_rules(tags_to_remove))
 
     # Parse the cleaned HTML with BeautifulSoup
-    soup = BeautifulSoup(cleaned_html, 'html.parser')
-    # for data in soup(['nav', 'footer', 'header']):
-    #     # Remove tags
-    #     data.decompose()
- 
-
-    soup =  unwrap_tags(soup, tags = ['font'])
-    # for br_tag in soup.find_all('br'):
-    #     br_tag.unwrap()
-    # for br_tag in soup.find_all('hr'):
-    #     br_tag.unwrap()
-    # for text_node in soup.find_all(text=True):
-    #     text_node.replace_with(text_node.replace("&lrm;", "").replace("&rlm;", ""))
-
-
-    # subclasses = ['nav', 'dropdown', 'header','footer']
-    # for subclass in subclasses:
-    #     for matched_tag in soup.find_all(class_=lambda x: x and (subclass in x.split() or any(re.match(r'.*-' + subclass + r'\b', c) for c in x.split()) or any(re.match(subclass + r'.-*', c) for c in x.split()))):
-    #         matched_tag.decompose()
-    
-    wrap_header_and_siblings(soup)
-    # print(soup)
-    for script in soup.find_all('script'):
-        result = convert_script_to_html_node(script)
+    return parse_html(cleaned_html, parser)
+
+def compile_remove_rules(tags_to_remove, url=None):
+    """
+    Turn removal rules into a predicate tag -> bool with the semantics of remove_tags.
+
+    :param tags_to_remove: tags_to_remove dictionary, list of rule tuples, RuleSet or RuleProfiles.
+    :param url: Page URL, picks the domain profile of a RuleProfiles.
+    :return: A RuleSet; calling it with a tag counts the hit of the rule that removes it.
+    """
+    return compile_rules(tags_to_remove, url)
+
+def native_parse_for_cleaning(html_string, tags_to_remove, header_tags=HEADER_TAGS):
+    """
+    Parse with lxml and drop scripts without HTML and tags matching tags_to_remove on lxml's
+    own tree, so bs4 objects are only created for what survives.
+
+    Headers and everything around them are left to clean_html: header wrapping compares headers
+    by their markup, so neither a header nor anything inside one may disappear before it runs
+    (see collect_cleaning_targets). The result is identical to clean_html with the 'lxml' backend.
+
+    CSS selector rules can depend on siblings (':first-child', '+'), so when there are any, nothing
+    is dropped early and all removal is left to clean_html.
+
+    :param tags_to_remove: Compiled RuleSet.
+    """
+    import lxml.html
+    from lxml import etree
+
+    try:
+        root = lxml.html.document_fromstring(html_string)
+    except (etree.ParserError, ValueError):
+        # Empty or whitespace-only document
+        return parse_html(html_string, NATIVE)
+
+    def unwrapped_parent(element):
+        parent = element.getparent()
+        while parent is not None and parent.tag == 'font':
+            parent = parent.getparent()
+        return parent
+
+    # Unwrapping a font merges all adjacent strings of its parent, also across tags that are
+    # only removed afterwards, so nothing is dropped next to a font either
+    font_parents = {unwrapped_parent(font) for font in root.iter('font')}
+
+    rules = tags_to_remove
+    drops = {}
+    if rules.has_selectors:
+        return lxml_to_soup(root)
+    for element in root.iter(etree.Element):
+        if element.tag == 'font':
+            # Fonts are unwrapped by clean_html, never removed
+            continue
+        if element.tag == 'script':
+            drop = None if has_html_fragment(element.text or '') else 'script'
+        else:
+            drop = rules.match_attributes(element.tag, element.attrib)
+        if drop and next(element.iter(*header_tags), None) is None \
+                and next(element.iterancestors(*header_tags), None) is None \
+                and unwrapped_parent(element) not in font_parents:
+            drops[element] = drop
+
+    for element, label in drops.items():
+        # Only the outermost removed tag counts, as in clean_html
+        if label != 'script' and not any(ancestor in drops for ancestor in element.iterancestors()):
+            rules.record_hit(label)
+
+    return lxml_to_soup(root, drops)
+
+def lxml_to_soup(root, skip=()):
+    """
+    Turn an lxml tree into a BeautifulSoup tree by replaying it through the same callbacks bs4's
+    lxml builder uses, so the result is exactly what parsing the page with 'lxml' would give.
+
+    :param skip: Elements left out with their subtrees. The text around a skipped element stays
+        split in two strings, as it would after decomposing the element in bs4.
+    """
+    from lxml import etree
+
+    soup = parse_html('', NATIVE)
+    stack = [(root, False)]
+    while stack:
+        element, closing = stack.pop()
+        if closing:
+            soup.handle_endtag(element.tag)
+        elif element in skip:
+            soup.endData()
+        elif element.tag is etree.Comment:
+            soup.endData()
+            soup.handle_data(element.text or '')
+            soup.endData(Comment)
+        elif isinstance(element.tag, str):
+            soup.handle_starttag(element.tag, None, None, dict(element.attrib))
+            if element.text:
+                soup.handle_data(element.text)
+            stack.append((element, True))
+            stack.extend((child, False) for child in reversed(element))
+            continue
+        else:
+            # Processing instructions are dropped, the text after them is not
+            soup.endData()
+        if element.tail:
+            soup.handle_data(element.tail)
+    soup.endData()
+    return soup
+
+def collect_cleaning_targets(soup, should_remove, header_tags=HEADER_TAGS):
+    """
+    Walk the tree once, in document order, and collect what every cleaning rule acts on.
+
+    Fonts and headers are collected inside removed subtrees too: wrap_header_and_siblings skips
+    a header equal to one it already wrapped (bs4 tags compare and hash by their markup), so
+    those headers still influence what happens to the rest of the page.
+
+    :return: (fonts, headers, scripts, removals), each in document order. Removals only holds
+        the outermost tag of every removed subtree.
+    """
+    fonts, headers, scripts, removals = [], [], [], []
+    stack = [(child, False) for child in reversed(soup.contents) if isinstance(child, Tag)]
+    while stack:
+        tag, removed = stack.pop()
+        name = tag.name
+        if name == 'font':
+            # Unwrapped before any other rule runs, so it can never be removed itself
+            fonts.append(tag)
+        elif name == 'script':
+            if not removed:
+                scripts.append(tag)
+            continue
+        else:
+            if name in header_tags:
+                headers.append(tag)
+            if not removed and should_remove(tag):
+                removals.append(tag)
+                removed = True
+        stack.extend((child, removed) for child in reversed(tag.contents) if isinstance(child, Tag))
+    return fonts, headers, scripts, removals
+
+def collect_removals(nodes, should_remove):
+    """Removal targets inside freshly inserted nodes (e.g. HTML recovered from scripts)."""
+    removals = []
+    stack = [node for node in reversed(nodes) if isinstance(node, Tag)]
+    while stack:
+        tag = stack.pop()
+        if should_remove(tag):
+            removals.append(tag)
+            continue
+        stack.extend(child for child in reversed(tag.contents) if isinstance(child, Tag))
+    return removals
+
+def clean_html(soup, tags_to_remove=tags_to_remove, parser=None, url=None, boilerplate=None):
+    """
+    Clean a page before the tree is built.
+
+    Applies the same rules as the multi-pass reference in DomBuilder.benchmark, but collects the
+    targets of all structural rules (font unwrapping, header wrapping, script conversion, tag removal) in a single walk
+    and then edits only those nodes.
+
+    :param soup: BeautifulSoup object, or the raw HTML as str or bytes. Raw HTML is parsed only
+        once, so passing it directly is the cheapest way in.
+    :param tags_to_remove: Removal rules: a dictionary like tags_to_remove, a list of rule tuples,
+        a RuleSet or a RuleProfiles (see DomBuilder.removeRules).
+    :param parser: Parser backend, see DomBuilder.parserBackend.
+    :param url: URL of the page, picks the domain profile when tags_to_remove is a RuleProfiles.
+    :param boilerplate: Optional BoilerplateLearner; learns from the page or strips the subtrees
+        the site repeats on every page (needs url).
+    :return: The cleaned BeautifulSoup object.
+    """
+    should_remove = compile_remove_rules(tags_to_remove, url)
+    soup = parse_for_cleaning(soup, parser, should_remove)
+    if boilerplate is not None:
+        boilerplate.process(soup, url)
+
+    fonts, headers, scripts, removals = collect_cleaning_targets(soup, should_remove)
+
+    for font in fonts:
+        parent = font.parent
+        font.unwrap()
+        merge_adjacent_strings(parent)
+
+    for container in wrap_header_and_siblings(soup, headers=headers):
+        # A rule on 'div' also applies to the new containers
+        if should_remove(container):
+            removals.append(container)
+
+    for script in scripts:
+        result = convert_script_to_html_node(script, parser)
         if result:
+            inserted = list(result.contents)
             # Remove the <script> tag and insert the new content in its place
-            script.insert_before(result)  # Insert the new content before the <script> tag
-        script.decompose()  # Remove the <script> tag completely
+            script.insert_before(result)
+            removals.extend(collect_removals(inserted, should_remove))
+        script.decompose()
 
-    if tags_to_remove:
-        soup = remove_tags(soup, tags_to_remove)
+    for tag in removals:
+        # Tags inside an already removed subtree are destroyed with it
+        if not tag.decomposed:
+            tag.decompose()
 
     process_tags_with_mixed_content(soup)
-    html_string = str(soup)
 
-    cleaned_html = clean_empty_lines(html_string)
-
-
-    # Parse the cleaned HTML with BeautifulSoup
-    soup = BeautifulSoup(cleaned_html, 'html.parser')
+    # Equivalent of serializing, cleaning empty lines and parsing again
+    normalize_text_nodes(soup)
 
     return soup
@@ -0,0 +1,444 @@
+"""
+Compact, array-backed storage for HTMLTree.tree.
+
+A treelib Tree keeps every node as an object with its own attribute dictionary, predecessor and
+successor dictionaries and identifier string. CompactTree keeps the same nodes in parallel arrays
+(parent, first child, next sibling, depth, node number, tag) with the texts, identifiers and
+hrefs of all nodes in one shared UTF-8 buffer each, which takes a small fraction of the memory. It is
+meant for batch jobs that hold many trees at once:
+
+    tree = HTMLTree.from_html(html, compact=True)
+    tree.get_string_tree()
+
+Nodes are stored in pre-order, so the nodes of a subtree are contiguous. CompactTree answers the
+read-only part of the treelib API (get_node, children, parent, all_nodes, show, ...) with
+CompactNode views that have the attributes of a SoupNode; it cannot be edited.
+
+A CompactTree is also a compact binary format (to_bytes / save), so built trees can be cached or
+sent to other processes and loaded without rebuilding them. Loading does not copy or decode the
+arrays and texts; with load(path, mmap=True) they are read from the memory-mapped file on access:
+
+    tree.save('page.tree')
+    tree = CompactTree.load('page.tree', mmap=True)
+
+The file starts with MAGIC, the format version and the length of a JSON header describing the
+sections that follow (arrays in native byte order, UTF-8 text buffers), each aligned to 8 bytes.
+"""
+import json
+import mmap as mmap_module
+import struct
+import sys
+from array import array
+
+# Index of a missing parent, child or sibling
+NO_NODE = -1
+
+# Ends each href of a node in CompactTree.hrefs_buffer
+HREF_END = '\x00'
+
+MAGIC = b'HTMLTREE'
+FORMAT_VERSION = 1
+# Version and JSON header length, after MAGIC
+_PREAMBLE = struct.Struct('<II')
+_ALIGNMENT = 8
+
+# Sections of the binary format: attribute -> array typecode ('B' also for the UTF-8 buffers)
+SECTIONS = {
+    'parents': 'i',
+    'first_children': 'i',
+    'next_siblings': 'i',
+    'depths': 'i',
+    'numbers': 'i',
+    'tag_ids': 'H',
+    'repetitive': 'B',
+    'text_offsets': 'I',
+    'identifier_offsets': 'I',
+    'hrefs_offsets': 'I',
+    'text_buffer': 'B',
+    'identifier_buffer': 'B',
+    'hrefs_buffer': 'B',
+}
+
+LINE_TYPES = {
+    'ascii': ('|', '|-- ', '+-- '),
+    'ascii-ex': ('│', '├── ', '└── '),
+}
+
+
+class CompactNode:
+    """
+    View of one node of a CompactTree, with the attributes of a SoupNode.
+
+    Views are created on access and hold nothing but the tree and the node's position.
+    """
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def identifier(self):
+        return self.tree.identifier_of(self.index)
+
+    @property
+    def number(self):
+        return self.tree.numbers[self.index]
+
+    @property
+    def text(self):
+        return self.tree.text_of(self.index)
+
+    @property
+    def tag(self):
+        return self.tree.tag_names[self.tree.tag_ids[self.index]]
+
+    @property
+    def hrefs(self):
+        return self.tree.hrefs_of(self.index)
+
+    @property
+    def is_repetitive_node(self):
+        return bool(self.tree.repetitive[self.index])
+
+    @property
+    def depth(self):
+        return self.tree.depths[self.index]
+
+    @property
+    def parent(self):
+        parent = self.tree.parents[self.index]
+        return None if parent == NO_NODE else CompactNode(self.tree, parent)
+
+    def is_leaf(self):
+        return self.tree.first_children[self.index] == NO_NODE
+
+    def traverse_up(self, level_distance):
+        """
+        Traverse up the tree to find an ancestor at a given level distance.
+        """
+        index = self.index
+        parents = self.tree.parents
+        while level_distance and parents[index] != NO_NODE:
+            index = parents[index]
+            level_distance -= 1
+        return CompactNode(self.tree, index)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNode) and other.tree is self.tree and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __lt__(self, other):
+        # Like treelib's Node, which sorts by tag
+        return self.tag < other.tag
+
+    def __repr__(self):
+        return f"<SoupNode tag={self.tag}, id={self.identifier}, text={self.text[:30]}...>"
+
+
+class CompactTree:
+    """
+    Read-only tree of SoupNode data in parallel arrays.
+
+    Build it from a treelib Tree of SoupNodes with from_tree, or load a saved one. Nodes are
+    addressed by position (index) internally and by identifier through the treelib-style
+    methods; looking up an identifier builds a dictionary of all identifiers on first use.
+
+    Loaded trees hold memoryviews of the loaded bytes or mapped file instead of arrays.
+    """
+
+    def __init__(self):
+        self.parents = array('i')
+        self.first_children = array('i')
+        self.next_siblings = array('i')
+        self.depths = array('i')
+        self.numbers = array('i')
+        self.tag_ids = array('H')
+        self.tag_names = []
+        self.repetitive = bytearray()
+        # UTF-8; node i owns buffer[offsets[i]:offsets[i + 1]]
+        self.text_buffer = b''
+        self.text_offsets = array('I', [0])
+        self.identifier_buffer = b''
+        self.identifier_offsets = array('I', [0])
+        self.hrefs_buffer = b''
+        self.hrefs_offsets = array('I', [0])
+        # index -> CSS path, for the nodes whose identifier is not their CSS path (the title root)
+        self.css_path_overrides = {}
+        # JSON-serializable data saved along with the tree (e.g. HTMLTree's structured data)
+        self.metadata = {}
+        self._positions = None
+
+    @classmethod
+    def from_tree(cls, tree, number_csspath_mapping=None):
+        """
+        Copy a treelib Tree of SoupNodes.
+
+        :param tree: The treelib Tree, e.g. HTMLTree.tree.
+        :param number_csspath_mapping: NodeIdentifier.number_csspath_mapping, so that get_csspath
+            also answers for nodes whose identifier is not their CSS path.
+        """
+        compact = cls()
+        if tree.root is None:
+            return compact
+        tag_ids = {}
+        texts = []
+        identifiers = []
+        hrefs = []
+        last_children = []
+        # (node, parent index, depth); children are pushed reversed so they are stored in order
+        stack = [(tree[tree.root], NO_NODE, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            index = len(compact.parents)
+            compact.parents.append(parent)
+            compact.first_children.append(NO_NODE)
+            compact.next_siblings.append(NO_NODE)
+            last_children.append(NO_NODE)
+            compact.depths.append(depth)
+            number = getattr(node, 'number', 0)
+            compact.numbers.append(number)
+            if node.tag not in tag_ids:
+                tag_ids[node.tag] = len(compact.tag_names)
+                compact.tag_names.append(node.tag)
+            compact.tag_ids.append(tag_ids[node.tag])
+            compact.repetitive.append(1 if getattr(node, 'is_repetitive_node', False) else 0)
+
+            text = (node.text or '').encode('utf-8')
+            texts.append(text)
+            compact.text_offsets.append(compact.text_offsets[-1] + len(text))
+            identifier = node.identifier.encode('utf-8')
+            identifiers.append(identifier)
+            compact.identifier_offsets.append(compact.identifier_offsets[-1] + len(identifier))
+            node_hrefs = ''.join(href + HREF_END for href in getattr(node, 'hrefs', ())).encode('utf-8')
+            hrefs.append(node_hrefs)
+            compact.hrefs_offsets.append(compact.hrefs_offsets[-1] + len(node_hrefs))
+            if number_csspath_mapping and number_csspath_mapping.get(number, node.identifier) != node.identifier:
+                compact.css_path_overrides[index] = number_csspath_mapping[number]
+
+            if parent != NO_NODE:
+                if last_children[parent] == NO_NODE:
+                    compact.first_children[parent] = index
+                else:
+                    compact.next_siblings[last_children[parent]] = index
+                last_children[parent] = index
+            stack.extend((child, index, depth + 1) for child in reversed(tree.children(node.identifier)))
+
+        compact.text_buffer = b''.join(texts)
+        compact.identifier_buffer = b''.join(identifiers)
+        compact.hrefs_buffer = b''.join(hrefs)
+        return compact
+
+    # Binary format
+
+    def to_bytes(self):
+        """The tree (and its metadata) in the binary format."""
+        sections = {}
+        chunks = []
+        offset = 0
+        for name, typecode in SECTIONS.items():
+            data = memoryview(getattr(self, name)).tobytes()
+            sections[name] = [typecode, array(typecode).itemsize, offset, len(data)]
+            padding = -len(data) % _ALIGNMENT
+            chunks.append(data + b'\0' * padding)
+            offset += len(data) + padding
+        header = json.dumps({
+            'nodes': len(self),
+            'byteorder': sys.byteorder,
+            'tag_names': self.tag_names,
+            'css_path_overrides': {str(index): path for index, path in self.css_path_overrides.items()},
+            'metadata': self.metadata,
+            'sections': sections,
+        }).encode('utf-8')
+        header += b' ' * (-(len(MAGIC) + _PREAMBLE.size + len(header)) % _ALIGNMENT)
+        return b''.join([MAGIC, _PREAMBLE.pack(FORMAT_VERSION, len(header)), header] + chunks)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Load a tree from the binary format without copying it.
+
+        :param data: bytes, mmap or anything else supporting the buffer protocol; it is kept
+            alive by the tree.
+        :raise ValueError: When the data is not a tree in a supported version of the format.
+        """
+        view = memoryview(data)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a saved HTMLTree / CompactTree")
+        version, header_length = _PREAMBLE.unpack_from(view, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tree format version {version}, expected {FORMAT_VERSION}")
+        start = len(MAGIC) + _PREAMBLE.size
+        header = json.loads(bytes(view[start:start + header_length]))
+        start += header_length
+
+        compact = cls()
+        compact.tag_names = header['tag_names']
+        compact.css_path_overrides = {int(index): path for index, path in header['css_path_overrides'].items()}
+        compact.metadata = header['metadata']
+        swap = header['byteorder'] != sys.byteorder
+        for name, (typecode, itemsize, offset, length) in header['sections'].items():
+            section = view[start + offset:start + offset + length]
+            if typecode == 'B':
+                value = section
+            elif array(typecode).itemsize != itemsize:
+                raise ValueError(f"Section {name} was saved with {itemsize} byte items, "
+                                 f"this platform uses {array(typecode).itemsize}")
+            elif swap:
+                # Saved on a machine with the other byte order: copy and convert
+                value = array(typecode, section.tobytes())
+                value.byteswap()
+            else:
+                value = section.cast(typecode)
+            setattr(compact, name, value)
+        return compact
+
+    def save(self, path):
+        with open(path, 'wb') as handle:
+            handle.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Load a saved tree.
+
+        :param mmap: Map the file read-only instead of reading it; nodes are then read from the
+            page cache on access and processes loading the same file share its memory.
+        """
+        with open(path, 'rb') as handle:
+            if mmap:
+                # The mapping stays valid after the file is closed
+                return cls.from_bytes(mmap_module.mmap(handle.fileno(), 0, access=mmap_module.ACCESS_READ))
+            return cls.from_bytes(handle.read())
+
+    def __reduce__(self):
+        # Pickle (e.g. for multiprocessing) as the binary format
+        return self.__class__.from_bytes, (self.to_bytes(),)
+
+    # Access by position
+
+    def __len__(self):
+        return len(self.parents)
+
+    def text_of(self, index):
+        return str(self.text_buffer[self.text_offsets[index]:self.text_offsets[index + 1]], 'utf-8')
+
+    def identifier_of(self, index):
+        return str(self.identifier_buffer[self.identifier_offsets[index]:self.identifier_offsets[index + 1]], 'utf-8')
+
+    def hrefs_of(self, index):
+        hrefs = str(self.hrefs_buffer[self.hrefs_offsets[index]:self.hrefs_offsets[index + 1]], 'utf-8')
+        return hrefs.split(HREF_END)[:-1]
+
+    def child_indexes(self, index):
+        child = self.first_children[index]
+        while child != NO_NODE:
+            yield child
+            child = self.next_siblings[child]
+
+    def subtree_end(self, index):
+        """Position after the last node of the subtree of `index` (subtrees are contiguous)."""
+        depth = self.depths[index]
+        end = index + 1
+        while end < len(self.depths) and self.depths[end] > depth:
+            end += 1
+        return end
+
+    def node(self, index):
+        return CompactNode(self, index)
+
+    def position(self, nid):
+        """Position of the node with identifier `nid`, or None."""
+        if self._positions is None:
+            self._positions = {self.identifier_of(index): index for index in range(len(self))}
+        return self._positions.get(nid)
+
+    def get_csspath(self, number):
+        """CSS path of the node with a given number, like NodeIdentifier.get_csspath."""
+        # Nodes are numbered in the order they are stored, so this nearly always hits at once
+        index = number - 1
+        if not 0 <= index < len(self) or self.numbers[index] != number:
+            index = next((position for position, found in enumerate(self.numbers) if found == number), None)
+            if index is None:
+                raise KeyError(number)
+        return self.css_path_overrides.get(index) or self.identifier_of(index)
+
+    # treelib API
+
+    @property
+    def root(self):
+        return self.identifier_of(0) if len(self) else None
+
+    def size(self):
+        return len(self)
+
+    def contains(self, nid):
+        return self.position(nid) is not None
+
+    __contains__ = contains
+
+    def get_node(self, nid):
+        index = self.position(nid)
+        return None if index is None else CompactNode(self, index)
+
+    def __getitem__(self, nid):
+        index = self.position(nid)
+        if index is None:
+            raise KeyError(f"Node '{nid}' is not in the tree")
+        return CompactNode(self, index)
+
+    def parent(self, nid):
+        return self[nid].parent
+
+    def children(self, nid):
+        return [CompactNode(self, child) for child in self.child_indexes(self[nid].index)]
+
+    def is_branch(self, nid):
+        return [self.identifier_of(child) for child in self.child_indexes(self[nid].index)]
+
+    def level(self, nid):
+        return self[nid].depth
+
+    def all_nodes(self):
+        return [CompactNode(self, index) for index in range(len(self))]
+
+    def all_nodes_itr(self):
+        return (CompactNode(self, index) for index in range(len(self)))
+
+    def leaves(self, nid=None):
+        start = 0 if nid is None else self[nid].index
+        return [CompactNode(self, index) for index in range(start, self.subtree_end(start))
+                if self.first_children[index] == NO_NODE]
+
+    def show(self, nid=None, line_type='ascii-ex', stdout=True, sorting=True):
+        """
+        Print the tags of the tree like treelib's Tree.show (children sorted by tag unless
+        sorting is False), or return the text when stdout is False.
+        """
+        if not len(self):
+            print("Tree is empty")
+            return None
+        vertical, box, corner = LINE_TYPES[line_type]
+        lines = []
+        # (index, leading, connector)
+        stack = [(0 if nid is None else self[nid].index, '', '')]
+        while stack:
+            index, leading, connector = stack.pop()
+            lines.append(leading + connector + self.tag_names[self.tag_ids[index]])
+            if connector:
+                leading += ' ' * 4 if connector == corner else vertical + ' ' * 3
+            children = list(self.child_indexes(index))
+            if sorting:
+                children.sort(key=lambda child: self.tag_names[self.tag_ids[child]])
+            for position in range(len(children) - 1, -1, -1):
+                stack.append((children[position], leading, corner if position == len(children) - 1 else box))
+        text = '\n'.join(lines) + '\n'
+        if stdout:
+            print(text)
+            return None
+        return text
+
+    def __repr__(self):
+        return f"<CompactTree nodes={len(self)}>"
@@ -173,6 +173,7 @@
 import bs4
 from bs4 import BeautifulSoup
 import re
+from bisect import bisect_left
 def is_single_row_or_column_table(table):
     """
     Checks if an HTML table has only one row or one column.
@@ -211,10 +212,15 @@ def get_element(node):
 from bs4 import NavigableString
 
 
-def isSingleTextNode(node):
+def isSingleTextNode(node, index=None):
     """Check if a node contains only one direct text child (not wrapped inside another tag)."""
     if not isinstance(node, Tag):
         return None
+    if index is not None:
+        count, length = index.string_stats(node)
+        if count == 1 and length > 2:
+            return True
+        return None
     text_nodes = [child.strip() for child in node.stripped_strings]
     if len(text_nodes) == 1 and len(text_nodes[0]) > 2:
         return True
@@ -234,8 +240,19 @@ def cleanText(input_string):
     # print(cleaned_string)
 
     return cleaned_string
-def find_smallest_parent_with_extra_text(node):
+
+
+def estimate_tokens(text):
+    """Rough token count of a text, about 4 characters per token like Pruner.estimate_tokens."""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def find_smallest_parent_with_extra_text(node, index=None):
     # Find the first parent of the node that contains at least one text node
+    if index is not None:
+        return index.smallest_parent_with_extra_text(node)
     parent_with_text = node.find_parent(lambda x: x.name and x.find(text=True) and x.get_text(strip=True) != node.get_text(strip=True))
 
     return parent_with_text
@@ -279,16 +296,109 @@ def find_before_nearest_text_node(node):
                 previous = None
         return None
             
-def get_css_path(target_node):
+class CssPathIndex:
+    """
+    The CSS paths get_css_path returns, for every tag of a document, from a single walk over it.
+
+    get_css_path counts the preceding sibling tags of the node and of every ancestor again for
+    each node it is called for. Here every tag's nth-child selector is computed once, and a path
+    is its parent's (cached) path plus its own selector.
+
+    The index describes the tree as it was when it was built; build a new one after tags were
+    inserted, moved or removed.
+    """
+
+    def __init__(self, soup):
+        self.elements = {}
+        self.paths = {}
+        stack = [soup]
+        while stack:
+            tag = stack.pop()
+            position = 0
+            for child in tag.contents:
+                if isinstance(child, bs4.Tag):
+                    position += 1
+                    self.elements[id(child)] = '%s:nth-child(%s)' % (child.name, position) if position > 1 else child.name
+                    stack.append(child)
+
+    def element(self, tag):
+        element = self.elements.get(id(tag))
+        return element if element is not None else get_element(tag)
+
+    def path(self, target_node):
+        """Same result as get_css_path(target_node)."""
+        if not isinstance(target_node, bs4.Tag):
+            # Text nodes have the path of their parent
+            parent = target_node.parent
+            if parent is None or parent.name == "[document]":
+                return ''
+            return self.path(parent)
+
+        # Climb to the nearest ancestor with a known path, then build the paths back down
+        chain = []
+        node = target_node
+        while node is not None and node.name != "[document]" and id(node) not in self.paths:
+            chain.append(node)
+            node = node.parent
+        prefix = self.paths.get(id(node), '') if node is not None else ''
+        for tag in reversed(chain):
+            prefix = prefix + ' > ' + self.element(tag) if prefix else self.element(tag)
+            self.paths[id(tag)] = prefix
+        return self.paths[id(target_node)]
+
+
+class HrefIndex:
+    """
+    The hrefs below every tag of a document, as tag.find_all(href=True) lists them, from one walk.
+
+    Tags are numbered in document order, so the tags below a tag have consecutive numbers and its
+    hrefs are a slice of the hrefs of the whole document.
+    """
+
+    def __init__(self, soup):
+        # id(tag) -> (number of its first descendant, number after its last descendant)
+        self.ranges = {}
+        # Numbers of the tags with an href attribute, ascending, and their hrefs
+        self.numbers = []
+        self.values = []
+        count = 0
+        # (tag, None) before its descendants are numbered, (tag, first descendant number) after
+        stack = [(soup, None)]
+        while stack:
+            tag, start = stack.pop()
+            if start is not None:
+                self.ranges[id(tag)] = (start, count)
+                continue
+            if 'href' in tag.attrs:
+                self.numbers.append(count)
+                self.values.append(tag['href'])
+            count += 1
+            stack.append((tag, count))
+            stack.extend((child, None) for child in reversed(tag.contents) if isinstance(child, bs4.Tag))
+
+    def hrefs(self, tag):
+        """Same result as [element['href'] for element in tag.find_all(href=True)]."""
+        found = self.ranges.get(id(tag))
+        if found is None:
+            return [element['href'] for element in tag.find_all(href=True)]
+        start, end = found
+        return self.values[bisect_left(self.numbers, start):bisect_left(self.numbers, end)]
+
+
+def get_css_path(target_node, index=None):
     """
     Get the CSS path of a specific node in a BeautifulSoup parsed HTML document.
     
     Args:
         target_node (Tag): The target node whose CSS path is to be determined.
+        index (CssPathIndex, optional): Precomputed paths of the document; the path is then
+            looked up instead of walking all ancestors and their siblings.
     
     Returns:
         str: The CSS path of the target node.
     """
+    if index is not None:
+        return index.path(target_node)
     css_path = []
     if isinstance(target_node, bs4.Tag):
 
@@ -306,7 +416,7 @@ def get_css_path(target_node):
 
 from bs4 import Tag, NavigableString
 
-def isHeaderText(html_node):
+def isHeaderText(html_node, index=None):
     """
     Check if the HTML node is a header tag or directly contains a single header tag
     with only text as its content.
@@ -318,6 +428,8 @@ def isHeaderText(html_node):
         bool: True if the node is a header tag or directly contains exactly one header tag
               with matching text content, False otherwise.
     """
+    if index is not None:
+        return index.is_header_text(html_node)
     # If the node itself is a header tag with only text
     if html_node.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
         if html_node.text and html_node.text.strip():  # Check for non-empty string
@@ -342,15 +454,18 @@ def isHeaderText(html_node):
 
     return False
 
-def getHeaderNode(html_node):
+def getHeaderNode(html_node, index=None):
     """
     Finds the first tag that contains exactly one direct text node.
 
     :param html_node: BeautifulSoup Tag object
+    :param index: Optional TextIndex of the document to answer from.
     :return: First tag that contains only one direct text node, or None if not found.
     """
     if not isinstance(html_node, Tag):
         return None
+    if index is not None:
+        return index.header_node(html_node)
     header_text = html_node.fin
     for child in html_node.children:  # ✅ Only direct children (not all descendants)
         if isinstance(child, Tag):
@@ -364,4 +479,154 @@ def getHeaderNode(html_node):
             elif len(text_nodes) > 1:
                 return getHeaderNode(child)
 
-    return None
\ No newline at end of file
+    return None
+
+
+HEADER_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+
+class TextIndex:
+    """
+    Text statistics of every tag of a document, from one bottom-up walk.
+
+    The helpers above (isSingleTextNode, isHeaderText, getHeaderNode,
+    find_smallest_parent_with_extra_text) walk a subtree's strings or search it for headers on
+    every call, and tree building calls them for the same tags over and over. With an index they
+    answer from these statistics instead, with the same results:
+
+    - the number and total length of the tag's non-blank stripped strings, per string type, so
+      they can be counted the way the tag's get_text() would (scripts and templates count
+      other string types than normal tags);
+    - the number of header tags below it and the first one;
+    - its get_text(strip=True), computed on first use.
+
+    The statistics describe the tree as it was when they were computed, so the index is only
+    valid for a finished document: HTMLTree.build_tree creates it after clean_html is done, and
+    building only adds attributes. Tags inserted later are indexed on first use, but the entries
+    of tags whose subtree was edited are not updated; build a new index after editing the tree.
+    """
+
+    def __init__(self, soup):
+        # id(tag) -> (tag, {string type: [count, stripped length]}, header count, first header);
+        # holding the tag keeps its id from being reused
+        self.entries = {}
+        self.texts = {}
+        self._compute(soup)
+
+    def _compute(self, root):
+        stack = [(root, False)]
+        while stack:
+            tag, children_done = stack.pop()
+            if not children_done:
+                if id(tag) not in self.entries:
+                    stack.append((tag, True))
+                    stack.extend((child, False) for child in tag.contents if isinstance(child, Tag))
+                continue
+
+            strings = {}
+            headers = 0
+            first_header = None
+            for child in tag.contents:
+                if isinstance(child, Tag):
+                    _, child_strings, child_headers, child_first_header = self.entries[id(child)]
+                    for string_type, (count, length) in child_strings.items():
+                        entry = strings.get(string_type)
+                        if entry is None:
+                            strings[string_type] = [count, length]
+                        else:
+                            entry[0] += count
+                            entry[1] += length
+                    if child.name in HEADER_TAGS:
+                        headers += 1
+                        if first_header is None:
+                            first_header = child
+                    headers += child_headers
+                    if first_header is None:
+                        first_header = child_first_header
+                elif isinstance(child, NavigableString):
+                    stripped = child.strip()
+                    if stripped:
+                        entry = strings.get(type(child))
+                        if entry is None:
+                            strings[type(child)] = [1, len(stripped)]
+                        else:
+                            entry[0] += 1
+                            entry[1] += len(stripped)
+            self.entries[id(tag)] = (tag, strings, headers, first_header)
+
+    def _entry(self, tag):
+        entry = self.entries.get(id(tag))
+        if entry is None:
+            self._compute(tag)
+            entry = self.entries[id(tag)]
+        return entry
+
+    def string_stats(self, tag):
+        """len(list(tag.stripped_strings)) and the total length of those strings."""
+        types = tag.interesting_string_types
+        count = length = 0
+        for string_type, (type_count, type_length) in self._entry(tag)[1].items():
+            if string_type in types:
+                count += type_count
+                length += type_length
+        return count, length
+
+    def header_count(self, tag):
+        """len(tag.find_all(['h1', ..., 'h6']))"""
+        return self._entry(tag)[2]
+
+    def first_header(self, tag):
+        """tag.find(['h1', ..., 'h6'])"""
+        return self._entry(tag)[3]
+
+    def text(self, tag):
+        """tag.get_text(strip=True)"""
+        text = self.texts.get(id(tag))
+        if text is None:
+            text = self.texts[id(tag)] = tag.get_text(strip=True)
+        return text
+
+    def _same_text(self, ancestor, tag):
+        """
+        Whether ancestor.get_text(strip=True) == tag.get_text(strip=True), for a tag below the ancestor.
+
+        The ancestor's stripped strings include the tag's when both count the same string types,
+        so the texts are equal exactly when the ancestor has no other strings.
+        """
+        if ancestor.interesting_string_types != tag.interesting_string_types:
+            return self.text(ancestor) == self.text(tag)
+        return self.string_stats(ancestor)[0] == self.string_stats(tag)[0]
+
+    def is_header_text(self, html_node):
+        """isHeaderText(html_node)"""
+        if html_node.name in HEADER_TAGS and self.string_stats(html_node)[0]:
+            return True
+        if self.header_count(html_node) != 1:
+            return False
+        return self._same_text(html_node, self.first_header(html_node))
+
+    def header_node(self, html_node):
+        """getHeaderNode(html_node)"""
+        node = html_node
+        while isinstance(node, Tag):
+            for child in node.children:
+                if isinstance(child, Tag):
+                    if self.is_header_text(node):
+                        return node
+                    count = self.string_stats(child)[0]
+                    if count == 1:
+                        return child
+                    elif count > 1:
+                        node = child
+                        break
+            else:
+                return None
+        return None
+
+    def smallest_parent_with_extra_text(self, node):
+        """find_smallest_parent_with_extra_text(node)"""
+        for parent in node.parents:
+            # A parent whose text differs from the node's has a string, so find(text=True) holds
+            if parent.name and not self._same_text(parent, node):
+                return parent
+        return None
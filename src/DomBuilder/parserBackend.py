@@ -0,0 +1,85 @@
+"""
+Parser backends used to turn HTML into BeautifulSoup trees.
+
+- 'html.parser': the pure Python parser that ships with bs4; the historical default.
+- 'lxml': bs4 on top of lxml's C parser, several times faster.
+- 'html5lib': bs4 on top of html5lib, parses exactly like a browser but is the slowest.
+- 'native': cleans the page on lxml's own tree before any bs4 object exists (see
+  cleanHTML.native_parse_for_cleaning) and builds bs4 objects only for what survives. Outside
+  the cleaning stage it behaves like 'lxml'.
+
+Every function that parses HTML takes a `parser` argument; None means the process wide
+default, which can be changed with set_default_parser.
+"""
+from bs4 import BeautifulSoup, FeatureNotFound
+
+HTML_PARSER = 'html.parser'
+LXML = 'lxml'
+HTML5LIB = 'html5lib'
+NATIVE = 'native'
+
+PARSERS = (HTML_PARSER, LXML, HTML5LIB, NATIVE)
+
+_default_parser = HTML_PARSER
+
+
+def set_default_parser(parser):
+    """Set the backend used whenever no parser is passed explicitly."""
+    global _default_parser
+    _default_parser = resolve_parser(parser)
+
+
+def get_default_parser():
+    return _default_parser
+
+
+def resolve_parser(parser=None):
+    """Return the backend name to use for `parser` (None means the default)."""
+    if parser is None:
+        return _default_parser
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser backend {parser!r}, expected one of {', '.join(PARSERS)}")
+    return parser
+
+
+def bs4_builder(parser=None):
+    """The bs4 tree builder name behind a backend."""
+    parser = resolve_parser(parser)
+    return LXML if parser == NATIVE else parser
+
+
+def parse_html(markup, parser=None):
+    """Parse a whole document with the given backend."""
+    return BeautifulSoup(markup, bs4_builder(parser))
+
+
+def parse_fragment(markup, parser=None):
+    """
+    Parse an HTML fragment with the given backend.
+
+    lxml and html5lib wrap fragments in <html><body>; the wrappers are dropped so the result can
+    be inserted into another tree exactly like an html.parser fragment.
+    """
+    fragment = parse_html(markup, parser)
+    if bs4_builder(parser) == HTML_PARSER:
+        return fragment
+    contents = []
+    for wrapper in (fragment.head, fragment.body):
+        if wrapper is not None:
+            contents.extend(child.extract() for child in list(wrapper.contents))
+    fragment.clear()
+    for child in contents:
+        fragment.append(child)
+    return fragment
+
+
+def available_parsers():
+    """Backends whose libraries are installed."""
+    available = []
+    for parser in PARSERS:
+        try:
+            BeautifulSoup('', bs4_builder(parser))
+        except FeatureNotFound:
+            continue
+        available.append(parser)
+    return available
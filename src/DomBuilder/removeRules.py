@@ -0,0 +1,305 @@
+"""
+Compiled removal rules for clean_html.
+
+Rules can be given as the classic tags_to_remove dictionary ({'style': 'name', 'nav': ('name',
+'class')}) or as a list of tuples, which can also hold attribute and CSS selector rules:
+
+    rules = RuleSet([
+        ('name', 'style'),
+        ('name', 'nav'),
+        ('class', 'nav'),
+        ('attribute', 'aria-hidden', 'true'),
+        ('attribute', 'data-ad'),            # attribute present, any value
+        ('selector', 'div.sidebar > ul'),
+    ])
+    tree = HTMLTree.from_html(html, tags_to_remove=rules)
+
+Name, class and attribute rules are answered with set lookups, so a tag is checked against all
+of them at once however many rules there are; selectors are compiled once with soupsieve.
+Every rule counts the tags it removed, see RuleSet.stats.
+
+Per-site rules go into a RuleProfiles, which picks the rules for a page by its URL.
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+import soupsieve
+
+NAME = 'name'
+CLASS = 'class'
+ATTRIBUTE = 'attribute'
+SELECTOR = 'selector'
+
+RULE_KINDS = (NAME, CLASS, ATTRIBUTE, SELECTOR)
+
+# Time spent on the name, class and attribute lookups, which are shared by all those rules
+LOOKUPS = 'lookups'
+
+
+def _matches_attribute_value(value, expected):
+    if isinstance(value, list):
+        # Multi-valued attribute (rel, headers, ...) parsed by bs4
+        return expected in value or ' '.join(value) == expected
+    return value == expected
+
+
+def rule_label(rule):
+    """Readable name of a rule tuple, e.g. 'class:nav' or 'attribute:role=navigation'."""
+    kind = rule[0]
+    if kind == ATTRIBUTE:
+        return f'attribute:{rule[1]}' if rule[2] is None else f'attribute:{rule[1]}={rule[2]}'
+    return f'{kind}:{rule[1]}'
+
+
+def normalize_rules(rules):
+    """
+    Turn any supported rule description into a list of (kind, value) / ('attribute', name, value)
+    tuples without duplicates, keeping the order.
+    """
+    if rules is None:
+        return []
+    if isinstance(rules, RuleSet):
+        return list(rules.rules)
+    if isinstance(rules, dict):
+        # {word: kind or kinds}; attribute and selector rules need the tuple form
+        rules = [(kind, word) for word, kinds in rules.items()
+                 for kind in ((kinds,) if isinstance(kinds, str) else kinds)]
+
+    normalized = []
+    for rule in rules:
+        kind = rule[0]
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Unknown removal rule kind {kind!r}, expected one of {', '.join(RULE_KINDS)}")
+        if kind == ATTRIBUTE:
+            rule = (ATTRIBUTE, rule[1], rule[2] if len(rule) > 2 else None)
+        else:
+            rule = (kind, rule[1])
+        if rule not in normalized:
+            normalized.append(rule)
+    return normalized
+
+
+class RuleSet:
+    """
+    A set of removal rules compiled into a single matcher.
+
+    Calling the rule set with a bs4 Tag tells whether the tag is removed; match_attributes does the
+    same for anything that is not a bs4 Tag (lxml elements, start tags read by a tokenizer) but
+    cannot evaluate selectors.
+
+    :param rules: tags_to_remove dictionary, list of rule tuples or another RuleSet.
+    :param timed: Also measure the time spent matching (costs two clock reads per tag).
+
+    A rule set can be shared by threads cleaning pages in parallel; its counters are updated
+    under a lock.
+    """
+
+    def __init__(self, rules=None, timed=False):
+        self.rules = normalize_rules(rules)
+        self.timed = timed
+        self.names = {}
+        self.classes = {}
+        # attribute name -> {value or None: label}
+        self.attributes = {}
+        self.selectors = []
+        for rule in self.rules:
+            label = rule_label(rule)
+            kind = rule[0]
+            if kind == NAME:
+                self.names[rule[1]] = label
+            elif kind == CLASS:
+                self.classes[rule[1]] = label
+            elif kind == ATTRIBUTE:
+                self.attributes.setdefault(rule[1], {})[rule[2]] = label
+            else:
+                self.selectors.append((label, soupsieve.compile(rule[1])))
+        self.hits = dict.fromkeys([rule_label(rule) for rule in self.rules], 0)
+        self.seconds = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_selectors(self):
+        return bool(self.selectors)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match_attributes(self, name, attributes):
+        """
+        The label of the first name, class or attribute rule matching a tag, or None.
+
+        :param name: Tag name.
+        :param attributes: Mapping with a get() method (bs4 attrs, lxml attrib, dict).
+        """
+        label = self.names.get(name)
+        if label is not None:
+            return label
+        if self.classes:
+            tag_classes = attributes.get('class')
+            if tag_classes:
+                if isinstance(tag_classes, str):
+                    # Like find_all(class_=...): the whole attribute or any single class matches
+                    tag_classes = [tag_classes] + tag_classes.split()
+                for word in tag_classes:
+                    label = self.classes.get(word)
+                    if label is not None:
+                        return label
+        for attribute, values in self.attributes.items():
+            value = attributes.get(attribute)
+            if value is None:
+                continue
+            if None in values:
+                return values[None]
+            for expected, label in values.items():
+                if _matches_attribute_value(value, expected):
+                    return label
+        return None
+
+    def match(self, tag):
+        """The label of the first rule matching a bs4 Tag, or None. Hits are not counted."""
+        if not self.timed:
+            label = self.match_attributes(tag.name, tag.attrs)
+            if label is None:
+                for selector_label, selector in self.selectors:
+                    if selector.match(tag):
+                        return selector_label
+            return label
+
+        start = time.perf_counter()
+        label = self.match_attributes(tag.name, tag.attrs)
+        now = time.perf_counter()
+        self._add_seconds(LOOKUPS, now - start)
+        if label is None:
+            for selector_label, selector in self.selectors:
+                start = now
+                matched = selector.match(tag)
+                now = time.perf_counter()
+                self._add_seconds(selector_label, now - start)
+                if matched:
+                    return selector_label
+        return label
+
+    def _add_seconds(self, label, seconds):
+        with self._lock:
+            self.seconds[label] = self.seconds.get(label, 0.0) + seconds
+
+    def __call__(self, tag):
+        """Whether a bs4 Tag is removed; counts the hit of the rule that removes it."""
+        label = self.match(tag)
+        if label is None:
+            return False
+        self.record_hit(label)
+        return True
+
+    def record_hit(self, label):
+        with self._lock:
+            self.hits[label] = self.hits.get(label, 0) + 1
+
+    def stats(self):
+        """
+        Hit count of every rule, and the time it took when the rule set is timed.
+
+        Name, class and attribute rules are answered by shared lookups; their time is reported
+        once, under 'lookups'.
+
+        :return: List of dicts (rule, hits, ms) in rule order, followed by the lookups row.
+        """
+        with self._lock:
+            hits = dict(self.hits)
+            seconds = dict(self.seconds)
+        rows = [{'rule': label, 'hits': count, 'ms': seconds.get(label, 0.0) * 1000}
+                for label, count in hits.items()]
+        if self.timed:
+            rows.append({'rule': LOOKUPS, 'hits': sum(hits[label] for label in hits
+                                                     if not label.startswith(SELECTOR + ':')),
+                         'ms': seconds.get(LOOKUPS, 0.0) * 1000})
+        return rows
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = dict.fromkeys(self.hits, 0)
+            self.seconds = {}
+
+    def extended(self, rules):
+        """A new RuleSet with `rules` added to these."""
+        return RuleSet(self.rules + normalize_rules(rules), timed=self.timed)
+
+    def __repr__(self):
+        return f"<RuleSet rules={len(self.rules)}, selectors={len(self.selectors)}>"
+
+
+class RuleProfiles:
+    """
+    Removal rules per site.
+
+    A page gets the default rules plus the rules of the most specific domain profile its host
+    belongs to ('example.com' also covers 'www.example.com' and 'blog.example.com'). Every
+    combination is compiled once and reused, so its stats add up over all pages of the site.
+
+    :param default: Rules for every page (tags_to_remove dictionary, rule tuples or RuleSet).
+    :param domains: Mapping domain -> extra rules.
+    :param inherit: Whether domain profiles add to the default rules (True) or replace them.
+    """
+
+    def __init__(self, default=None, domains=None, inherit=True, timed=False):
+        self.default = RuleSet(default, timed=timed)
+        self.domains = {domain.lower().lstrip('.'): normalize_rules(rules) for domain, rules in (domains or {}).items()}
+        self.inherit = inherit
+        self.timed = timed
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def add_domain(self, domain, rules):
+        domain = domain.lower().lstrip('.')
+        with self._lock:
+            self.domains[domain] = self.domains.get(domain, []) + normalize_rules(rules)
+            self._compiled.pop(domain, None)
+
+    def profile_for_host(self, host):
+        """The domain profile covering `host`, or None."""
+        host = (host or '').lower()
+        while host:
+            if host in self.domains:
+                return host
+            _, _, host = host.partition('.')
+        return None
+
+    def for_url(self, url):
+        """The compiled RuleSet for a page."""
+        domain = self.profile_for_host(urlparse(url).hostname) if url else None
+        if domain is None:
+            return self.default
+        with self._lock:
+            # Compiled once even when several threads clean pages of the site, so no hits are lost
+            if domain not in self._compiled:
+                rules = self.default.rules + self.domains[domain] if self.inherit else self.domains[domain]
+                self._compiled[domain] = RuleSet(rules, timed=self.timed)
+            return self._compiled[domain]
+
+    def stats(self):
+        """RuleSet.stats of the default rules and of every domain profile used so far."""
+        profiles = {'default': self.default.stats()}
+        with self._lock:
+            compiled = list(self._compiled.items())
+        for domain, rule_set in compiled:
+            profiles[domain] = rule_set.stats()
+        return profiles
+
+
+def compile_rules(rules, url=None):
+    """
+    The RuleSet to use for a page.
+
+    :param rules: RuleSet (used as is, so its stats accumulate), RuleProfiles, tags_to_remove
+        dictionary or list of rule tuples.
+    :param url: Page URL, used to pick the domain profile of a RuleProfiles.
+    """
+    if isinstance(rules, RuleSet):
+        return rules
+    if isinstance(rules, RuleProfiles):
+        return rules.for_url(url)
+    return RuleSet(rules)
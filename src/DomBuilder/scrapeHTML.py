@@ -1,14 +1,215 @@
+import asyncio
+import functools
+import queue
+import threading
+import time
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+from .parserBackend import parse_html
 
-def fetch_and_parse(url):
+def fetch_and_parse(url, blocking_profile=None, blocking_stats=None, cache=None, archive=None, parser=None):
+    """
+    Render a URL with Chromium and parse it.
+
+    :param blocking_profile: Optional BlockingProfile (see webScraper.resource_blocking); blocked
+        sub-resources are never downloaded.
+    :param blocking_stats: Optional BlockingStats filled with what the profile blocked on this page.
+    :param cache: Optional PageCache; fresh or unchanged pages are served without launching a browser.
+    :param archive: Optional ArchiveWriter the rendered page is recorded to.
+    :param parser: Parser backend, see DomBuilder.parserBackend.
+    """
+    html_content = fetch_html(url, blocking_profile, blocking_stats, cache, archive)
+    # Parse the HTML content with Beautiful Soup
+    return parse_html(html_content, parser)
+
+
+def fetch_html(url, blocking_profile=None, blocking_stats=None, cache=None, archive=None):
+    """
+    Like fetch_and_parse, but return the rendered HTML string without parsing it.
+
+    Use this with HTMLTree.from_html so the page is only parsed once.
+    """
+    def render(page_url):
+        return _render_page(page_url, blocking_profile, blocking_stats, archive)
+
+    return cache.fetch(url, render) if cache else render(url)
+
+
+def _render_page(url, blocking_profile=None, blocking_stats=None, archive=None):
     with sync_playwright() as p:
+        start = time.monotonic()
         browser = p.chromium.launch()
         page = browser.new_page()
-        page.goto(url)
+        if blocking_profile:
+            blocking_profile.attach(page, blocking_stats)
+        response = page.goto(url)
         # Retrieve the page content
         html_content = page.content()
-        # Parse the HTML content with Beautiful Soup
-        soup = BeautifulSoup(html_content, 'html.parser')
+        if archive:
+            archive.write(url, html_content, final_url=page.url,
+                          headers=response.headers if response else None,
+                          timing={'elapsed_ms': (time.monotonic() - start) * 1000})
         browser.close()
-        return soup
+        return html_content
+
+
+class FetchResult:
+    """Outcome of fetching one URL in a batch: a soup (or raw html) or the error that stopped it."""
+
+    def __init__(self, url, soup=None, error=None, elapsed_ms=0.0, blocking_stats=None, html=None):
+        self.url = url
+        self.soup = soup
+        self.html = html
+        self.error = error
+        self.elapsed_ms = elapsed_ms
+        self.blocking_stats = blocking_stats
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = 'ok' if self.ok else f'error={self.error!r}'
+        return f"<FetchResult url={self.url}, {status}, elapsed_ms={self.elapsed_ms:.0f}>"
+
+
+async def _fetch_in_context(browser, url, timeout, blocking_profile=None, blocking_stats=None):
+    """Render one URL in its own isolated browser context; return (html, final_url, response headers)."""
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        if blocking_profile:
+            await blocking_profile.attach_async(page, blocking_stats)
+        response = await page.goto(url, timeout=timeout * 1000)
+        html = await page.content()
+        return html, page.url, (response.headers if response else None)
+    finally:
+        await context.close()
+
+
+async def fetch_many_async(urls, concurrency=8, timeout=30, stop_event=None, blocking_profile=None, archive=None,
+                           raw=False, parser=None):
+    """
+    Fetch many URLs with one shared Chromium, yielding FetchResult objects as they complete.
+
+    :param urls: Iterable of URLs; it is consumed lazily, so it may be a generator.
+    :param concurrency: Number of pages rendered in parallel.
+    :param timeout: Per-page timeout in seconds.
+    :param stop_event: Optional threading.Event that stops the batch early when set.
+    :param blocking_profile: Optional BlockingProfile applied to every page; the per-page
+        BlockingStats end up on FetchResult.blocking_stats.
+    :param archive: Optional ArchiveWriter every successfully rendered page is recorded to.
+    :param raw: Return the rendered HTML in FetchResult.html instead of parsing it into a soup.
+    :param parser: Parser backend used for the soups, see DomBuilder.parserBackend.
+
+    At most `concurrency` finished results wait for the consumer; workers stop taking URLs while
+    the queue is full, so a slow consumer holds the batch back instead of growing memory.
+    """
+    url_iter = iter(urls)
+    results = asyncio.Queue(maxsize=max(1, concurrency))
+    loop = asyncio.get_running_loop()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        relaunch_lock = asyncio.Lock()
+
+        async def current_browser():
+            nonlocal browser
+            async with relaunch_lock:
+                if not browser.is_connected():
+                    browser = await p.chromium.launch()
+                return browser
+
+        async def worker():
+            for url in url_iter:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                start = time.monotonic()
+                stats = blocking_profile.new_stats() if blocking_profile else None
+                try:
+                    html, final_url, headers = await asyncio.wait_for(
+                        _fetch_in_context(await current_browser(), url, timeout, blocking_profile, stats), timeout + 5)
+                    if archive:
+                        # Compressing and writing the record blocks; keep it off the event loop too
+                        await loop.run_in_executor(None, functools.partial(
+                            archive.write, url, html, final_url=final_url, headers=headers,
+                            timing={'elapsed_ms': (time.monotonic() - start) * 1000}))
+                    if raw:
+                        result = FetchResult(url, html=html)
+                    else:
+                        # Parsing is CPU bound; keep it off the event loop so other pages progress
+                        soup = await loop.run_in_executor(None, parse_html, html, parser)
+                        result = FetchResult(url, soup=soup)
+                except Exception as e:
+                    result = FetchResult(url, error=e)
+                result.blocking_stats = stats
+                result.elapsed_ms = (time.monotonic() - start) * 1000
+                await results.put(result)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+        finished = asyncio.ensure_future(asyncio.gather(*workers))
+        try:
+            while not (finished.done() and results.empty()):
+                getter = asyncio.ensure_future(results.get())
+                await asyncio.wait([getter, finished], return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+        finally:
+            # asyncio.wait_for may swallow a cancellation that races with the page finishing,
+            # so keep cancelling until every worker is gone
+            while not finished.done():
+                for task in workers:
+                    task.cancel()
+                await asyncio.wait([finished], timeout=0.1)
+            await asyncio.gather(finished, return_exceptions=True)
+            await browser.close()
+
+
+def fetch_many(urls, concurrency=8, timeout=30, blocking_profile=None, archive=None, raw=False, parser=None):
+    """
+    Synchronous wrapper around fetch_many_async.
+
+    Runs the event loop in a background thread and yields FetchResult objects in completion
+    order. Failures and timeouts are reported per URL and never abort the batch.
+    """
+    results = queue.Queue(maxsize=concurrency * 2)
+    stop_event = threading.Event()
+    sentinel = object()
+
+    def put(item):
+        # Give up once the consumer has gone away
+        while not stop_event.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    async def produce():
+        async for result in fetch_many_async(urls, concurrency, timeout, stop_event, blocking_profile, archive, raw,
+                                              parser):
+            await asyncio.get_running_loop().run_in_executor(None, put, result)
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except Exception as e:
+            put(e)
+        finally:
+            put(sentinel)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is sentinel:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop_event.set()
+        thread.join()
@@ -4,26 +4,34 @@ from . import helper
 
 
 class SoupNode(Node):
-    def __init__(self, number = 0, text = None, bs_tag=None, node_identifier=None, css_path=None, is_repetitive_node=False, is_title = False):
+    def __init__(self, number = 0, text = None, bs_tag=None, node_identifier=None, css_path=None, is_repetitive_node=False, is_title = False,
+                 hrefs=None):
         """
         Custom node that extends treelib's Node with additional attributes.
         Can be initialized directly from a BeautifulSoup tag.
+
+        The node keeps no reference to the tag. css_path, text and hrefs can be passed in from the
+        indexes of a whole document (see HTMLTree.build_tree); only what is missing is computed
+        from the tag.
         """
         identifier = 'root'
         self.hrefs = []  # Initialize an empty list to store hrefs
 
         if bs_tag:
-            css_path = helper.get_css_path(bs_tag)
+            if css_path is None:
+                css_path = helper.get_css_path(bs_tag)
             tag = bs_tag.name
             if node_identifier:
                 self.number = node_identifier.get_next_id(css_path)
             if not is_title:
                 identifier = css_path
                 
-            text = helper.cleanText(bs_tag.get_text(strip=True)) if bs_tag.text else ''
+            if text is None:
+                text = helper.cleanText(bs_tag.get_text(strip=True)) if bs_tag.text else ''
             # Collect all href attributes from the tag and its descendants
-            for element in bs_tag.find_all(href=True):
-                self.hrefs.append(element['href'])
+            if hrefs is None:
+                hrefs = [element['href'] for element in bs_tag.find_all(href=True)]
+            self.hrefs = list(hrefs)
 
         else:
             tag = None
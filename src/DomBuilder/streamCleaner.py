@@ -0,0 +1,415 @@
+"""
+Streaming pre-cleaner for very large pages.
+
+Multi-megabyte pages are mostly inline styles, scripts and <select> option lists that
+clean_html only removes after the whole page was parsed into a bs4 tree. StreamingPreCleaner
+removes that content while the page is still a stream of bytes, so the tree is only built for
+what is left:
+
+    tree = HTMLTree.from_stream(response.iter_content(64 * 1024))
+
+The same rules as clean_html are applied, but earlier: removed tags are gone before headers are
+wrapped, so on pages with headers inside removed tags (e.g. a <footer> holding an <h2>) the
+cleaned tree can differ slightly from clean_html's.
+
+A removed element ends where HTML ends it, including end tags HTML implies: an unclosed
+<li class="nav"> ends at the next <li>, a <p class="nav"> at the next <div>. The content after
+it is kept, as lxml and html5lib would build it (html.parser nests such content instead).
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+
+from bs4.dammit import EncodingDetector
+
+from .cleanHTML import script_has_html, tags_to_remove
+from .removeRules import compile_rules
+from .structuredData import STATE_ASSIGNMENT, is_json_script, parse_script_payload
+
+# Elements that never have an end tag
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source',
+    'track', 'wbr',
+])
+
+# Enough of the page to find a <meta charset> declaration
+SNIFF_BYTES = 4096
+
+# Elements an open element is not implicitly closed across (HTML's "has an element in scope")
+SCOPE_BOUNDARIES = frozenset(['applet', 'caption', 'html', 'table', 'td', 'th', 'marquee', 'object', 'template'])
+
+# Start tags that close an open <p>
+CLOSES_P = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'details', 'dialog', 'dir', 'div', 'dl',
+    'dt', 'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hgroup', 'hr', 'li', 'listing', 'main', 'menu', 'nav', 'ol', 'p', 'plaintext', 'pre',
+    'section', 'summary', 'table', 'ul', 'xmp',
+])
+
+# Start tag -> [(open elements it implicitly closes, elements the search for them stops at)]; a
+# stop set of None means only the current element is closed
+IMPLIED_END_TAGS = {
+    'li': [({'li'}, SCOPE_BOUNDARIES | {'ol', 'ul'})],
+    'dd': [({'dd', 'dt'}, SCOPE_BOUNDARIES)],
+    'dt': [({'dd', 'dt'}, SCOPE_BOUNDARIES)],
+    'option': [({'option'}, None)],
+    'optgroup': [({'option', 'optgroup'}, {'select', 'datalist'} | SCOPE_BOUNDARIES)],
+    'td': [({'td', 'th'}, {'tr', 'table', 'html', 'template'})],
+    'th': [({'td', 'th'}, {'tr', 'table', 'html', 'template'})],
+    'tr': [({'tr'}, {'tbody', 'thead', 'tfoot', 'table', 'html', 'template'})],
+    'tbody': [({'tbody', 'thead', 'tfoot'}, {'table', 'html', 'template'})],
+    'thead': [({'tbody', 'thead', 'tfoot'}, {'table', 'html', 'template'})],
+    'tfoot': [({'tbody', 'thead', 'tfoot'}, {'table', 'html', 'template'})],
+}
+_CLOSE_P = ({'p'}, SCOPE_BOUNDARIES | {'button'})
+
+# Never matches; stops HTMLParser from searching a <script> or <style> body, which it would keep
+# in rawdata and search again on every feed()
+_NEVER = re.compile(r'(?!)')
+# What can still become the end tag of the body once more text arrives
+_END_TAG_PREFIX = re.compile(r'<(?:/[a-zA-Z]*)?\Z')
+# Where script_has_html can find HTML: a quoted tag, possibly behind ::markup it strips, or a
+# comment it strips (which may hide a quoted tag after it or join a quote before it to one)
+_HTML_CANDIDATE = re.compile(r'"<[a-z]|"::markup|<!--')
+# Script text kept between chunks to find candidates cut in two (state variable names included)
+SCRIPT_CARRY = 256
+
+
+class StreamingPreCleaner(HTMLParser):
+    """
+    Incremental tokenizer that passes the page through unchanged except for:
+
+    - comments, which are dropped;
+    - tags matched by tags_to_remove, which are dropped with everything inside them;
+    - scripts, which are dropped unless they hold HTML that convert_script_to_html_node would
+      recover (those are kept verbatim).
+
+    Feed it text with feed(); the cleaned HTML is returned by getvalue(). Bodies of <script> and
+    <style> are scanned for their end tag here rather than by HTMLParser, which would keep the
+    whole body and search it again on every feed(). Dropped bodies are never stored; a script
+    is only kept from the point where it may hold HTML or a JSON payload, so memory follows the
+    output rather than the page.
+
+    :param tags_to_remove: Removal rules, see cleanHTML.clean_html. CSS selector rules need the
+        whole tree and are left to clean_html.
+    :param max_output_chars: Stop once this much HTML was produced; `truncated` is set and the
+        rest of the input is ignored. The tree builder closes whatever is left open.
+
+    :param collect_payloads: Collect the JSON payloads of the scripts read (see structuredData)
+        in `payloads`.
+    """
+
+    def __init__(self, tags_to_remove=tags_to_remove, max_output_chars=None, collect_payloads=True):
+        super().__init__(convert_charrefs=False)
+        self.rules = compile_rules(tags_to_remove)
+        self.max_output_chars = max_output_chars
+        self.output = []
+        self.output_chars = 0
+        self.truncated = False
+        self.dropped_tags = 0
+        # Names of the open elements; like bs4, an end tag closes the nearest open element of its name
+        self._open = []
+        # Index in _open of the element being dropped, None while copying
+        self._skip_level = None
+        # Start tag of the script being read, None outside scripts
+        self._script = None
+        self._script_attrs = {}
+        # Text of that script from where it may hold HTML or a payload on; None before that
+        self._script_parts = None
+        self._script_carry = ''
+        self._script_carry_cut = False
+        # Whether script_has_html already holds for it; it is then copied as it streams in
+        self._script_html = False
+        self._cdata_tail = ''
+        self.collect_payloads = collect_payloads
+        self.payloads = []
+
+    @property
+    def skipping(self):
+        return self._skip_level is not None
+
+    def _emit(self, text):
+        if self.truncated or self.skipping:
+            return
+        self.output.append(text)
+        self.output_chars += len(text)
+        if self.max_output_chars is not None and self.output_chars >= self.max_output_chars:
+            self.truncated = True
+
+    def _should_remove(self, tag, attrs):
+        label = self.rules.match_attributes(tag, dict(attrs))
+        if label is None:
+            return False
+        self.rules.record_hit(label)
+        return True
+
+    def _implied_end(self, tag):
+        """Index in _open of the outermost element a `tag` start tag implicitly closes, or None."""
+        rules = IMPLIED_END_TAGS.get(tag, [])
+        if tag in CLOSES_P:
+            rules = rules + [_CLOSE_P]
+        closed = None
+        for targets, stops in rules:
+            if stops is None:
+                if self._open and self._open[-1] in targets:
+                    index = len(self._open) - 1
+                    closed = index if closed is None else min(closed, index)
+                continue
+            for index in range(len(self._open) - 1, -1, -1):
+                name = self._open[index]
+                if name in targets:
+                    closed = index if closed is None else min(closed, index)
+                    break
+                if name in stops:
+                    break
+        return closed
+
+    def _close_open(self, index):
+        """Close the open elements from `index` up; returns whether that ended a dropped element."""
+        del self._open[index:]
+        if self._skip_level is not None and index <= self._skip_level:
+            closes_dropped = index == self._skip_level
+            self._skip_level = None
+            return closes_dropped
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if self._script is None:
+            # Close what HTML closes implicitly first, so a dropped <li> or <p> ends here
+            implied = self._implied_end(tag)
+            if implied is not None:
+                self._close_open(implied)
+        if tag == 'script' and not self.skipping:
+            self._script = self.get_starttag_text()
+            self._script_attrs = dict(attrs)
+            self._script_carry = ''
+            self._script_carry_cut = False
+            self._script_html = False
+            # Payload scripts are nothing but JSON and are read whole
+            json_script = self.collect_payloads and is_json_script(self._script_attrs.get('type'),
+                                                                   self._script_attrs.get('id'))
+            self._script_parts = [] if json_script else None
+        elif not self.skipping and self._should_remove(tag, attrs):
+            self.dropped_tags += 1
+            if tag in VOID_ELEMENTS:
+                return
+            self._skip_level = len(self._open)
+        else:
+            self._emit(self.get_starttag_text())
+        if tag not in VOID_ELEMENTS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skipping and tag != 'script' and self._should_remove(tag, attrs):
+            self.dropped_tags += 1
+            return
+        self._emit(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self._script is not None and tag == 'script':
+            start_tag, script = self._script, ''.join(self._script_parts or ())
+            self._script = self._script_parts = None
+            self._open.pop()
+            if self.collect_payloads:
+                self.payloads.extend(parse_script_payload(script, self._script_attrs.get('type'),
+                                                          self._script_attrs.get('id')))
+            if self._script_html:
+                self._emit('</script>')
+            elif script_has_html(script):
+                self._emit(start_tag + script + '</script>')
+            else:
+                self.dropped_tags += 1
+            return
+
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index] == tag:
+                break
+        else:
+            # Stray end tag; the tree builder ignores it as well
+            self._emit(f'</{tag}>')
+            return
+
+        if self._close_open(index):
+            return
+        self._emit(f'</{tag}>')
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._read_script(data)
+        else:
+            self._emit(data)
+
+    def _read_script(self, data):
+        """Keep the part of the script's text that script_has_html and parse_script_payload need."""
+        if self._script_html:
+            self._emit(data)
+            if self._script_parts is not None:
+                self._script_parts.append(data)
+            return
+        if self._script_parts is None:
+            # Neither finds anything before the first candidate or state assignment, so the text up
+            # to it is dropped. One character before it is kept, for a quote or the \b of the
+            # assignment; a match at the start of a cut carry would have been found with the
+            # previous chunk
+            text = self._script_carry + data
+            candidate = _HTML_CANDIDATE.search(text)
+            if self.collect_payloads:
+                assignment = STATE_ASSIGNMENT.search(text, 1 if self._script_carry_cut else 0)
+                if assignment is not None and (candidate is None or assignment.start() < candidate.start()):
+                    candidate = assignment
+            if candidate is None:
+                self._script_carry = text[-SCRIPT_CARRY:]
+                self._script_carry_cut = self._script_carry_cut or len(text) > SCRIPT_CARRY
+                return
+            self._script_carry = ''
+            data = text[max(candidate.start() - 1, 0):]
+            previous = ''
+            self._script_parts = [data]
+        else:
+            previous = self._script_parts[-1][-1:] if self._script_parts else ''
+            self._script_parts.append(data)
+        # A fragment ends with '>"'; once one completes, the script is kept and copied from here on.
+        # An unclosed comment could still swallow it, so scripts with comments are decided at the end
+        if '>"' in previous + data:
+            script = ''.join(self._script_parts)
+            if '<!--' not in script and script_has_html(script):
+                self._script_html = True
+                self._emit(self._script + script)
+                self._script_parts = [script] if self.collect_payloads else None
+
+    def set_cdata_mode(self, elem, *args, **kwargs):
+        super().set_cdata_mode(elem, *args, **kwargs)
+        # The body is scanned by _feed_cdata instead
+        self.interesting = _NEVER
+        self._cdata_end = re.compile(r'</%s[\t\n\r\f />]' % re.escape(self.cdata_elem), re.IGNORECASE)
+        self._cdata_tail = ''
+
+    def feed(self, data):
+        while data:
+            if self.cdata_elem is None:
+                super().feed(data)
+                if self.cdata_elem is None:
+                    return
+                # HTMLParser stopped at the start of a <script> or <style> body
+                data, self.rawdata = self.rawdata, ''
+            data = self._feed_cdata(data)
+
+    def _feed_cdata(self, data):
+        """Pass the <script> or <style> body in `data` to handle_data; returns the text from its end tag on."""
+        text = self._cdata_tail + data
+        end = self._cdata_end.search(text)
+        if end is not None:
+            self._cdata_tail = ''
+            if end.start():
+                self.handle_data(text[:end.start()])
+            self.clear_cdata_mode()
+            return text[end.start():]
+        # Keep what may be the start of the end tag, cut off by the end of the chunk
+        tail = _END_TAG_PREFIX.search(text, max(len(text) - len(self.cdata_elem) - 2, 0))
+        cut = len(text) if tail is None else tail.start()
+        self._cdata_tail = text[cut:]
+        if cut:
+            self.handle_data(text[:cut])
+        return ''
+
+    def handle_entityref(self, name):
+        self.handle_data(f'&{name};')
+
+    def handle_charref(self, name):
+        self.handle_data(f'&#{name};')
+
+    def handle_comment(self, data):
+        pass
+
+    def handle_decl(self, decl):
+        self._emit(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self._emit(f'<?{data}>')
+
+    def unknown_decl(self, data):
+        self._emit(f'<![{data}]>')
+
+    def close(self):
+        if self.cdata_elem is not None and self._cdata_tail:
+            self.handle_data(self._cdata_tail)
+            self._cdata_tail = ''
+        super().close()
+        if self._script is not None:
+            # Unterminated script at the end of the page
+            self.handle_endtag('script')
+
+    def getvalue(self):
+        return ''.join(self.output)
+
+
+def _decoded(chunks, encoding=None):
+    """Decode an iterable of byte (or str) chunks incrementally, sniffing the encoding from the first bytes."""
+    decoder = None
+    head = b''
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            yield chunk
+            continue
+        if decoder is None:
+            head += chunk
+            if len(head) < SNIFF_BYTES:
+                continue
+            chunk, head = head, b''
+            decoder = _decoder_for(chunk, encoding)
+        yield decoder.decode(chunk)
+    if decoder is None and head:
+        decoder = _decoder_for(head, encoding)
+        yield decoder.decode(head)
+        head = b''
+    if decoder is not None:
+        yield decoder.decode(b'', final=True)
+
+
+def _decoder_for(head, encoding=None):
+    if encoding is None:
+        _, encoding = EncodingDetector.strip_byte_order_mark(head)
+    if encoding is None:
+        encoding = EncodingDetector.find_declared_encoding(head, is_html=True)
+    try:
+        decoder_class = codecs.getincrementaldecoder(encoding or 'utf-8')
+    except LookupError:
+        decoder_class = codecs.getincrementaldecoder('utf-8')
+    if encoding and encoding.lower().replace('-', '') == 'utf8':
+        # Also strips a UTF-8 byte order mark
+        decoder_class = codecs.getincrementaldecoder('utf-8-sig')
+    return decoder_class(errors='replace')
+
+
+def preclean_stream(chunks, tags_to_remove=tags_to_remove, max_output_chars=None, encoding=None, payloads=None):
+    """
+    Run a page through StreamingPreCleaner chunk by chunk.
+
+    :param chunks: Iterable of bytes or str, e.g. response.iter_content(65536) or iter(partial(f.read, 65536), b'').
+    :param encoding: Encoding of byte chunks; by default taken from a byte order mark or
+        <meta charset>, falling back to UTF-8.
+    :param payloads: Optional list the JSON payloads of the page's scripts are appended to.
+    :return: The cleaned HTML string.
+    """
+    cleaner = StreamingPreCleaner(tags_to_remove, max_output_chars, collect_payloads=payloads is not None)
+    for text in _decoded(chunks, encoding):
+        cleaner.feed(text)
+        if cleaner.truncated:
+            break
+    else:
+        cleaner.close()
+    if payloads is not None:
+        payloads.extend(cleaner.payloads)
+    return cleaner.getvalue()
+
+
+def preclean_html(html, tags_to_remove=tags_to_remove, max_output_chars=None, chunk_size=1 << 20):
+    """preclean_stream for a page that is already in memory (str or bytes)."""
+    chunks = (html[start:start + chunk_size] for start in range(0, len(html), chunk_size))
+    return preclean_stream(chunks, tags_to_remove, max_output_chars)
+
+
+def preclean_file(path, tags_to_remove=tags_to_remove, max_output_chars=None, chunk_size=1 << 16):
+    """preclean_stream for a page saved on disk, read in chunks."""
+    with open(path, 'rb') as handle:
+        return preclean_stream(iter(lambda: handle.read(chunk_size), b''), tags_to_remove, max_output_chars)
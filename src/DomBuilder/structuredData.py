@@ -0,0 +1,320 @@
+"""
+Structured data embedded in pages as JSON inside <script> tags.
+
+Many pages already carry what we extract as machine readable JSON: JSON-LD (schema.org Product,
+Offer, Article, ...), Next.js' __NEXT_DATA__, Nuxt state and other `window.__STATE__ = {...}`
+blobs. clean_html drops these scripts, so they are read from the page before cleaning:
+
+    payloads = find_payloads(html)
+    found = extract_info(payloads, ['Price', 'Product name'])
+
+extract_info answers in the same format as the LLM extractors, so when every requested info type
+is found the LLM call can be skipped (see Model.openAI.OpenAIExtractor.extract). The aisuite and
+Hugging Face models only turn a prompt into a response and know nothing about info types, so
+callers building prompts for them use extract_info and missing_info_types themselves.
+
+orjson is used for parsing when it is installed.
+"""
+import json
+import re
+from collections import deque
+
+from bs4 import UnicodeDammit
+
+try:
+    import orjson
+except ImportError:  # the standard json module is used instead
+    orjson = None
+
+JSON_LD = 'json-ld'
+NEXT_DATA = 'next-data'
+NUXT_DATA = 'nuxt-data'
+STATE = 'state'
+JSON = 'json'
+
+# Order in which payload kinds are searched by extract_info
+KIND_PRIORITY = (JSON_LD, NEXT_DATA, NUXT_DATA, STATE, JSON)
+
+_SCRIPT_START = re.compile(r'<script\b([^>]*)>', re.IGNORECASE)
+_SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+_ATTRIBUTE = re.compile(r'''([^\s=/>]+)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)''')
+# window.__INITIAL_STATE__ = {...}, var __APOLLO_STATE__={...}, window.__NUXT__=JSON.parse("...")
+STATE_ASSIGNMENT = re.compile(r'\b(__[A-Za-z][A-Za-z0-9_]*__)\s*=\s*')
+_JSON_PARSE_CALL = re.compile(r'JSON\.parse\(\s*')
+
+# Values read per payload by extract_info; huge app states are only searched this far
+MAX_INDEXED_VALUES = 200000
+
+# Normalized info type -> schema.org key paths that answer it in JSON-LD, besides the info type itself
+INFO_ALIASES = {
+    'title': ['headline', 'name'],
+    'name': ['productname', 'name'],
+    'price': ['offersprice', 'offerprice', 'lowprice', 'price'],
+    'currency': ['pricecurrency'],
+    'author': ['authorname', 'personname', 'author'],
+    'date': ['datepublished', 'uploaddate', 'datecreated'],
+    'publishdate': ['datepublished'],
+    'publisheddate': ['datepublished'],
+    'rating': ['aggregateratingratingvalue', 'ratingvalue'],
+    'reviewcount': ['aggregateratingreviewcount', 'aggregateratingratingcount'],
+    'brand': ['brandname', 'brand'],
+    'image': ['image', 'imageurl', 'thumbnailurl'],
+    'description': ['description'],
+    'availability': ['offersavailability', 'availability'],
+}
+
+
+class StructuredPayload:
+    """
+    One JSON payload found in a script.
+
+    :param kind: JSON_LD, NEXT_DATA, NUXT_DATA, STATE or JSON.
+    :param name: Script id or state variable name, when there is one.
+    :param data: The parsed JSON.
+    """
+
+    def __init__(self, kind, data, name=None):
+        self.kind = kind
+        self.name = name
+        self.data = data
+
+    def __repr__(self):
+        return f"<StructuredPayload kind={self.kind}, name={self.name}>"
+
+
+def loads(text):
+    """Parse JSON with orjson when available; None when the text is not valid JSON."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    try:
+        # strict=False accepts the raw control characters often found in JSON-LD descriptions
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+def _strip_wrappers(text):
+    text = text.strip()
+    for prefix in ('<!--', '//<![CDATA[', '/*<![CDATA[*/'):
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+    for suffix in ('-->', '//]]>', '/*]]>*/', ';'):
+        if text.endswith(suffix):
+            text = text[:-len(suffix)]
+    return text.strip()
+
+
+def _decode_assigned_value(text, position):
+    """Decode the JSON literal (or JSON.parse("...") call) starting at `position`, or None."""
+    decoder = json.JSONDecoder(strict=False)
+    call = _JSON_PARSE_CALL.match(text, position)
+    try:
+        if call:
+            quoted, _ = decoder.raw_decode(text, call.end())
+            return loads(quoted) if isinstance(quoted, str) else None
+        if text[position:position + 1] in ('{', '['):
+            value, _ = decoder.raw_decode(text, position)
+            return value
+    except ValueError:
+        pass
+    return None
+
+
+def is_json_script(script_type=None, script_id=None):
+    """Whether a script with these type and id attributes holds nothing but JSON."""
+    script_type = (script_type or '').strip().lower()
+    return script_type in ('application/ld+json', 'application/json') or script_id in ('__NEXT_DATA__', '__NUXT_DATA__')
+
+
+def parse_script_payload(text, script_type=None, script_id=None):
+    """
+    Recognize and parse the JSON held by one script.
+
+    :param text: Text of the script.
+    :param script_type: Its type attribute.
+    :param script_id: Its id attribute.
+    :return: List of StructuredPayload objects (a script can assign several state variables).
+    """
+    if not text:
+        return []
+    script_type = (script_type or '').strip().lower()
+    if script_type == 'application/ld+json':
+        data = loads(_strip_wrappers(text))
+        return [] if data is None else [StructuredPayload(JSON_LD, data, script_id)]
+    if is_json_script(script_type, script_id):
+        kind = NEXT_DATA if script_id == '__NEXT_DATA__' else NUXT_DATA if script_id == '__NUXT_DATA__' else JSON
+        data = loads(_strip_wrappers(text))
+        return [] if data is None else [StructuredPayload(kind, data, script_id)]
+    if script_type and 'javascript' not in script_type and script_type != 'module':
+        # Templates, text/plain, ...
+        return []
+
+    payloads = []
+    for assignment in STATE_ASSIGNMENT.finditer(text):
+        data = _decode_assigned_value(text, assignment.end())
+        if data is not None:
+            payloads.append(StructuredPayload(STATE, data, assignment.group(1)))
+    return payloads
+
+
+def _script_attributes(attributes):
+    found = {}
+    for name, value in _ATTRIBUTE.findall(attributes):
+        found[name.lower()] = value[1:-1] if value[:1] in ('"', "'") else value
+    return found
+
+
+def iter_scripts(html):
+    """Yield (attributes, text) of every script of a raw HTML string, in linear time."""
+    position = 0
+    while True:
+        start = _SCRIPT_START.search(html, position)
+        if start is None:
+            return
+        end = _SCRIPT_END.search(html, start.end())
+        if end is None:
+            return
+        yield _script_attributes(start.group(1)), html[start.end():end.start()]
+        position = end.end()
+
+
+def find_payloads(source):
+    """
+    Collect the JSON payloads of a page.
+
+    :param source: Raw HTML (str or bytes) or a BeautifulSoup object.
+    :return: List of StructuredPayload objects in document order.
+    """
+    payloads = []
+    if isinstance(source, (bytes, bytearray)):
+        source = UnicodeDammit(bytes(source), is_html=True).unicode_markup
+    if isinstance(source, str):
+        for attributes, text in iter_scripts(source):
+            payloads.extend(parse_script_payload(text, attributes.get('type'), attributes.get('id')))
+    else:
+        for script in source.find_all('script'):
+            payloads.extend(parse_script_payload(script.string, script.get('type'), script.get('id')))
+    return payloads
+
+
+def normalize_key(key):
+    """'Product name', 'product_name' and 'productName' all become 'productname'."""
+    return re.sub(r'[^0-9a-z]', '', str(key).lower())
+
+
+def _scalar(value):
+    """The answer a JSON value gives: scalars as strings, named objects by their name."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (str, int, float)):
+        text = str(value).strip()
+        return text or None
+    if isinstance(value, dict):
+        for key in ('name', '@value', 'value', 'url'):
+            if key in value:
+                return _scalar(value[key])
+        return None
+    if isinstance(value, list):
+        for item in value:
+            found = _scalar(item)
+            if found is not None:
+                return found
+    return None
+
+
+def index_payload(data, index=None, limit=MAX_INDEXED_VALUES, conflicts=None):
+    """
+    Map key paths to values, breadth first, so shallower values win.
+
+    Every value is indexed under its key and under its key joined with up to two parent keys;
+    the @type of an object counts as a parent key, so the name of a Product is found as 'name',
+    'productname' and so on.
+
+    :param conflicts: Optional set the key paths found with different values are added to, e.g.
+        'name' on a page holding both an Organization and a Product.
+    :return: Dict normalized key path -> JSON value.
+    """
+    index = {} if index is None else index
+    queue = deque([((), data)])
+    visited = 0
+    while queue and visited < limit:
+        path, value = queue.popleft()
+        visited += 1
+        if isinstance(value, list):
+            queue.extend((path, item) for item in value)
+            continue
+        if not isinstance(value, dict):
+            continue
+        value_type = value.get('@type')
+        if isinstance(value_type, list):
+            value_type = value_type[0] if value_type else None
+        if isinstance(value_type, str):
+            path = path + (normalize_key(value_type),)
+        for key, child in value.items():
+            if key.startswith('@'):
+                continue
+            child_path = path + (normalize_key(key),)
+            for depth in (1, 2, 3):
+                if depth <= len(child_path):
+                    key_path = ''.join(child_path[-depth:])
+                    if key_path not in index:
+                        index[key_path] = child
+                    elif conflicts is not None and key_path not in conflicts:
+                        first, other = _scalar(index[key_path]), _scalar(child)
+                        if first is not None and other is not None and first != other:
+                            conflicts.add(key_path)
+            queue.append((child_path, child))
+    return index
+
+
+def extract_info(payloads, info_types, kinds=KIND_PRIORITY):
+    """
+    Answer info types from structured data.
+
+    JSON-LD uses the schema.org vocabulary, so there an info type is also answered by its usual
+    schema.org keys (INFO_ALIASES: 'Title' by 'headline', ...). App state blobs use whatever keys
+    the site chose and must contain the info type itself as a key path.
+
+    All payloads of a kind are searched together. When the key path that would answer holds
+    different values in them, the info type is left to the LLM: 'Name' on a page with an
+    Organization and a Product is not answered, while 'Product name' still is.
+
+    :param payloads: StructuredPayload objects, e.g. from find_payloads or HTMLTree.structured_data.
+    :param info_types: Info types as given to the LLM extractors (e.g. ['Price', 'Product name']).
+    :param kinds: Payload kinds to search, in order of preference.
+    :return: Dict info type -> {'info': value, 'node_number': None, 'source': payload kind}, or
+        None for info types that were not found.
+    """
+    indexes = []
+    for kind in kinds:
+        index = {}
+        conflicts = set()
+        for payload in payloads:
+            if payload.kind == kind:
+                index_payload(payload.data, index, conflicts=conflicts)
+        if index:
+            indexes.append((kind, index, conflicts))
+
+    result = {}
+    for info_type in info_types:
+        key = normalize_key(info_type)
+        result[info_type] = None
+        for kind, index, conflicts in indexes:
+            candidates = [key] + INFO_ALIASES.get(key, []) if kind == JSON_LD else [key]
+            match = next((candidate for candidate in candidates
+                          if candidate in index and _scalar(index[candidate]) is not None), None)
+            if match in conflicts:
+                # Several objects disagree, e.g. an Organization and a Product both have a name
+                break
+            if match is not None:
+                result[info_type] = {'info': _scalar(index[match]), 'node_number': None, 'source': kind}
+                break
+    return result
+
+
+def missing_info_types(result):
+    """The info types extract_info could not answer."""
+    return [info_type for info_type, found in result.items() if found is None]
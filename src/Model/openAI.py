@@ -44,17 +44,34 @@ class OpenAIExtractor:
             "Only JSON is allowed as an answer. No explanation or other text is allowed."
         )
         return prompt
-    def extract(self, text, info_type):
+    def extract(self, text, info_type, structured_data=None):
         """
         Extracts the specified information from the provided text using the OpenAI API.
 
         Args:
             text (str): The input text from which to extract information.
             info_type (str): The type of information to extract (e.g., "price", "product name").
+            structured_data (list, optional): JSON payloads of the page (HTMLTree.structured_data,
+                filled when the tree is built with structured_data=True).
+                Information types found there are not asked for; when all of them are found the
+                API is not called at all.
 
         Returns:
             dict: A dictionary containing the extracted information in JSON format.
         """
+        if structured_data:
+            from DomBuilder.structuredData import extract_info, missing_info_types
+            info_types = [info_type] if isinstance(info_type, str) else list(info_type)
+            found = extract_info(structured_data, info_types)
+            missing = missing_info_types(found)
+            if not missing:
+                return found
+            extracted = self.extract(text, missing)
+            for key, value in found.items():
+                if value is not None:
+                    extracted[key] = value
+            return extracted
+
         # Initialize the conversation with a system message
         messages = [
             {"role": "system", "content": "You are an information extraction assistant."},
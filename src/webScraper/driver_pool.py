@@ -0,0 +1,241 @@
+import shutil
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+try:
+    import psutil
+except ImportError:  # RSS based recycling is simply disabled without psutil
+    psutil = None
+
+# Clears the cookies and site data (local storage, IndexedDB, service workers, ...) of every site,
+# run in Firefox's privileged context since content scripts only reach their own origin
+_FIREFOX_CLEAR_DATA_JS = """
+var done = arguments[arguments.length - 1];
+var flags = Ci.nsIClearDataService.CLEAR_COOKIES | Ci.nsIClearDataService.CLEAR_DOM_STORAGES;
+Services.clearData.deleteData(flags, {onDataDeleted: function () { done(); }});
+"""
+
+
+class PooledDriver:
+    """A WebDriver instance together with its profile directory and usage counters."""
+
+    def __init__(self, driver, profile_dir=None):
+        self.driver = driver
+        self.profile_dir = profile_dir
+        self.pages_served = 0
+
+    def browser_pid(self):
+        """Return the pid of the browser process behind the driver, if the driver exposes it."""
+        capabilities = getattr(self.driver, 'capabilities', None) or {}
+        return capabilities.get('moz:processID') or capabilities.get('processId')
+
+    def rss_mb(self):
+        """
+        Resident memory of the browser process tree in megabytes.
+
+        :return: RSS in MB, or None when psutil or the browser pid is unavailable.
+        """
+        pid = self.browser_pid()
+        if psutil is None or not pid:
+            return None
+        try:
+            process = psutil.Process(pid)
+            rss = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+        except psutil.Error:
+            return None
+        return rss / (1024 * 1024)
+
+
+class DriverPool:
+    """
+    Keeps up to `size` warm WebDriver instances and hands them out one page at a time.
+
+    Drivers are created lazily through `create_driver` (a callable returning a PooledDriver),
+    their state is cleared when they are released, and they are recycled once they served
+    `max_pages_per_driver` pages or their browser grows above `max_rss_mb`.
+    """
+
+    def __init__(self, create_driver, size=1, max_pages_per_driver=50, max_rss_mb=None):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.create_driver = create_driver
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.max_rss_mb = max_rss_mb
+        self._idle = []
+        self._total = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def warm_up(self):
+        """Start all `size` drivers up front so the first pages do not pay the cold start."""
+        with self._condition:
+            missing = self.size - self._total
+            self._total += missing
+        for _ in range(missing):
+            try:
+                pooled = self.create_driver()
+            except Exception:
+                with self._condition:
+                    self._total -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def acquire(self, timeout=None):
+        """
+        Take a driver out of the pool, starting a new one if the pool is not full yet.
+
+        :param timeout: Seconds to wait for a free driver (None waits forever).
+        :return: PooledDriver
+        """
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._total < self.size:
+                    self._total += 1
+                    break
+                if not self._condition.wait(timeout):
+                    raise TimeoutError("No browser driver became available in time")
+
+        try:
+            return self.create_driver()
+        except Exception:
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, pooled, broken=False):
+        """
+        Return a driver to the pool.
+
+        The driver is cleared for the next page, or disposed of when it is broken,
+        has served too many pages or uses too much memory.
+        """
+        pooled.pages_served += 1
+        keep = not broken and not self._closed and not self._needs_recycling(pooled)
+        if keep:
+            try:
+                self.reset_state(pooled.driver)
+            except Exception as e:
+                print(f"Discarding browser driver that could not be reset: {e}")
+                keep = False
+
+        if not keep:
+            self._dispose(pooled)
+
+        with self._condition:
+            if keep and not self._closed:
+                self._idle.append(pooled)
+            else:
+                self._total -= 1
+            self._condition.notify()
+
+        if keep and self._closed:
+            self._dispose(pooled)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Context manager yielding a WebDriver; the driver is released (or discarded on error) on exit."""
+        pooled = self.acquire(timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def _needs_recycling(self, pooled):
+        if self.max_pages_per_driver and pooled.pages_served >= self.max_pages_per_driver:
+            return True
+        if self.max_rss_mb:
+            rss = pooled.rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                return True
+        return False
+
+    @staticmethod
+    def page_origins(driver):
+        """Origins of the page the driver shows and, on Chromium drivers, of every frame inside it."""
+        urls = [driver.current_url]
+        if hasattr(driver, 'execute_cdp_cmd'):
+            stack = [driver.execute_cdp_cmd('Page.getFrameTree', {})['frameTree']]
+            while stack:
+                frame_tree = stack.pop()
+                urls.append(frame_tree['frame'].get('url'))
+                stack.extend(frame_tree.get('childFrames', []))
+        origins = set()
+        for url in urls:
+            parsed = urlparse(url or '')
+            if parsed.scheme in ('http', 'https'):
+                origins.add(f'{parsed.scheme}://{parsed.netloc}')
+        return origins
+
+    @staticmethod
+    def reset_state(driver):
+        """
+        Clear the cookies and web storage of every site the page touched and park the browser
+        on a blank page.
+
+        delete_all_cookies() and the storage APIs only reach the current document's site, so the
+        browser's own data clearing is used. On Chromium drivers the DevTools protocol clears all
+        cookies, and the storage of the page's origin and of every frame's origin (iframes
+        included). On geckodriver, Firefox's clear-data service clears the cookies and storage
+        of all sites from the privileged context (recent Firefox versions need the
+        -remote-allow-system-access argument for that). Raises when the driver offers neither,
+        so the pool discards it instead of passing its state to the next page. The HTTP cache is
+        kept, so pooled drivers stay warm.
+        """
+        origins = DriverPool.page_origins(driver)
+        driver.execute_script(
+            "try { window.sessionStorage.clear(); } catch (e) {}"
+        )
+        driver.get('about:blank')
+        if hasattr(driver, 'execute_cdp_cmd'):
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            for origin in sorted(origins):
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        elif hasattr(driver, 'context') and hasattr(driver, 'CONTEXT_CHROME'):
+            with driver.context(driver.CONTEXT_CHROME):
+                driver.execute_async_script(_FIREFOX_CLEAR_DATA_JS)
+        else:
+            raise RuntimeError("The driver cannot clear the data of other sites")
+
+    @staticmethod
+    def _dispose(pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Error while quitting browser driver: {e}")
+        if pooled.profile_dir:
+            shutil.rmtree(pooled.profile_dir, ignore_errors=True)
+
+    def close(self):
+        """Quit every idle driver and remove the profile directories; busy drivers are disposed on release."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._dispose(pooled)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
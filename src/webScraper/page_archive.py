@@ -0,0 +1,197 @@
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+INDEX_NAME = 'index.jsonl'
+
+
+class ArchiveRecord:
+    """One archived fetch: the requested URL, where it ended up, response headers, timing and HTML."""
+
+    def __init__(self, url, html, final_url=None, headers=None, timing=None, fetched_at=None, record_id=None):
+        self.url = url
+        self.html = html
+        self.final_url = final_url or url
+        self.headers = headers or {}
+        self.timing = timing or {}
+        self.fetched_at = fetched_at or time.time()
+        self.record_id = record_id or f'<urn:uuid:{uuid.uuid4()}>'
+
+    def to_bytes(self):
+        """Serialize as a WARC-style record: header lines, a blank line, then the HTML payload."""
+        payload = self.html.encode('utf-8')
+        date = datetime.fromtimestamp(self.fetched_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        header = (
+            'WARC/1.0\r\n'
+            'WARC-Type: response\r\n'
+            f'WARC-Record-ID: {self.record_id}\r\n'
+            f'WARC-Date: {date}\r\n'
+            f'WARC-Target-URI: {self.url}\r\n'
+            f'X-Final-URI: {self.final_url}\r\n'
+            f'X-Fetched-At: {self.fetched_at!r}\r\n'
+            f'X-Response-Headers: {json.dumps(self.headers)}\r\n'
+            f'X-Timing: {json.dumps(self.timing)}\r\n'
+            'Content-Type: text/html; charset=utf-8\r\n'
+            f'Content-Length: {len(payload)}\r\n'
+            '\r\n'
+        )
+        return header.encode('utf-8') + payload + b'\r\n\r\n'
+
+    @classmethod
+    def from_bytes(cls, data):
+        header, _, rest = data.partition(b'\r\n\r\n')
+        fields = {}
+        for line in header.decode('utf-8').split('\r\n')[1:]:
+            name, _, value = line.partition(': ')
+            fields[name] = value
+        length = int(fields['Content-Length'])
+        return cls(
+            url=fields['WARC-Target-URI'],
+            html=rest[:length].decode('utf-8'),
+            final_url=fields.get('X-Final-URI'),
+            headers=json.loads(fields.get('X-Response-Headers') or '{}'),
+            timing=json.loads(fields.get('X-Timing') or '{}'),
+            fetched_at=float(fields['X-Fetched-At']) if 'X-Fetched-At' in fields else None,
+            record_id=fields.get('WARC-Record-ID'),
+        )
+
+    def __repr__(self):
+        return f"<ArchiveRecord url={self.url}, bytes={len(self.html)}>"
+
+
+class ArchiveWriter:
+    """
+    Appends fetched pages to rolling compressed archive files.
+
+    Every record is its own gzip member, so a record can be decompressed on its own from the
+    (file, offset, length) triple written to index.jsonl. A new archive file is started once the
+    current one grows past `max_file_bytes`.
+    """
+
+    def __init__(self, directory, prefix='pages', max_file_bytes=256 * 1024 * 1024, compresslevel=6):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        self.compresslevel = compresslevel
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = open(os.path.join(directory, INDEX_NAME), 'a', encoding='utf-8')
+        self._sequence = self._next_sequence()
+        self._file = None
+        self._file_name = None
+
+    def _next_sequence(self):
+        existing = [name for name in os.listdir(self.directory)
+                    if name.startswith(self.prefix + '-') and name.endswith('.warc.gz')]
+        return len(existing)
+
+    def _open_next_file(self):
+        if self._file:
+            self._file.close()
+        self._file_name = f'{self.prefix}-{self._sequence:05d}.warc.gz'
+        self._sequence += 1
+        self._file = open(os.path.join(self.directory, self._file_name), 'ab')
+
+    def write(self, url, html, final_url=None, headers=None, timing=None):
+        """
+        Archive one fetch.
+
+        :return: The index entry of the record (url, final_url, file, offset, length, fetched_at).
+        """
+        record = ArchiveRecord(url, html, final_url, headers, timing)
+        data = gzip.compress(record.to_bytes(), compresslevel=self.compresslevel)
+        with self._lock:
+            if self._file is None or self._file.tell() >= self.max_file_bytes:
+                self._open_next_file()
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            entry = {'url': url, 'final_url': record.final_url, 'file': self._file_name,
+                     'offset': offset, 'length': len(data), 'fetched_at': record.fetched_at}
+            self._index.write(json.dumps(entry) + '\n')
+            self._index.flush()
+        return entry
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Reads an archive written by ArchiveWriter, either by random access through the index or by
+    streaming every record in order. Only one record is decompressed in memory at a time.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = []
+        self.by_url = {}
+        with open(os.path.join(directory, INDEX_NAME), encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.entries.append(entry)
+                self.by_url[entry['url']] = entry  # the latest fetch of a URL wins
+
+    def __len__(self):
+        return len(self.entries)
+
+    def read(self, entry):
+        """Decompress the single record an index entry points to."""
+        with open(os.path.join(self.directory, entry['file']), 'rb') as handle:
+            handle.seek(entry['offset'])
+            data = handle.read(entry['length'])
+        return ArchiveRecord.from_bytes(gzip.decompress(data))
+
+    def get(self, url):
+        """Return the latest ArchiveRecord for `url`, or None."""
+        entry = self.by_url.get(url)
+        return self.read(entry) if entry else None
+
+    def __iter__(self):
+        """Stream all records file by file, keeping a single file handle open per archive file."""
+        current_name = None
+        handle = None
+        try:
+            for entry in sorted(self.entries, key=lambda e: (e['file'], e['offset'])):
+                if entry['file'] != current_name:
+                    if handle:
+                        handle.close()
+                    current_name = entry['file']
+                    handle = open(os.path.join(self.directory, current_name), 'rb')
+                handle.seek(entry['offset'])
+                yield ArchiveRecord.from_bytes(gzip.decompress(handle.read(entry['length'])))
+        finally:
+            if handle:
+                handle.close()
+
+    def iter_trees(self, parser=None, boilerplate=None):
+        """
+        Yield (ArchiveRecord, HTMLTree) pairs for every archived page.
+
+        :param boilerplate: Optional BoilerplateLearner. The archive is read twice then: the
+            learner samples every site first and fixes its templates, so that all pages, including
+            the sampled ones, are stripped the same way.
+        """
+        from DomBuilder.HTMLTree import HTMLTree
+        if boilerplate is not None:
+            for record in self:
+                boilerplate.learn(record.final_url, record.html, parser)
+            boilerplate.finish()
+        for record in self:
+            yield record, HTMLTree.from_html(record.html, parser=parser, url=record.final_url, boilerplate=boilerplate)
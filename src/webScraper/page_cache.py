@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class CacheEntry:
+    """Index record of a cached URL: which body it points to and how to revalidate it."""
+
+    def __init__(self, url, content_hash, fetched_at, ttl=None, etag=None, last_modified=None, rendered=False):
+        self.url = url
+        self.content_hash = content_hash
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.etag = etag
+        self.last_modified = last_modified
+        self.rendered = rendered
+
+    def is_fresh(self, now=None):
+        if self.ttl is None:
+            return True
+        return (now or time.time()) - self.fetched_at < self.ttl
+
+    def conditional_headers(self):
+        """Headers for a conditional request against the origin."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class PageCache:
+    """
+    Content-addressed on-disk cache of raw page HTML.
+
+    Bodies are stored gzip-compressed under objects/<hash[:2]>/<sha256 of the body>, so identical
+    pages are stored once. A small JSON index file per URL records the body hash, the fetch time,
+    the TTL and the ETag/Last-Modified validators used for conditional revalidation.
+
+    :param root: Cache directory.
+    :param ttl: Seconds an entry is served without revalidation; None keeps entries fresh forever
+        (useful when replaying a corpus).
+    :param probe_validators: For browser-rendered pages, send a HEAD request to record ETag/Last-Modified.
+    :param session: Optional requests.Session used for HEAD and conditional requests.
+    """
+
+    def __init__(self, root, ttl=24 * 3600, probe_validators=True, session=None, timeout=10):
+        self.root = root
+        self.ttl = ttl
+        self.probe_validators = probe_validators
+        self.timeout = timeout
+        self._session = session
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'index'), exist_ok=True)
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _index_path(self, url):
+        return os.path.join(self.root, 'index', _sha256(url.encode('utf-8')) + '.json')
+
+    def _object_path(self, content_hash):
+        return os.path.join(self.root, 'objects', content_hash[:2], content_hash + '.html.gz')
+
+    @staticmethod
+    def _atomic_write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def lookup(self, url):
+        """Return the CacheEntry for `url`, or None if it was never cached (or its body is gone)."""
+        try:
+            with open(self._index_path(url), encoding='utf-8') as handle:
+                entry = CacheEntry(**json.load(handle))
+        except (OSError, ValueError, TypeError):
+            return None
+        if not os.path.exists(self._object_path(entry.content_hash)):
+            return None
+        return entry
+
+    def read(self, entry):
+        """Return the cached HTML of an entry."""
+        with gzip.open(self._object_path(entry.content_hash), 'rb') as handle:
+            return handle.read().decode('utf-8')
+
+    def get(self, url):
+        """Return the cached HTML for `url` if it is fresh, otherwise None."""
+        entry = self.lookup(url)
+        if entry and entry.is_fresh():
+            return self.read(entry)
+        return None
+
+    def put(self, url, html, etag=None, last_modified=None, ttl=None, rendered=False):
+        """
+        Store the HTML of `url` and point the URL index at it.
+
+        :return: The CacheEntry written.
+        """
+        data = html.encode('utf-8')
+        content_hash = _sha256(data)
+        object_path = self._object_path(content_hash)
+        if not os.path.exists(object_path):
+            self._atomic_write(object_path, gzip.compress(data, compresslevel=6))
+        entry = CacheEntry(url, content_hash, time.time(), ttl if ttl is not None else self.ttl,
+                           etag, last_modified, rendered)
+        self._write_entry(entry)
+        return entry
+
+    def _write_entry(self, entry):
+        self._atomic_write(self._index_path(entry.url), json.dumps(entry.to_dict()).encode('utf-8'))
+
+    def touch(self, entry, etag=None, last_modified=None):
+        """Mark an entry as freshly validated, optionally with updated validators."""
+        entry.fetched_at = time.time()
+        entry.etag = etag or entry.etag
+        entry.last_modified = last_modified or entry.last_modified
+        self._write_entry(entry)
+
+    def revalidate(self, entry):
+        """
+        Ask the origin whether a stale entry changed, using If-None-Match/If-Modified-Since.
+
+        :return: True if the server answered 304 Not Modified (the entry is refreshed), False otherwise.
+        """
+        headers = entry.conditional_headers()
+        if not headers:
+            return False
+        try:
+            response = self.session.get(entry.url, headers=headers, timeout=self.timeout, stream=True)
+            response.close()
+        except Exception as e:
+            print(f"Revalidation failed for {entry.url}: {e}")
+            return False
+        if response.status_code != 304:
+            return False
+        self.touch(entry, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return True
+
+    def validators(self, url):
+        """HEAD the URL and return its ETag/Last-Modified as keyword arguments for put()."""
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        except Exception:
+            return {}
+        return {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+
+    def fetch(self, url, render):
+        """
+        Serve `url` from the cache when it is fresh or unchanged on the server, otherwise call
+        `render(url)` (which returns HTML or None) and cache the result.
+        """
+        entry = self.lookup(url)
+        if entry and (entry.is_fresh() or self.revalidate(entry)):
+            return self.read(entry)
+
+        html = render(url)
+        if html is None:
+            return None
+        validators = self.validators(url) if self.probe_validators else {}
+        self.put(url, html, rendered=True, **validators)
+        return html
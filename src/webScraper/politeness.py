@@ -0,0 +1,183 @@
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity` tokens."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now=None):
+        """Seconds until a token is available (0 if one is available now)."""
+        now = now or time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now=None):
+        self._refill(now or time.monotonic())
+        self.tokens -= 1
+
+
+class HostState:
+    """Queue, rate limit, concurrency and backoff bookkeeping for one host."""
+
+    def __init__(self, rate, burst):
+        self.queue = deque()
+        self.bucket = TokenBucket(rate, burst)
+        self.active = 0
+        self.backoff_until = 0.0
+        self.throttle_count = 0
+
+
+class ScheduledResult:
+    """Outcome of one URL run through the scheduler."""
+
+    def __init__(self, url, result=None, error=None, attempts=1, status=None):
+        self.url = url
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+        self.status = status
+
+    @property
+    def ok(self):
+        return self.error is None and self.status not in THROTTLE_STATUSES
+
+    def __repr__(self):
+        return f"<ScheduledResult url={self.url}, status={self.status}, attempts={self.attempts}, error={self.error!r}>"
+
+
+def default_status_of(result):
+    """Read an HTTP status from a fetch result, e.g. TieredResult.status."""
+    return getattr(result, 'status', None)
+
+
+class PolitenessScheduler:
+    """
+    Runs a fetch function over many URLs while being polite to every host.
+
+    Each host gets a token bucket (`per_host_rate` requests per second, bursts of `per_host_burst`)
+    and at most `per_host_concurrency` requests in flight; at most `global_concurrency` requests run
+    overall. Hosts are served round-robin and a host that is rate limited or backing off is simply
+    skipped, so a slow or throttled domain never holds up the rest of the queue. A 429/503 answer
+    puts the host into exponential backoff and the URL is retried up to `max_retries` times.
+
+    :param fetch: Callable url -> result, e.g. TieredFetcher(...).fetch_with_info. The fetch must report
+        the status of the response it actually used and must not retry a throttled host on its own
+        (TieredFetcher returns a 429/5xx static answer as is instead of rendering the page), or every
+        retry here multiplies the load on a host that asked us to slow down.
+    :param status_of: Callable result -> HTTP status (or None) used to detect throttling.
+    :param host_overrides: {host: {'rate': ..., 'burst': ..., 'concurrency': ...}} per-host settings.
+    """
+
+    def __init__(self, fetch, per_host_rate=1.0, per_host_burst=2, per_host_concurrency=2, global_concurrency=16,
+                 max_retries=3, backoff_base=2.0, max_backoff=300.0, status_of=default_status_of, host_overrides=None):
+        self.fetch = fetch
+        self.per_host_rate = per_host_rate
+        self.per_host_burst = per_host_burst
+        self.per_host_concurrency = per_host_concurrency
+        self.global_concurrency = global_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.status_of = status_of
+        self.host_overrides = host_overrides or {}
+        self.hosts = {}
+
+    def _host(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            override = self.host_overrides.get(host, {})
+            state = HostState(override.get('rate', self.per_host_rate), override.get('burst', self.per_host_burst))
+            self.hosts[host] = state
+        return state
+
+    def _concurrency(self, host):
+        return self.host_overrides.get(host, {}).get('concurrency', self.per_host_concurrency)
+
+    def _backoff(self, state):
+        state.throttle_count += 1
+        delay = min(self.max_backoff, self.backoff_base ** state.throttle_count)
+        state.backoff_until = time.monotonic() + delay * random.uniform(0.8, 1.2)
+
+    def _dispatch(self, executor, in_flight, ring):
+        """Start as many requests as the limits allow; return seconds until the next host may be ready."""
+        next_ready = None
+        for _ in range(len(ring)):
+            if len(in_flight) >= self.global_concurrency:
+                return None
+            host = ring[0]
+            ring.rotate(-1)
+            state = self.hosts[host]
+            if not state.queue or state.active >= self._concurrency(host):
+                continue
+            now = time.monotonic()
+            wait_for = max(state.backoff_until - now, state.bucket.delay(now))
+            if wait_for > 0:
+                next_ready = wait_for if next_ready is None else min(next_ready, wait_for)
+                continue
+            url, attempts = state.queue.popleft()
+            state.bucket.take(now)
+            state.active += 1
+            in_flight[executor.submit(self.fetch, url)] = (host, url, attempts)
+        return next_ready
+
+    def run(self, urls):
+        """
+        Fetch all URLs politely.
+
+        :return: Generator of ScheduledResult objects in completion order.
+        """
+        ring = deque()
+        for url in urls:
+            host = (urlparse(url).hostname or '').lower()
+            state = self._host(host)
+            if not state.queue and host not in ring:
+                ring.append(host)
+            state.queue.append((url, 1))
+
+        executor = ThreadPoolExecutor(max_workers=self.global_concurrency)
+        in_flight = {}
+        try:
+            while in_flight or any(self.hosts[host].queue for host in ring):
+                next_ready = self._dispatch(executor, in_flight, ring)
+                if not in_flight:
+                    time.sleep(next_ready if next_ready is not None else 0.01)
+                    continue
+                done, _ = wait(list(in_flight), timeout=next_ready, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, url, attempts = in_flight.pop(future)
+                    state = self.hosts[host]
+                    state.active -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield ScheduledResult(url, error=e, attempts=attempts)
+                        continue
+
+                    status = self.status_of(result) if self.status_of else None
+                    if status in THROTTLE_STATUSES:
+                        self._backoff(state)
+                        if attempts < self.max_retries:
+                            state.queue.appendleft((url, attempts + 1))
+                            continue
+                    else:
+                        state.throttle_count = 0
+                    yield ScheduledResult(url, result, attempts=attempts, status=status)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
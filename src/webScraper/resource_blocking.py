@@ -0,0 +1,248 @@
+import fnmatch
+import json
+from collections import Counter
+from urllib.parse import quote, urlparse
+
+# Resource types (Playwright's request.resource_type vocabulary) blocked by default
+DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+
+# Ad, tracking and analytics hosts; subdomains are matched as well
+DEFAULT_BLOCKED_DOMAINS = (
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googletagservices.com',
+    'adservice.google.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'scorecardresearch.com',
+    'quantserve.com',
+    'hotjar.com',
+    'taboola.com',
+    'outbrain.com',
+    'criteo.com',
+    'amazon-adsystem.com',
+    'adnxs.com',
+    'segment.io',
+    'newrelic.com',
+    'nr-data.net',
+)
+
+# Rough average transfer size per resource type, used to estimate the bytes a blocked
+# request would have cost. The request never happens, so the real size is unknown.
+ESTIMATED_BYTES = {
+    'image': 60_000,
+    'media': 500_000,
+    'font': 40_000,
+    'stylesheet': 25_000,
+    'script': 30_000,
+    'other': 10_000,
+}
+
+_EXTENSION_TYPES = {
+    'image': ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp'),
+    'media': ('.mp4', '.webm', '.ogg', '.mp3', '.wav', '.m4a', '.m3u8', '.mov'),
+    'font': ('.woff', '.woff2', '.ttf', '.otf', '.eot'),
+    'stylesheet': ('.css',),
+    'script': ('.js', '.mjs'),
+}
+
+# Collects the sub-resource URLs a Selenium page referenced or loaded, so blocked ones can be counted
+_COLLECT_RESOURCES_JS = """
+var loaded = performance.getEntriesByType('resource')
+    .filter(function (e) { return e.responseEnd > 0 && (e.transferSize > 0 || e.decodedBodySize > 0); })
+    .map(function (e) { return e.name; });
+var referenced = [];
+function add(list, attr) { for (var i = 0; i < list.length; i++) { if (list[i][attr]) { referenced.push(list[i][attr]); } } }
+add(document.images, 'src');
+add(document.scripts, 'src');
+add(document.querySelectorAll('link[href]'), 'href');
+add(document.querySelectorAll('video[src], audio[src], source[src], iframe[src], embed[src]'), 'src');
+return {loaded: loaded, referenced: referenced};
+"""
+
+
+def guess_resource_type(url):
+    """Guess a Playwright-style resource type from a URL's file extension."""
+    path = urlparse(url).path.lower()
+    for resource_type, extensions in _EXTENSION_TYPES.items():
+        if path.endswith(extensions):
+            return resource_type
+    return 'other'
+
+
+class BlockingStats:
+    """
+    Requests blocked on one page, and an estimate of the bytes this saved.
+
+    `estimated` is True when the counts were not observed but inferred after the fact (Selenium,
+    see BlockingProfile.estimate_selenium_stats).
+    """
+
+    def __init__(self, estimated=False):
+        self.estimated = estimated
+        self.requests_blocked = 0
+        self.requests_allowed = 0
+        self.estimated_bytes_saved = 0
+        self.by_reason = Counter()
+        self.by_type = Counter()
+
+    def record_blocked(self, reason, resource_type, estimated_bytes):
+        self.requests_blocked += 1
+        self.estimated_bytes_saved += estimated_bytes
+        self.by_reason[reason] += 1
+        self.by_type[resource_type] += 1
+
+    def __repr__(self):
+        return (f"<BlockingStats blocked={self.requests_blocked}, allowed={self.requests_allowed}, "
+                f"estimated_bytes_saved={self.estimated_bytes_saved}, estimated={self.estimated}>")
+
+
+class BlockingProfile:
+    """
+    Decides which sub-resources a browser may download while rendering a page.
+
+    Requests are blocked by resource type, by URL glob pattern (e.g. '*/ads/*') or when their host
+    is, or is a subdomain of, one of `blocked_domains`. The main document is never blocked.
+    """
+
+    def __init__(self, resource_types=DEFAULT_BLOCKED_TYPES, url_patterns=(), blocked_domains=DEFAULT_BLOCKED_DOMAINS,
+                 estimated_bytes=None):
+        self.resource_types = frozenset(resource_types)
+        self.url_patterns = tuple(url_patterns)
+        self.blocked_domains = tuple(domain.lower().lstrip('.') for domain in blocked_domains)
+        self.estimated_bytes = dict(ESTIMATED_BYTES, **(estimated_bytes or {}))
+
+    def is_blocked_domain(self, host):
+        host = (host or '').lower()
+        return any(host == domain or host.endswith('.' + domain) for domain in self.blocked_domains)
+
+    def block_reason(self, url, resource_type=None):
+        """
+        Return why `url` should be blocked (e.g. 'type:image', 'domain:doubleclick.net'), or None to allow it.
+        """
+        if resource_type == 'document' or url.startswith(('data:', 'blob:', 'about:')):
+            return None
+        resource_type = resource_type or guess_resource_type(url)
+        if resource_type in self.resource_types:
+            return f'type:{resource_type}'
+        host = urlparse(url).hostname
+        if self.is_blocked_domain(host):
+            return f'domain:{host}'
+        for pattern in self.url_patterns:
+            if fnmatch.fnmatchcase(url, pattern):
+                return f'pattern:{pattern}'
+        return None
+
+    def new_stats(self):
+        """An empty BlockingStats for one page, so callers need not import this module."""
+        return BlockingStats()
+
+    def _estimate(self, resource_type):
+        return self.estimated_bytes.get(resource_type, self.estimated_bytes['other'])
+
+    def _decide(self, request, stats):
+        reason = self.block_reason(request.url, request.resource_type)
+        if reason:
+            stats.record_blocked(reason, request.resource_type, self._estimate(request.resource_type))
+            return False
+        stats.requests_allowed += 1
+        return True
+
+    # Playwright: request interception through page.route
+
+    def attach(self, page, stats=None):
+        """
+        Install the profile on a sync Playwright page (or context).
+
+        :return: BlockingStats that is filled while the page loads.
+        """
+        stats = stats if stats is not None else BlockingStats()
+
+        def handle(route):
+            if self._decide(route.request, stats):
+                route.continue_()
+            else:
+                route.abort()
+
+        page.route('**/*', handle)
+        return stats
+
+    async def attach_async(self, page, stats=None):
+        """Async Playwright counterpart of attach()."""
+        stats = stats if stats is not None else BlockingStats()
+
+        async def handle(route):
+            if self._decide(route.request, stats):
+                await route.continue_()
+            else:
+                await route.abort()
+
+        await page.route('**/*', handle)
+        return stats
+
+    # Selenium / Firefox: preferences and a PAC file, since WebDriver has no request interception
+
+    def proxy_autoconfig(self):
+        """PAC script that sends blocked domains and URL patterns to a dead local port."""
+        rules = ['dnsDomainIs(host, %s) || host == %s' % (json.dumps('.' + d), json.dumps(d))
+                 for d in self.blocked_domains]
+        rules += ['shExpMatch(url, %s)' % json.dumps(pattern) for pattern in self.url_patterns]
+        condition = ' || '.join(rules) or 'false'
+        return ("function FindProxyForURL(url, host) {\n"
+                f"    if ({condition}) {{ return 'PROXY 127.0.0.1:9'; }}\n"
+                "    return 'DIRECT';\n"
+                "}\n")
+
+    def firefox_preferences(self):
+        """Firefox preferences implementing this profile; apply them with Options.set_preference."""
+        preferences = {}
+        if 'image' in self.resource_types:
+            preferences['permissions.default.image'] = 2
+        if 'media' in self.resource_types:
+            preferences['media.autoplay.default'] = 5
+            preferences['media.preload.default'] = 0
+            preferences['media.preload.auto'] = 0
+        if 'font' in self.resource_types:
+            preferences['browser.display.use_document_fonts'] = 0
+            preferences['gfx.downloadable_fonts.enabled'] = False
+        if 'stylesheet' in self.resource_types:
+            preferences['permissions.default.stylesheet'] = 2
+        if self.blocked_domains or self.url_patterns:
+            preferences['network.proxy.type'] = 2
+            preferences['network.proxy.autoconfig_url'] = 'data:text/javascript,' + quote(self.proxy_autoconfig())
+            preferences['network.proxy.autoconfig_url.include_path'] = True
+        return preferences
+
+    def estimate_selenium_stats(self, driver):
+        """
+        Estimate BlockingStats for the page loaded in a Selenium driver.
+
+        WebDriver cannot see requests, so this compares the resources the DOM references with the
+        ones that were downloaded: a referenced resource the profile would block and that was not
+        downloaded counts as blocked. Requests the page never put in the DOM (e.g. made by scripts)
+        are missed. The result has estimated=True.
+        """
+        stats = BlockingStats(estimated=True)
+        resources = driver.execute_script(_COLLECT_RESOURCES_JS) or {}
+        loaded = set(resources.get('loaded', []))
+        stats.requests_allowed = len(loaded)
+        for url in set(resources.get('referenced', [])) - loaded:
+            resource_type = guess_resource_type(url)
+            reason = self.block_reason(url, resource_type)
+            if reason:
+                stats.record_blocked(reason, resource_type, self._estimate(resource_type))
+        return stats
+
+
+def load_domain_list(path):
+    """Read a blocked-domain list file: one domain per line, '#' starts a comment."""
+    domains = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                domains.append(line)
+    return tuple(domains)
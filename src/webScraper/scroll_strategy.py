@@ -0,0 +1,127 @@
+import time
+
+# Scrolls to the bottom and resolves once neither DOM mutations nor finished network
+# requests were observed for `quietMs`, or after `maxWaitMs` at the latest.
+_SCROLL_AND_WAIT_JS = """
+var quietMs = arguments[0], maxWaitMs = arguments[1], done = arguments[arguments.length - 1];
+var start = Date.now(), lastEvent = start, events = 0;
+function touch() { lastEvent = Date.now(); events += 1; }
+var mutations = new MutationObserver(touch);
+mutations.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+var network = null;
+try {
+    network = new PerformanceObserver(function (list) { if (list.getEntries().length) { touch(); } });
+    network.observe({entryTypes: ['resource']});
+} catch (e) {}
+window.scrollTo(0, document.body.scrollHeight);
+(function check() {
+    var now = Date.now();
+    if (now - lastEvent >= quietMs || now - start >= maxWaitMs) {
+        mutations.disconnect();
+        if (network) { network.disconnect(); }
+        done({height: document.body.scrollHeight, events: events});
+    } else {
+        setTimeout(check, Math.min(50, quietMs));
+    }
+})();
+"""
+
+
+class ScrollStats:
+    """How much work a scroll strategy spent on one page."""
+
+    def __init__(self, rounds=0, elapsed_ms=0.0, reason=''):
+        self.rounds = rounds
+        self.elapsed_ms = elapsed_ms
+        self.reason = reason
+
+    def __repr__(self):
+        return f"<ScrollStats rounds={self.rounds}, elapsed_ms={self.elapsed_ms:.0f}, reason={self.reason}>"
+
+
+class ScrollStrategy:
+    """Base class: scroll a loaded page until its lazy content is in the DOM."""
+
+    def scroll(self, driver):
+        """
+        Scroll the page currently loaded in `driver`.
+
+        :param driver: Selenium WebDriver positioned on the page.
+        :return: ScrollStats describing the rounds and time spent.
+        """
+        raise NotImplementedError
+
+
+class NoScroll(ScrollStrategy):
+    """For pages known to be static: do not scroll at all."""
+
+    def scroll(self, driver):
+        return ScrollStats(reason='disabled')
+
+
+class FixedDelayScroll(ScrollStrategy):
+    """The original behaviour: sleep a fixed delay after every scroll and compare page heights."""
+
+    def __init__(self, delay=2, max_scrolls=50, max_time=60):
+        self.delay = delay
+        self.max_scrolls = max_scrolls
+        self.max_time = max_time
+
+    def scroll(self, driver):
+        start = time.monotonic()
+        rounds = 0
+        reason = 'max_scrolls'
+        last_height = driver.execute_script("return document.body.scrollHeight")
+        while rounds < self.max_scrolls:
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(self.delay)
+            rounds += 1
+            new_height = driver.execute_script("return document.body.scrollHeight")
+            if new_height == last_height:
+                reason = 'end_of_page'
+                break
+            last_height = new_height
+            if time.monotonic() - start >= self.max_time:
+                reason = 'time_budget'
+                break
+        return ScrollStats(rounds, (time.monotonic() - start) * 1000, reason)
+
+
+class QuietWindowScroll(ScrollStrategy):
+    """
+    Event driven scrolling: after each scroll, wait until the DOM and the network have been
+    quiet for `quiet_ms` (at most `max_wait_ms`) instead of sleeping a fixed delay.
+
+    :param quiet_ms: Length of the quiet window that ends a round.
+    :param max_wait_ms: Upper bound for a single round.
+    :param max_scrolls: Maximum number of scroll rounds.
+    :param max_time: Wall-clock budget for the whole page in seconds.
+    """
+
+    def __init__(self, quiet_ms=300, max_wait_ms=3000, max_scrolls=30, max_time=20):
+        self.quiet_ms = quiet_ms
+        self.max_wait_ms = max_wait_ms
+        self.max_scrolls = max_scrolls
+        self.max_time = max_time
+
+    def scroll(self, driver):
+        start = time.monotonic()
+        rounds = 0
+        reason = 'max_scrolls'
+        # Leave the script some slack on top of the in-page wait
+        driver.set_script_timeout(self.max_wait_ms / 1000 + 5)
+        last_height = driver.execute_script("return document.body.scrollHeight")
+        while rounds < self.max_scrolls:
+            remaining_ms = self.max_time * 1000 - (time.monotonic() - start) * 1000
+            if remaining_ms <= 0:
+                reason = 'time_budget'
+                break
+            result = driver.execute_async_script(
+                _SCROLL_AND_WAIT_JS, self.quiet_ms, min(self.max_wait_ms, remaining_ms))
+            rounds += 1
+            new_height = result['height']
+            if new_height == last_height:
+                reason = 'end_of_page'
+                break
+            last_height = new_height
+        return ScrollStats(rounds, (time.monotonic() - start) * 1000, reason)
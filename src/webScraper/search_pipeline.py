@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urldefrag
+
+from DomBuilder.parserBackend import parse_html
+from .web_scraper_module import WebScraper
+
+
+class ScrapedPage:
+    """
+    A page scraped for a search query: its soup, or its HTMLTree when trees are built, and the
+    ScrollStats and BlockingStats of that page (see ScrapeResult).
+    """
+
+    def __init__(self, query, url, soup=None, tree=None, error=None, scroll_stats=None, blocking_stats=None):
+        self.query = query
+        self.url = url
+        self.soup = soup
+        self.tree = tree
+        self.error = error
+        self.scroll_stats = scroll_stats
+        self.blocking_stats = blocking_stats
+
+    @property
+    def ok(self):
+        return self.error is None and (self.soup is not None or self.tree is not None)
+
+    def __repr__(self):
+        return f"<ScrapedPage query={self.query!r}, url={self.url}, ok={self.ok}>"
+
+
+def normalize_url(url):
+    """Key used to deduplicate search results: the URL without fragment and trailing slash."""
+    return urldefrag(url)[0].rstrip('/')
+
+
+class SearchScraper:
+    """
+    Runs Google searches and fans the result URLs out to a pool of workers sharing one WebScraper
+    (and therefore its pool of warm browsers).
+
+    :param scraper: WebScraper to use; by default a headless one with `workers` pooled drivers.
+    :param workers: Number of pages scraped in parallel.
+    :param search_ttl: Seconds a query's search results are reused.
+    :param build_tree: Also build an HTMLTree for every page inside the worker.
+    :param remove_rules: Removal rules for the trees, e.g. a RuleProfiles with per-site rules
+        (see DomBuilder.removeRules); None uses clean_html's defaults.
+    :param boilerplate: Optional BoilerplateLearner shared by all workers, so the trees of a site
+        lose what the site repeats on every page (see DomBuilder.boilerplate).
+    """
+
+    def __init__(self, scraper=None, workers=4, search_ttl=3600, build_tree=False, remove_rules=None,
+                 boilerplate=None):
+        self.scraper = scraper or WebScraper(headless=True, pool_size=workers)
+        self.workers = workers
+        self.search_ttl = search_ttl
+        self.build_tree = build_tree
+        self.remove_rules = remove_rules
+        self.boilerplate = boilerplate
+        self._search_cache = {}
+        self._lock = threading.Lock()
+
+    def search(self, query, num_results=10):
+        """Return the result URLs for a query, served from the TTL cache when possible."""
+        key = (query, num_results)
+        with self._lock:
+            cached = self._search_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.search_ttl:
+            return cached[1]
+
+        urls = self.scraper.perform_google_search(query, num_results=num_results)
+        # perform_google_search returns [] on errors, which must not be cached
+        if urls:
+            with self._lock:
+                self._search_cache[key] = (time.monotonic(), urls)
+        return urls
+
+    def _scrape(self, query, url):
+        # The stats travel with the result: the workers share one scraper
+        result = self.scraper.scrape_with_info(url)
+        page = ScrapedPage(query, url, scroll_stats=result.scroll_stats, blocking_stats=result.blocking_stats)
+        if result.html is None:
+            page.error = 'scrape failed'
+        elif self.build_tree:
+            # Build straight from the raw HTML so the page is parsed only once
+            from DomBuilder.HTMLTree import HTMLTree
+            page.tree = HTMLTree.from_html(result.html, parser=self.scraper.parser, tags_to_remove=self.remove_rules,
+                                           url=url, boilerplate=self.boilerplate)
+        else:
+            page.soup = parse_html(result.html, self.scraper.parser)
+        return page
+
+    def search_and_scrape(self, queries, num_results=10):
+        """
+        Search every query and scrape the deduplicated result URLs in parallel.
+
+        :param queries: A query string or an iterable of them.
+        :return: Generator of ScrapedPage objects in completion order.
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {}
+        seen = set()
+        try:
+            for query in queries:
+                for url in self.search(query, num_results):
+                    key = normalize_url(url)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    pending[executor.submit(self._scrape, query, url)] = (query, url)
+
+                # Hand back whatever finished while we were searching
+                for future in [f for f in pending if f.done()]:
+                    yield self._collect(future, pending.pop(future))
+
+            for future in as_completed(list(pending)):
+                yield self._collect(future, pending.pop(future))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _collect(future, job):
+        query, url = job
+        try:
+            return future.result()
+        except Exception as e:
+            return ScrapedPage(query, url, error=e)
+
+    def close(self):
+        self.scraper.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
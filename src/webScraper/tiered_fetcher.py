@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from bs4 import NavigableString, Tag
+
+from DomBuilder.cleanHTML import compile_remove_rules, tags_to_remove as default_tags_to_remove
+from DomBuilder.parserBackend import parse_html
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Mount points of client side rendered apps (React, Next, Nuxt, Gatsby, Vue, Angular, Ember)
+FRAMEWORK_ROOT_IDS = ['root', 'app', '__next', '__nuxt', '___gatsby', 'ember-app', 'q-app']
+FRAMEWORK_ROOT_TAGS = ['app-root']
+
+STATIC = 'static'
+BROWSER = 'browser'
+CACHE = 'cache'
+
+
+def kept_text_length(tag, tags_to_remove=default_tags_to_remove):
+    """
+    Length of the stripped text below `tag` outside the tags clean_html removes, from one walk that
+    neither cleans nor edits the soup. Selector rules and HTML held by scripts are not considered.
+    """
+    rules = compile_remove_rules(tags_to_remove)
+    length = 0
+    stack = [tag]
+    while stack:
+        for child in stack.pop().contents:
+            if isinstance(child, Tag):
+                if rules.match_attributes(child.name, child.attrs) is None:
+                    stack.append(child)
+            elif type(child) is NavigableString:
+                length += len(child.strip())
+    return length
+
+
+def needs_javascript(soup, min_text_length=200, tags_to_remove=default_tags_to_remove):
+    """
+    Decide whether a statically fetched page must be rendered in a browser.
+
+    :param soup: BeautifulSoup of the raw server response.
+    :param min_text_length: Pages with less visible text than this, outside the tags clean_html
+        removes, need a browser (see kept_text_length).
+    :param tags_to_remove: Removal rules the text is counted without, see cleanHTML.clean_html.
+    :return: The reason ('empty_body', 'framework_root', 'too_little_text') or None if the static HTML is usable.
+    """
+    body = soup.find('body')
+    if body is None or not body.get_text(strip=True):
+        return 'empty_body'
+
+    root = body.find(id=FRAMEWORK_ROOT_IDS) or body.find(FRAMEWORK_ROOT_TAGS)
+    if root is not None and len(root.get_text(strip=True)) < min_text_length:
+        return 'framework_root'
+
+    if kept_text_length(body, tags_to_remove) < min_text_length:
+        return 'too_little_text'
+    return None
+
+
+class TieredResult:
+    """
+    A fetched page and how it was obtained.
+
+    :param status: HTTP status of the response the result comes from; None for browser renders,
+        whose status is unknown. A 429 or 5xx comes back from the static tier without a soup.
+    """
+
+    def __init__(self, url, soup, tier, reason=None, status=None):
+        self.url = url
+        self.soup = soup
+        self.tier = tier
+        self.reason = reason
+        self.status = status
+
+    def __repr__(self):
+        return f"<TieredResult url={self.url}, tier={self.tier}, reason={self.reason}, status={self.status}>"
+
+
+class TieredFetcher:
+    """
+    Static-first fetcher: tries a pooled keep-alive HTTP client and only escalates to a browser
+    when the response looks like it needs JavaScript.
+
+    A page that needs a browser is rendered on its own; its domain only goes straight to the browser
+    after `browser_after` such pages in a row (a single 404, login or contact page says nothing
+    about the rest of the site), and the static tier is tried again `recheck_after` seconds later.
+
+    :param browser_fetch: Callable url -> rendered HTML used for escalation, e.g. WebScraper(...).scrape_html.
+        Defaults to DomBuilder.scrapeHTML.fetch_html. A callable returning a BeautifulSoup (e.g.
+        scrape_page) works too, but then the page is not cached, since the cache holds raw HTML.
+    :param pool_size: Connections kept alive per host.
+    :param timeout: HTTP timeout in seconds for the static tier.
+    :param min_text_length: Threshold passed to needs_javascript.
+    :param trust_after: After this many static successes without escalation, a domain skips the heuristic.
+    :param browser_after: Consecutive pages needing a browser after which the whole domain is rendered.
+    :param recheck_after: Seconds after which a domain sent to the browser gets a static fetch again.
+    :param decisions_path: Optional JSON file the per-domain decisions are loaded from and saved to.
+    :param cache: Optional PageCache; static fetches revalidate cached pages with conditional requests.
+    :param archive: Optional ArchiveWriter static fetches are recorded to (give the browser fetcher its own).
+    :param parser: Parser backend for the soups, see DomBuilder.parserBackend.
+    :param session: Optional requests.Session (or anything with its get()) for the static tier; by
+        default a pooled keep-alive session is created on first use.
+    """
+
+    def __init__(self, browser_fetch=None, user_agent=None, pool_size=10, timeout=15, min_text_length=200,
+                 trust_after=5, browser_after=3, recheck_after=7 * 24 * 3600, decisions_path=None, cache=None,
+                 archive=None, parser=None, session=None):
+        self.browser_fetch = browser_fetch
+        self.parser = parser
+        self.cache = cache
+        self.archive = archive
+        self.timeout = timeout
+        self.min_text_length = min_text_length
+        self.trust_after = trust_after
+        self.browser_after = browser_after
+        self.recheck_after = recheck_after
+        self.decisions_path = decisions_path
+        self.user_agent = user_agent
+        self.pool_size = pool_size
+        self._session = session
+
+        # domain -> {'mode': STATIC | BROWSER | None, 'static_hits': int, 'failures': consecutive pages
+        # needing a browser, 'reason': str, 'since': time the domain was sent to the browser}
+        self.domains = {}
+        self._lock = threading.Lock()
+        if decisions_path and os.path.exists(decisions_path):
+            with open(decisions_path, encoding='utf-8') as handle:
+                self.domains = json.load(handle)
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=1)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+            self._session.headers.update({
+                'User-Agent': self.user_agent or DEFAULT_USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+            })
+        return self._session
+
+    def fetch(self, url):
+        """Fetch a page through the cheapest tier that works and return its BeautifulSoup (None on error)."""
+        return self.fetch_with_info(url).soup
+
+    def fetch_with_info(self, url):
+        """Like fetch(), but return a TieredResult that records the tier used and why."""
+        domain = urlparse(url).netloc.lower()
+        decision = self.domains.get(domain, {})
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and entry.is_fresh():
+            return TieredResult(url, parse_html(self.cache.read(entry), self.parser), CACHE)
+        if decision.get('mode') == BROWSER and time.time() - decision.get('since', 0) < self.recheck_after:
+            if entry and self.cache.revalidate(entry):
+                return TieredResult(url, parse_html(self.cache.read(entry), self.parser), CACHE, 'not_modified')
+            return self._browser(url, decision.get('reason'))
+
+        headers = entry.conditional_headers() if entry and not entry.rendered else {}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except OSError as e:  # requests.RequestException is an OSError
+            print(f"Static fetch failed for {url}: {e}")
+            return self._browser(url, 'network_error')
+
+        if response.status_code == 304 and entry:
+            self.cache.touch(entry, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return TieredResult(url, parse_html(self.cache.read(entry), self.parser), CACHE, 'not_modified', 304)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            # Throttled or overloaded: rendering the page now would only add load on the host, so the
+            # static status goes back to the caller, which backs off (see politeness.PolitenessScheduler)
+            return TieredResult(url, None, STATIC, f'http_{response.status_code}', response.status_code)
+
+        if response.status_code in (401, 403):
+            # Often bot protection that only plain clients get; a 403 counts towards sending the
+            # domain to the browser like a page needing JavaScript (see _remember)
+            if response.status_code == 403:
+                self._remember(domain, BROWSER, 'http_403')
+            return self._browser(url, f'http_{response.status_code}')
+
+        content_type = response.headers.get('Content-Type', '')
+        if content_type and 'html' not in content_type:
+            return TieredResult(url, None, STATIC, 'not_html', response.status_code)
+
+        soup = parse_html(response.text, self.parser)
+        trusted = decision.get('mode') == STATIC and decision.get('static_hits', 0) >= self.trust_after
+        reason = None if trusted else needs_javascript(soup, self.min_text_length)
+        if reason:
+            self._remember(domain, BROWSER, reason)
+            return self._browser(url, reason)
+
+        self._remember(domain, STATIC)
+        if self.cache:
+            self.cache.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        if self.archive:
+            self.archive.write(url, response.text, final_url=response.url, headers=dict(response.headers),
+                               timing={'elapsed_ms': response.elapsed.total_seconds() * 1000})
+        return TieredResult(url, soup, STATIC, status=response.status_code)
+
+    def _browser(self, url, reason):
+        if self.browser_fetch is None:
+            from DomBuilder.scrapeHTML import fetch_html
+            page = fetch_html(url)
+        else:
+            page = self.browser_fetch(url)
+        if isinstance(page, str):
+            soup = parse_html(page, self.parser)
+            if self.cache:
+                validators = self.cache.validators(url) if self.cache.probe_validators else {}
+                self.cache.put(url, page, rendered=True, **validators)
+        else:
+            soup = page
+        # The status of the static response does not describe the rendered page, and the browser does
+        # not report one
+        return TieredResult(url, soup, BROWSER, reason)
+
+    def _remember(self, domain, mode, reason=None):
+        """Record that a page of the domain worked statically (STATIC) or needed a browser (BROWSER)."""
+        with self._lock:
+            decision = self.domains.setdefault(domain, {'mode': None, 'static_hits': 0})
+            previous_mode = decision['mode']
+            if mode == STATIC:
+                decision['mode'] = STATIC
+                decision['failures'] = 0
+                decision['static_hits'] = decision.get('static_hits', 0) + 1
+                changed = previous_mode != STATIC or decision['static_hits'] == self.trust_after
+            else:
+                decision['failures'] = decision.get('failures', 0) + 1
+                decision['reason'] = reason
+                changed = decision['failures'] >= self.browser_after
+                if changed:
+                    decision['mode'] = BROWSER
+                    decision['since'] = time.time()
+            if self.decisions_path and changed:
+                self._save()
+
+    def _save(self):
+        # Write a temporary file and swap it in, so a crash never leaves a truncated file behind
+        temporary = f'{self.decisions_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump(self.domains, handle, indent=2)
+        os.replace(temporary, self.decisions_path)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
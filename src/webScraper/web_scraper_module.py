@@ -1,19 +1,64 @@
-import time
 import tempfile
 import shutil
+import time
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from googlesearch import search
+from DomBuilder.parserBackend import parse_html
+from .driver_pool import DriverPool, PooledDriver
+from .scroll_strategy import QuietWindowScroll
+
+class ScrapeResult:
+    """
+    One page rendered by WebScraper, with what it cost.
+
+    :param scroll_stats: ScrollStats of the page; None when the page came from the cache.
+    :param blocking_stats: Estimated BlockingStats of the page when a blocking profile is set.
+    """
+
+    def __init__(self, url, html=None, final_url=None, scroll_stats=None, blocking_stats=None, error=None):
+        self.url = url
+        self.html = html
+        self.final_url = final_url or url
+        self.scroll_stats = scroll_stats
+        self.blocking_stats = blocking_stats
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.html is not None
+
+    def __repr__(self):
+        return f"<ScrapeResult url={self.url}, ok={self.ok}, scroll_stats={self.scroll_stats}>"
+
 
 class WebScraper:
-    def __init__(self, headless=False, user_agent=None):
+    def __init__(self, headless=False, user_agent=None, pool_size=1, max_pages_per_driver=50, max_rss_mb=None,
+                 scroll_strategy=None, blocking_profile=None, cache=None,
+                 archive=None, parser=None):
+        """
+        :param pool_size: Number of warm browser drivers kept for scrape_page.
+        :param max_pages_per_driver: Recycle a driver after it served this many pages.
+        :param max_rss_mb: Recycle a driver once its browser uses more memory than this (requires psutil).
+        :param scroll_strategy: ScrollStrategy used to load lazy content (defaults to QuietWindowScroll).
+        :param blocking_profile: Optional BlockingProfile restricting which sub-resources the browser downloads.
+        :param cache: Optional PageCache; fresh or unchanged pages are served without opening a browser.
+        :param archive: Optional ArchiveWriter every rendered page is recorded to.
+        :param parser: Parser backend for scrape_page, see DomBuilder.parserBackend.
+        """
         self.headless = headless
         self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        self.driver = None
+        self.pool = DriverPool(self._create_driver, size=pool_size,
+                               max_pages_per_driver=max_pages_per_driver, max_rss_mb=max_rss_mb)
+        self.scroll_strategy = scroll_strategy or QuietWindowScroll()
+        self.blocking_profile = blocking_profile
+        self.cache = cache
+        self.archive = archive
+        self.parser = parser
 
     def _create_driver(self):
         # Create a temporary directory for Firefox profile
@@ -24,14 +69,24 @@ class WebScraper:
         options.headless = self.headless  # Run Firefox in headless mode
         options.add_argument('--width=10')  # Set window width
         options.add_argument('--height=10')  # Set window height
+        # Lets the pool clear every site's cookies and storage between pages (DriverPool.reset_state)
+        options.add_argument('-remote-allow-system-access')
         options.add_argument('-profile')
         # options.add_argument("--headless")  # Run Chrome in headless mode
 
         options.add_argument(profile_dir)  # Point to the temporary profile
         options.set_preference("general.useragent.override", self.user_agent)
+        if self.blocking_profile:
+            for name, value in self.blocking_profile.firefox_preferences().items():
+                options.set_preference(name, value)
 
         # Initialize the WebDriver with the options
-        self.driver = webdriver.Firefox(options=options)
+        try:
+            driver = webdriver.Firefox(options=options)
+        except Exception:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+            raise
+        return PooledDriver(driver, profile_dir)
 
     def perform_google_search(self, query, num_results=10):
         try:
@@ -42,36 +97,93 @@ class WebScraper:
             print(f"An error occurred: {e}")
             return []
 
-    def scrape_page(self, url):
+    def scrape_page(self, url, scroll_strategy=None):
+        """
+        Load a page in a pooled browser, scroll it and return the parsed HTML.
+
+        :param scroll_strategy: Overrides the scraper's ScrollStrategy for this page (e.g. NoScroll()).
+        :return: BeautifulSoup of the page, or None on error.
+        """
+        html_content = self.scrape_html(url, scroll_strategy)
+        if html_content is None:
+            return None
+        return parse_html(html_content, self.parser)
+
+    def scrape_html(self, url, scroll_strategy=None):
+        """
+        Like scrape_page, but return the raw HTML string without parsing it.
+
+        Use this with HTMLTree.from_html so the page is only parsed once.
+        """
+        return self.scrape_with_info(url, scroll_strategy).html
+
+    def scrape_with_info(self, url, scroll_strategy=None):
+        """
+        Like scrape_html, but return a ScrapeResult holding the page's scroll and blocking stats.
+
+        The stats come with the result rather than being kept on the scraper, which several
+        threads may share (see SearchScraper).
+        """
+        if not self.cache:
+            return self._render_page(url, scroll_strategy)
+        rendered = []
+
+        def render(page_url):
+            result = self._render_page(page_url, scroll_strategy)
+            rendered.append(result)
+            return result.html
+
+        html = self.cache.fetch(url, render)
+        return rendered[0] if rendered else ScrapeResult(url, html)
+
+    def _render_page(self, url, scroll_strategy=None):
+        """Render a page in a pooled browser; the ScrapeResult holds the error if that failed."""
+        pooled = None
+        broken = False
+        start = time.monotonic()
         try:
-            if self.driver is None:
-                self._create_driver()
+            pooled = self.pool.acquire()
+            driver = pooled.driver
 
             # Navigate to the webpage
-            self.driver.get(url)
+            driver.get(url)
 
             # Wait for the page to load (adjust as needed)
-            wait = WebDriverWait(self.driver, 10)
+            wait = WebDriverWait(driver, 10)
             wait.until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
 
-            # Scroll until the end of the page
-            last_height = self.driver.execute_script("return document.body.scrollHeight")
-            while True:
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
+            # Scroll until the end of the page (or the strategy's budget)
+            strategy = scroll_strategy or self.scroll_strategy
+            scroll_stats = strategy.scroll(driver)
+            blocking_stats = self.blocking_profile.estimate_selenium_stats(driver) if self.blocking_profile else None
 
             # Get the full HTML content of the page
-            html_content = self.driver.page_source
-            soup = BeautifulSoup(html_content, 'html.parser')
-            return soup
+            html_content = driver.page_source
+            final_url = driver.current_url
+            if self.archive:
+                timing = {'elapsed_ms': (time.monotonic() - start) * 1000}
+                if scroll_stats:
+                    timing['scroll_ms'] = scroll_stats.elapsed_ms
+                self.archive.write(url, html_content, final_url=final_url, timing=timing)
+            return ScrapeResult(url, html_content, final_url, scroll_stats, blocking_stats)
         except Exception as e:
+            # A page that did not load in time leaves a usable browser; other WebDriver errors
+            # (crashed browser, lost session) do not
+            broken = isinstance(e, WebDriverException) and not isinstance(e, TimeoutException)
             print(f"Error while scraping page: {e}")
-            return None
+            return ScrapeResult(url, error=e)
         finally:
-            if self.driver:
-                self.driver.quit()
+            # The pool resets the driver for the next page, or discards it when it is broken or
+            # cannot be reset
+            if pooled:
+                self.pool.release(pooled, broken=broken)
+
+    def close(self):
+        """Shut down all pooled browsers and remove their temporary profiles."""
+        self.pool.close()
+
+    def __enter__(self):
+        return self
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
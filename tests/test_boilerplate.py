@@ -0,0 +1,37 @@
+import json
+import os
+
+from DomBuilder.boilerplate import BoilerplateLearner
+
+PAGE = '''<html><body>
+<nav class="menu"><a href="/a">Home page of the site</a><a href="/b">About this site</a></nav>
+<article><p>{body}</p></article>
+</body></html>'''
+
+
+def page(number):
+    return PAGE.format(body=f'Article number {number} with its own unique text that differs per page.')
+
+
+def test_state_is_saved_once_the_template_is_fixed(tmp_path):
+    path = os.path.join(tmp_path, 'domains.json')
+    learner = BoilerplateLearner(path, sample_size=3, save_every=100)
+    learner.learn('https://example.com/1', page(1))
+    learner.learn('https://example.com/2', page(2))
+    assert not os.path.exists(path)
+
+    learner.learn('https://example.com/3', page(3))
+    with open(path, encoding='utf-8') as handle:
+        saved = json.load(handle)
+    assert 'template' in saved['example.com']
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_state_is_saved_every_n_sampled_pages(tmp_path):
+    path = os.path.join(tmp_path, 'domains.json')
+    learner = BoilerplateLearner(path, sample_size=100, save_every=2)
+    learner.learn('https://example.com/1', page(1))
+    assert not os.path.exists(path)
+    learner.learn('https://example.com/2', page(2))
+    with open(path, encoding='utf-8') as handle:
+        assert json.load(handle)['example.com']['pages'] == 2
@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+from DomBuilder.benchmark import PAGES_DIRECTORY, clean_html_multipass, load_pages
+from DomBuilder.cleanHTML import clean_html
+
+PAGES = load_pages([PAGES_DIRECTORY])
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_clean_html_matches_the_reparsing_cleaner_on_fixture_pages(name, html):
+    assert str(clean_html(html)) == str(clean_html_multipass(html))
+
+
+def test_text_unwrapped_from_a_style_is_plain_text_again():
+    html = '<html><body><p>Intro text\n<style>a { color: red }\n\n</style>\nafter the style</p></body></html>'
+    assert str(clean_html(html, {})) == str(clean_html_multipass(html, {}))
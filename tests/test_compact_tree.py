@@ -0,0 +1,92 @@
+import os
+import pickle
+
+import pytest
+
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import PAGES_DIRECTORY, load_pages
+from DomBuilder.compactTree import CompactTree
+
+PAGES = load_pages([PAGES_DIRECTORY])
+IDS = [os.path.basename(name) for name, _ in PAGES]
+
+
+def node_data(tree):
+    """Everything a reader of the tree sees, node by node in pre-order."""
+    rows = []
+    for node in tree.all_nodes():
+        parent = tree.parent(node.identifier)
+        rows.append((node.identifier, node.number, node.text, node.tag, list(node.hrefs),
+                     bool(node.is_repetitive_node), tree.level(node.identifier),
+                     parent.identifier if parent else None,
+                     [child.identifier for child in tree.children(node.identifier)]))
+    return rows
+
+
+def pre_order(tree):
+    """treelib keeps its nodes in insertion order; list them parent before children as CompactTree does."""
+    nodes = []
+    stack = [tree.root]
+    while stack:
+        nid = stack.pop()
+        nodes.append(nid)
+        stack.extend(child.identifier for child in reversed(tree.children(nid)))
+    return nodes
+
+
+@pytest.fixture(scope='module', params=PAGES, ids=IDS)
+def trees(request):
+    name, html = request.param
+    html_tree = HTMLTree.from_html(html)
+    return html, html_tree, CompactTree.from_tree(html_tree.tree, html_tree.node_identifier.number_csspath_mapping)
+
+
+def test_compact_tree_holds_the_same_nodes(trees):
+    _, html_tree, compact = trees
+    tree = html_tree.tree
+    expected = {row[0]: row for row in node_data(tree)}
+    assert [row[0] for row in node_data(compact)] == pre_order(tree)
+    assert node_data(compact) == [expected[nid] for nid in pre_order(tree)]
+    assert [leaf.identifier for leaf in compact.leaves()] == [nid for nid in pre_order(tree) if tree[nid].is_leaf()]
+
+
+def test_compact_tree_shows_like_treelib(trees):
+    _, html_tree, compact = trees
+    tree = html_tree.tree
+    for line_type in ('ascii', 'ascii-ex'):
+        for sorting in (True, False):
+            assert (compact.show(line_type=line_type, stdout=False, sorting=sorting)
+                    == tree.show(line_type=line_type, stdout=False, sorting=sorting))
+
+
+def test_compact_tree_answers_css_paths_and_string_trees(trees):
+    html, html_tree, compact = trees
+    mapping = html_tree.node_identifier.number_csspath_mapping
+    assert {number: compact.get_csspath(number) for number in mapping} == mapping
+
+    compacted = HTMLTree.from_html(html, compact=True)
+    assert isinstance(compacted.tree, CompactTree)
+    assert compacted.get_string_tree() == html_tree.get_string_tree()
+    assert {number: compacted.node_identifier.get_csspath(number) for number in mapping} == mapping
+
+
+def test_pickled_and_saved_trees_are_identical(trees, tmp_path):
+    _, _, compact = trees
+    compact.metadata = {'url': 'https://example.com/'}
+    data = compact.to_bytes()
+
+    unpickled = pickle.loads(pickle.dumps(compact))
+    path = str(tmp_path / 'page.tree')
+    compact.save(path)
+    loaded = CompactTree.load(path)
+    mapped = CompactTree.load(path, mmap=True)
+    for copy in (unpickled, loaded, mapped):
+        assert copy.to_bytes() == data
+        assert copy.metadata == compact.metadata
+        assert node_data(copy) == node_data(compact)
+        assert copy.show(stdout=False) == compact.show(stdout=False)
+    del mapped
+
+
+def test_empty_tree_survives_the_binary_format():
+    assert len(pickle.loads(pickle.dumps(CompactTree()))) == 0
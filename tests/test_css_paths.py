@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from DomBuilder import helper
+from DomBuilder.benchmark import PAGES_DIRECTORY, list_page, load_pages
+from DomBuilder.cleanHTML import clean_html
+from DomBuilder.parserBackend import parse_html
+
+PAGES = load_pages([PAGES_DIRECTORY]) + [('list_page(200)', list_page(200))]
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_index_paths_match_get_css_path(name, html):
+    for soup in (parse_html(html), clean_html(html)):
+        index = helper.CssPathIndex(soup)
+        for tag in soup.find_all(True):
+            assert index.path(tag) == helper.get_css_path(tag)
+            assert helper.get_css_path(tag, index) == index.path(tag)
+
+
+def test_text_nodes_have_the_path_of_their_parent():
+    soup = parse_html('<html><body><p>First</p><p>Second <b>bold</b> tail</p></body></html>')
+    index = helper.CssPathIndex(soup)
+    for string in soup.find_all(string=True):
+        assert index.path(string) == helper.get_css_path(string)
+    assert index.path(soup.find_all('p')[1].contents[-1]) == 'html > body > p:nth-child(2)'
+
+
+def test_tags_added_after_indexing_get_their_path_on_first_use():
+    soup = parse_html('<html><body><div><p>One</p><p>Two</p></div></body></html>')
+    index = helper.CssPathIndex(soup)
+    paragraph = soup.new_tag('p')
+    soup.div.append(paragraph)
+    span = soup.new_tag('span')
+    paragraph.append(span)
+    assert index.path(span) == helper.get_css_path(span) == 'html > body > div > p:nth-child(3) > span'
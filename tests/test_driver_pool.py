@@ -0,0 +1,160 @@
+import os
+from contextlib import contextmanager
+
+from webScraper.driver_pool import DriverPool, PooledDriver
+
+
+class FakeDriver:
+    """Records what the pool does to it; offers no way to clear other sites' data."""
+
+    def __init__(self):
+        self.current_url = 'https://example.com/page'
+        self.calls = []
+        self.quit_called = False
+
+    def execute_script(self, script):
+        self.calls.append('script')
+
+    def get(self, url):
+        self.calls.append(('get', url))
+        self.current_url = url
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeChromiumDriver(FakeDriver):
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Page.getFrameTree':
+            return {'frameTree': {
+                'frame': {'url': self.current_url},
+                'childFrames': [
+                    {'frame': {'url': 'https://ads.example.net/frame'},
+                     'childFrames': [{'frame': {'url': 'https://tracker.example.org/pixel'}}]},
+                    {'frame': {'url': 'about:blank'}},
+                ],
+            }}
+        self.calls.append((command, params.get('origin')))
+
+
+class FakeFirefoxDriver(FakeDriver):
+    CONTEXT_CHROME = 'chrome'
+
+    @contextmanager
+    def context(self, name):
+        self.calls.append(('context', name))
+        yield
+
+    def execute_async_script(self, script):
+        self.calls.append('clear data')
+
+
+def pool_of(driver, **kwargs):
+    return DriverPool(lambda: PooledDriver(driver), size=1, **kwargs)
+
+
+def test_chromium_drivers_are_cleared_over_devtools():
+    driver = FakeChromiumDriver()
+    pool = pool_of(driver)
+    pool.release(pool.acquire())
+    assert ('Network.clearBrowserCookies', None) in driver.calls
+    cleared = [call[1] for call in driver.calls if call[0] == 'Storage.clearDataForOrigin']
+    assert cleared == ['https://ads.example.net', 'https://example.com', 'https://tracker.example.org']
+    assert pool.acquire().driver is driver
+
+
+def test_firefox_drivers_are_cleared_from_the_privileged_context():
+    driver = FakeFirefoxDriver()
+    pool = pool_of(driver)
+    pool.release(pool.acquire())
+    assert driver.calls[-2:] == [('context', 'chrome'), 'clear data']
+    assert not driver.quit_called
+
+
+def test_drivers_that_cannot_be_cleared_are_discarded():
+    driver = FakeDriver()
+    pool = pool_of(driver)
+    pool.release(pool.acquire())
+    assert driver.quit_called
+
+
+def test_broken_drivers_are_discarded():
+    driver = FakeFirefoxDriver()
+    pool = pool_of(driver)
+    pool.release(pool.acquire(), broken=True)
+    assert driver.quit_called
+    assert 'clear data' not in driver.calls
+
+
+def test_drivers_are_recycled_after_max_pages_per_driver():
+    drivers = []
+
+    def create_driver():
+        drivers.append(FakeChromiumDriver())
+        return PooledDriver(drivers[-1])
+
+    pool = DriverPool(create_driver, size=1, max_pages_per_driver=2)
+    for _ in range(2):
+        pool.release(pool.acquire())
+    assert len(drivers) == 1
+    assert drivers[0].quit_called
+    assert pool.acquire().driver is not drivers[0]
+    assert len(drivers) == 2
+
+
+def test_drivers_are_recycled_above_max_rss_mb(monkeypatch):
+    rss = {'mb': 100}
+    monkeypatch.setattr(PooledDriver, 'rss_mb', lambda self: rss['mb'])
+    driver = FakeChromiumDriver()
+    pool = pool_of(driver, max_rss_mb=500)
+    pool.release(pool.acquire())
+    assert not driver.quit_called
+
+    rss['mb'] = 600
+    pool.release(pool.acquire())
+    assert driver.quit_called
+
+
+def test_unknown_rss_does_not_recycle(monkeypatch):
+    monkeypatch.setattr(PooledDriver, 'rss_mb', lambda self: None)
+    driver = FakeChromiumDriver()
+    pool = pool_of(driver, max_rss_mb=1)
+    pool.release(pool.acquire())
+    assert not driver.quit_called
+
+
+def test_close_quits_idle_drivers_and_removes_their_profiles(tmp_path):
+    profile_dir = tmp_path / 'profile'
+    (profile_dir / 'Default').mkdir(parents=True)
+    (profile_dir / 'Default' / 'Cookies').write_text('session=1')
+    driver = FakeChromiumDriver()
+    pool = DriverPool(lambda: PooledDriver(driver, str(profile_dir)), size=1)
+    pool.release(pool.acquire())
+    assert os.path.isdir(profile_dir)
+
+    pool.close()
+    assert driver.quit_called
+    assert not os.path.exists(profile_dir)
+
+
+def test_recycled_drivers_remove_their_profiles(tmp_path):
+    profile_dir = tmp_path / 'profile'
+    profile_dir.mkdir()
+    driver = FakeChromiumDriver()
+    pool = DriverPool(lambda: PooledDriver(driver, str(profile_dir)), size=1, max_pages_per_driver=1)
+    pool.release(pool.acquire())
+    assert driver.quit_called
+    assert not os.path.exists(profile_dir)
+
+
+def test_drivers_released_after_close_are_disposed(tmp_path):
+    profile_dir = tmp_path / 'profile'
+    profile_dir.mkdir()
+    driver = FakeChromiumDriver()
+    pool = DriverPool(lambda: PooledDriver(driver, str(profile_dir)), size=1)
+    pooled = pool.acquire()
+    pool.close()
+    assert not driver.quit_called
+    pool.release(pooled)
+    assert driver.quit_called
+    assert not os.path.exists(profile_dir)
@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import itertools
+import time
+
+import pytest
+
+pytest.importorskip('playwright')
+
+from DomBuilder import scrapeHTML
+from DomBuilder.scrapeHTML import fetch_many, fetch_many_async
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        self.url = None
+
+    async def goto(self, url, timeout=None):
+        await asyncio.sleep(0.001)
+        if 'broken' in url:
+            raise RuntimeError('net::ERR_NAME_NOT_RESOLVED')
+        self.url = url
+        self.browser.rendered.append(url)
+        return None
+
+    async def content(self):
+        return f'<html><body><p>{self.url}</p></body></html>'
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        return FakePage(self.browser)
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.rendered = []
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self):
+        return FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    """Stands in for async_playwright(): every launch() returns the same recording browser."""
+
+    def __init__(self):
+        self.browser = FakeBrowser()
+        self.chromium = self
+
+    def __call__(self):
+        return self
+
+    async def launch(self):
+        return self.browser
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    fake = FakePlaywright()
+    monkeypatch.setattr(scrapeHTML, 'async_playwright', fake)
+    return fake
+
+
+def counting_urls(taken):
+    for index in itertools.count():
+        taken.append(index)
+        yield f'https://example.com/{index}'
+
+
+def test_slow_consumer_holds_the_batch_back(playwright):
+    concurrency = 4
+    taken = []
+
+    async def consume():
+        received = []
+        async with contextlib.aclosing(fetch_many_async(counting_urls(taken), concurrency, raw=True)) as results:
+            async for result in results:
+                received.append(result)
+                await asyncio.sleep(0.01)
+                # The queue and the workers are full by now, yet no further URL was taken
+                assert len(taken) <= len(received) + 2 * concurrency + 1
+                if len(received) == 20:
+                    break
+        return received
+
+    received = asyncio.run(consume())
+    assert all(result.ok and result.html == f'<html><body><p>{result.url}</p></body></html>' for result in received)
+    assert len(taken) <= 20 + 2 * concurrency + 1
+    assert playwright.browser.closed
+
+
+def test_failures_are_reported_per_url(playwright):
+    urls = ['https://example.com/1', 'https://broken.example/2', 'https://example.com/3']
+    results = {result.url: result for result in fetch_many(urls, concurrency=2)}
+    assert set(results) == set(urls)
+    assert isinstance(results['https://broken.example/2'].error, RuntimeError)
+    assert results['https://example.com/3'].soup.p.get_text() == 'https://example.com/3'
+
+
+def test_sync_wrapper_stops_taking_urls_when_the_consumer_stops(playwright):
+    concurrency = 2
+    taken = []
+    for count, result in enumerate(fetch_many(counting_urls(taken), concurrency, raw=True), 1):
+        assert result.ok
+        time.sleep(0.01)
+        if count == 5:
+            break
+    # Ahead of the consumer: the thread's queue (2 * concurrency), the async queue (concurrency),
+    # one result per worker, and the few results being handed between them
+    assert len(taken) <= 5 + 2 * concurrency + concurrency + concurrency + 4
+    assert playwright.browser.closed
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from DomBuilder import parserBackend
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import PAGES_DIRECTORY, build_only, clean_html_multipass, load_pages
+from DomBuilder.parserBackend import parse_html
+
+PAGES = load_pages([PAGES_DIRECTORY])
+IDS = [os.path.basename(name) for name, _ in PAGES]
+
+
+def tree_output(html_tree):
+    return html_tree.get_string_tree(), html_tree.node_identifier.number_csspath_mapping
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=IDS)
+def test_from_html_matches_the_reparsing_pipeline(name, html):
+    # What building from a fetched soup used to do: parse, clean with reparsing passes, build
+    expected = build_only(HTMLTree, clean_html_multipass(parse_html(html)))
+    html_tree = HTMLTree.from_html(html)
+    assert tree_output(html_tree) == tree_output(expected)
+    assert str(html_tree.soup) == str(expected.soup)
+
+
+@pytest.mark.parametrize('name, html', PAGES[:3], ids=IDS[:3])
+def test_from_html_accepts_bytes_and_soups(name, html):
+    expected = tree_output(HTMLTree.from_html(html))
+    assert tree_output(HTMLTree.from_html(html.encode('utf-8'))) == expected
+    assert tree_output(HTMLTree(parse_html(html))) == expected
+
+
+def test_from_html_parses_the_page_once(monkeypatch):
+    name, html = PAGES[0]
+    parsed = []
+    beautiful_soup = parserBackend.BeautifulSoup
+
+    def counting_soup(markup, *args, **kwargs):
+        if markup:
+            parsed.append(len(markup))
+        return beautiful_soup(markup, *args, **kwargs)
+    monkeypatch.setattr(parserBackend, 'BeautifulSoup', counting_soup)
+
+    HTMLTree.from_html(html)
+    assert len(parsed) == 1
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import PAGES_DIRECTORY, benchmark_traversals, deep_page, load_pages
+
+PAGES = load_pages([PAGES_DIRECTORY]) + [('deep_page(60)', deep_page(60))]
+
+# Deeper than the default recursion limit, yet quick to clean (wrapping headers grows with depth squared)
+DEPTH = 1200
+
+
+def test_deep_page_is_built_and_rendered_under_the_default_recursion_limit(capsys):
+    assert sys.getrecursionlimit() < DEPTH
+    html_tree = HTMLTree.from_html(deep_page(DEPTH))
+    assert html_tree.tree.depth() == DEPTH + 1
+
+    lines = html_tree.get_string_tree().splitlines()
+    assert len(lines) == 2 * DEPTH + 1
+    assert lines[0].endswith(':Deep page')
+    assert lines[-1].endswith(f':Text of level {DEPTH - 1}')
+
+    html_tree.print_tree()
+    assert capsys.readouterr().out.splitlines() == lines
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_traversals_match_the_recursive_ones(name, html):
+    [row] = benchmark_traversals([(name, html)], repeat=1)
+    assert row['identical']
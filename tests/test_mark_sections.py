@@ -0,0 +1,56 @@
+import os
+import random
+
+import pytest
+
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import PAGES_DIRECTORY, MultiWalkHTMLTree, build_only, load_pages
+from DomBuilder.cleanHTML import clean_html
+from DomBuilder.parserBackend import parse_html
+
+PAGES = load_pages([PAGES_DIRECTORY])
+
+
+def both_ways(soup_factory):
+    html_tree = build_only(HTMLTree, soup_factory())
+    expected = build_only(MultiWalkHTMLTree, soup_factory())
+    return (str(html_tree.soup), html_tree.get_string_tree()), (str(expected.soup), expected.get_string_tree())
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_single_walk_matches_the_walk_per_kind_on_fixture_pages(name, html):
+    result, expected = both_ways(lambda: clean_html(html))
+    assert result == expected
+
+
+def random_markup(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        choice = rng.random()
+        if choice < 0.3 or depth > 3:
+            parts.append(rng.choice(['Some text', 'A longer sentence of text', 'x', '<img src="a.png">']))
+        elif choice < 0.45:
+            cells = ''.join(f'<td>{random_markup(rng, depth + 2)}</td>' for _ in range(rng.randint(1, 3)))
+            rows = ''.join(f'<tr>{cells}</tr>' for _ in range(rng.randint(0, 3)))
+            parts.append(f'<table>{rows}</table>')
+        elif choice < 0.6:
+            tag = rng.choice(['ul', 'ol'])
+            items = ''.join(f'<li>{random_markup(rng, depth + 2)}</li>' for _ in range(rng.randint(1, 3)))
+            parts.append(f'<{tag}>{items}</{tag}>')
+        else:
+            tag = rng.choice(['div', 'p', 'section', 'span', 'li', 'h2'])
+            parts.append(f'<{tag}>{random_markup(rng, depth + 1)}</{tag}>')
+    return ''.join(parts)
+
+
+def test_single_walk_matches_the_walk_per_kind_on_random_documents():
+    for seed in range(200):
+        html = (f'<html><head><title>Page {seed}</title></head>'
+                f'<body>{random_markup(random.Random(seed))}</body></html>')
+        result, expected = both_ways(lambda: parse_html(html))
+        assert result == expected, html
+
+
+def test_tables_without_rows_are_not_sections():
+    html_tree = build_only(HTMLTree, parse_html('<html><body><table><caption>Empty</caption></table></body></html>'))
+    assert 'type_of_section' not in html_tree.soup.table.attrs
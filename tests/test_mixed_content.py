@@ -0,0 +1,56 @@
+import copy
+import os
+import random
+
+import pytest
+
+from DomBuilder.benchmark import PAGES_DIRECTORY, load_pages, process_tags_with_mixed_content_multipass
+from DomBuilder.cleanHTML import process_tags_with_mixed_content
+from DomBuilder.parserBackend import parse_html
+
+PAGES = load_pages([PAGES_DIRECTORY])
+
+
+def both_ways(soup):
+    expected = copy.copy(soup)
+    process_tags_with_mixed_content_multipass(expected)
+    process_tags_with_mixed_content(soup)
+    return str(soup), str(expected)
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_single_pass_matches_the_multipass_reference_on_fixture_pages(name, html):
+    result, expected = both_ways(parse_html(html))
+    assert result == expected
+
+
+@pytest.mark.parametrize('html', [
+    '<div>Intro <b>bold</b> and <i>italic <u>underlined</u></i> text</div>',
+    '<div>Outer <p>Inner <span>deepest</span> inner</p> outer</div><p>Plain <a href="/">link</a></p>',
+    '<div>Only text <img src="a.png"> and empty <span> </span> elements</div>',
+    '<ul>' + ''.join(f'<li>Item {i} <b>bold</b></li>' for i in range(60)) + '</ul>',
+    '<div>' + ' '.join(f'word {i} <b>bold {i}</b>' for i in range(60)) + '</div>',
+    '<div>\n  <p>No direct text</p>\n  <p>here</p>\n</div>',
+])
+def test_single_pass_matches_the_multipass_reference(html):
+    result, expected = both_ways(parse_html(html))
+    assert result == expected
+
+
+def random_markup(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        choice = rng.random()
+        if choice < 0.4 or depth > 4:
+            parts.append(rng.choice(['text', 'more words', ' ', '\n', 'x']))
+        else:
+            tag = rng.choice(['div', 'p', 'span', 'b', 'li', 'section'])
+            parts.append(f'<{tag}>{random_markup(rng, depth + 1)}</{tag}>')
+    return ''.join(parts)
+
+
+def test_single_pass_matches_the_multipass_reference_on_random_nesting():
+    for seed in range(200):
+        html = f'<html><body>{random_markup(random.Random(seed))}</body></html>'
+        result, expected = both_ways(parse_html(html))
+        assert result == expected, html
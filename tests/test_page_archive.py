@@ -0,0 +1,82 @@
+import gzip
+import os
+
+from webScraper.page_archive import INDEX_NAME, ArchiveReader, ArchiveRecord, ArchiveWriter
+
+PAGE = ('<html><head><title>Archived page</title></head><body><h1>Heading of the page</h1>'
+        '<p>A paragraph with enough words to be kept in the tree.</p></body></html>')
+
+
+def archive_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.warc.gz'))
+
+
+def test_record_round_trips_through_bytes():
+    record = ArchiveRecord('https://example.com/a', 'Ünïcode\r\n\r\n<p>body</p>\r\n',
+                           final_url='https://example.com/b', headers={'ETag': '"v1"'},
+                           timing={'ttfb_ms': 12.5}, fetched_at=1760000000.123456)
+    copy = ArchiveRecord.from_bytes(record.to_bytes())
+    assert copy.__dict__ == record.__dict__
+
+
+def test_writer_rolls_over_to_a_new_file(tmp_path):
+    with ArchiveWriter(str(tmp_path), max_file_bytes=1) as writer:
+        entries = [writer.write(f'https://example.com/{index}', PAGE) for index in range(3)]
+    assert archive_files(tmp_path) == ['pages-00000.warc.gz', 'pages-00001.warc.gz', 'pages-00002.warc.gz']
+    assert [entry['file'] for entry in entries] == archive_files(tmp_path)
+
+    # A reopened archive continues after the existing files instead of appending to them
+    with ArchiveWriter(str(tmp_path), max_file_bytes=1) as writer:
+        assert writer.write('https://example.com/3', PAGE)['file'] == 'pages-00003.warc.gz'
+    assert len(ArchiveReader(str(tmp_path))) == 4
+
+
+def test_records_share_a_file_below_the_size_limit(tmp_path):
+    with ArchiveWriter(str(tmp_path)) as writer:
+        first = writer.write('https://example.com/1', PAGE)
+        second = writer.write('https://example.com/2', PAGE)
+    assert archive_files(tmp_path) == ['pages-00000.warc.gz']
+    assert second['offset'] == first['offset'] + first['length']
+    with open(tmp_path / 'pages-00000.warc.gz', 'rb') as handle:
+        handle.seek(second['offset'])
+        assert b'https://example.com/2' in gzip.decompress(handle.read(second['length']))
+
+
+def test_get_reads_the_latest_record_through_the_index(tmp_path):
+    with ArchiveWriter(str(tmp_path), max_file_bytes=1) as writer:
+        writer.write('https://example.com/1', '<p>old</p>', final_url='https://example.com/old',
+                     headers={'Server': 'test'}, timing={'total_ms': 3})
+        writer.write('https://example.com/2', '<p>other</p>')
+        writer.write('https://example.com/1', '<p>new</p>')
+    assert (tmp_path / INDEX_NAME).read_text().count('\n') == 3
+
+    reader = ArchiveReader(str(tmp_path))
+    record = reader.get('https://example.com/1')
+    assert (record.html, record.final_url) == ('<p>new</p>', 'https://example.com/1')
+    old = reader.read(reader.entries[0])
+    assert (old.html, old.final_url, old.headers, old.timing) == (
+        '<p>old</p>', 'https://example.com/old', {'Server': 'test'}, {'total_ms': 3})
+    assert reader.get('https://example.com/missing') is None
+
+
+def test_iteration_streams_every_record_in_order(tmp_path):
+    urls = [f'https://example.com/{index}' for index in range(5)]
+    with ArchiveWriter(str(tmp_path), max_file_bytes=600) as writer:
+        for url in urls:
+            writer.write(url, PAGE + f'<!-- {url} -->')
+    assert len(archive_files(tmp_path)) > 1
+
+    reader = ArchiveReader(str(tmp_path))
+    assert [record.url for record in reader] == urls
+    assert all(record.html.endswith(f'<!-- {record.url} -->') for record in reader)
+
+
+def test_iter_trees_builds_a_tree_per_record(tmp_path):
+    with ArchiveWriter(str(tmp_path)) as writer:
+        writer.write('https://example.com/1', PAGE)
+        writer.write('https://example.com/2', PAGE.replace('Heading of the page', 'Second heading'))
+
+    pairs = list(ArchiveReader(str(tmp_path)).iter_trees())
+    assert [record.url for record, _ in pairs] == ['https://example.com/1', 'https://example.com/2']
+    assert 'Heading of the page' in pairs[0][1].get_string_tree()
+    assert 'Second heading' in pairs[1][1].get_string_tree()
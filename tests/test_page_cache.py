@@ -0,0 +1,154 @@
+import os
+import time
+
+import pytest
+
+from webScraper.page_cache import PageCache
+
+URL = 'https://example.com/article'
+HTML = '<html><body><h1>Article</h1><p>Body text</p></body></html>'
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Session:
+    """Fake requests.Session answering every request with one status; records the request headers."""
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(('GET', url, headers or {}))
+        return Response(self.status_code, self.headers)
+
+    def head(self, url, **kwargs):
+        self.requests.append(('HEAD', url, {}))
+        return Response(200, self.headers)
+
+
+def object_files(cache):
+    return [name for _, _, names in os.walk(os.path.join(cache.root, 'objects')) for name in names]
+
+
+def render(html):
+    calls = []
+
+    def render_page(url):
+        calls.append(url)
+        return html
+    return render_page, calls
+
+
+def test_stored_pages_are_read_back(tmp_path):
+    cache = PageCache(str(tmp_path))
+    entry = cache.put(URL, HTML, etag='"v1"')
+    assert cache.get(URL) == HTML
+    assert cache.lookup(URL).to_dict() == entry.to_dict()
+    assert PageCache(str(tmp_path)).get(URL) == HTML
+    assert cache.get('https://example.com/other') is None
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = PageCache(str(tmp_path))
+    first = cache.put(URL, HTML)
+    second = cache.put('https://example.com/article?utm_source=feed', HTML)
+    assert first.content_hash == second.content_hash
+    assert len(object_files(cache)) == 1
+
+    cache.put('https://example.com/other', HTML + '<p>More</p>')
+    assert len(object_files(cache)) == 2
+
+
+def test_entries_expire_after_their_ttl(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=60)
+    entry = cache.put(URL, HTML)
+    assert entry.is_fresh(now=entry.fetched_at + 59)
+    assert not entry.is_fresh(now=entry.fetched_at + 61)
+
+    entry.fetched_at = time.time() - 61
+    cache._write_entry(entry)
+    assert cache.get(URL) is None
+    assert cache.lookup(URL) is not None
+
+
+def test_ttl_of_none_keeps_entries_fresh(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=None)
+    entry = cache.put(URL, HTML)
+    assert entry.is_fresh(now=entry.fetched_at + 10 ** 9)
+
+
+def stale_cache(tmp_path, session):
+    cache = PageCache(str(tmp_path), ttl=60, session=session)
+    entry = cache.put(URL, HTML, etag='"v1"', last_modified='Mon, 05 Oct 2026 10:00:00 GMT')
+    entry.fetched_at = time.time() - 120
+    cache._write_entry(entry)
+    return cache
+
+
+def test_not_modified_answer_refreshes_a_stale_entry(tmp_path):
+    session = Session(304, {'ETag': '"v2"'})
+    cache = stale_cache(tmp_path, session)
+    render_page, calls = render('<html><body>New</body></html>')
+
+    assert cache.fetch(URL, render_page) == HTML
+    assert calls == []
+    assert session.requests == [('GET', URL, {'If-None-Match': '"v1"',
+                                              'If-Modified-Since': 'Mon, 05 Oct 2026 10:00:00 GMT'})]
+    entry = cache.lookup(URL)
+    assert entry.is_fresh()
+    assert entry.etag == '"v2"'
+
+
+def test_changed_page_is_rendered_again(tmp_path):
+    session = Session(200, {'ETag': '"v2"'})
+    cache = stale_cache(tmp_path, session)
+    new_html = '<html><body>New</body></html>'
+    render_page, calls = render(new_html)
+
+    assert cache.fetch(URL, render_page) == new_html
+    assert calls == [URL]
+    assert [method for method, _, _ in session.requests] == ['GET', 'HEAD']
+    entry = cache.lookup(URL)
+    assert entry.etag == '"v2"' and entry.rendered
+    assert cache.get(URL) == new_html
+
+
+def test_fresh_entries_are_served_without_a_request(tmp_path):
+    session = Session(200)
+    cache = PageCache(str(tmp_path), session=session)
+    cache.put(URL, HTML, etag='"v1"')
+    render_page, calls = render('<html><body>New</body></html>')
+    assert cache.fetch(URL, render_page) == HTML
+    assert calls == [] and session.requests == []
+
+
+def test_failed_index_write_keeps_the_previous_entry(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path))
+    cache.put(URL, HTML)
+    index_directory = os.path.join(cache.root, 'index')
+    replace = os.replace
+
+    def fail_in_index(src, dst):
+        if os.path.dirname(dst) == index_directory:
+            raise OSError('disk full')
+        replace(src, dst)
+    monkeypatch.setattr(os, 'replace', fail_in_index)
+    with pytest.raises(OSError):
+        cache.put(URL, '<html><body>Replacement</body></html>')
+    monkeypatch.undo()
+
+    assert cache.get(URL) == HTML
+    assert len(object_files(cache)) == 2
+    for directory in ('index', 'objects'):
+        for _, _, names in os.walk(os.path.join(cache.root, directory)):
+            assert all(name.endswith(('.json', '.html.gz')) for name in names)
@@ -0,0 +1,12 @@
+import pytest
+
+from DomBuilder.benchmark import PAGES_DIRECTORY, check_parser_conformance, load_pages
+from DomBuilder.parserBackend import available_parsers
+
+
+@pytest.mark.parametrize('parser', [parser for parser in available_parsers() if parser != 'html.parser'])
+def test_backends_match_html_parser_on_fixture_pages(parser):
+    pages = load_pages([PAGES_DIRECTORY])
+    assert len(pages) == 14
+    rows = check_parser_conformance(pages, parsers=[parser])
+    assert [row['page'] for row in rows if not row[parser + '_matches']] == []
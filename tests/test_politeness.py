@@ -0,0 +1,78 @@
+import threading
+
+from webScraper.politeness import PolitenessScheduler
+
+
+class Response:
+    def __init__(self, status):
+        self.status = status
+
+
+class ThrottledFetcher:
+    """Fake fetch callable: answers 429 for the first `throttled` calls per URL (of `host` only, if
+    given), then 200."""
+
+    def __init__(self, throttled, host=None):
+        self.throttled = throttled
+        self.host = host
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        with self._lock:
+            self.calls[url] = self.calls.get(url, 0) + 1
+            calls = self.calls[url]
+        throttled = calls <= self.throttled and (self.host is None or self.host in url)
+        return Response(429 if throttled else 200)
+
+
+def scheduler(fetch, max_retries=3):
+    return PolitenessScheduler(fetch, per_host_rate=1000, per_host_burst=10, max_retries=max_retries,
+                               backoff_base=0.01, max_backoff=0.05)
+
+
+def test_throttled_url_is_retried_after_backoff():
+    fetch = ThrottledFetcher(throttled=2)
+    results = list(scheduler(fetch).run(['https://example.com/a']))
+
+    assert fetch.calls == {'https://example.com/a': 3}
+    assert [(result.status, result.attempts, result.ok) for result in results] == [(200, 3, True)]
+
+
+def test_retries_stop_at_max_retries():
+    fetch = ThrottledFetcher(throttled=10)
+    results = list(scheduler(fetch, max_retries=3).run(['https://example.com/a']))
+
+    # One fetch per attempt, nothing more
+    assert fetch.calls == {'https://example.com/a': 3}
+    assert [(result.status, result.attempts, result.ok) for result in results] == [(429, 3, False)]
+
+
+def test_throttled_host_does_not_hold_up_others():
+    fetch = ThrottledFetcher(throttled=1, host='slow.example')
+    urls = ['https://slow.example/a', 'https://fast.example/b']
+    results = {result.url: result for result in scheduler(fetch).run(urls)}
+
+    assert results['https://fast.example/b'].attempts == 1
+    assert results['https://slow.example/a'].attempts == 2
+
+
+def test_tiered_fetcher_does_not_render_throttled_pages():
+    from webScraper.tiered_fetcher import STATIC, TieredFetcher
+
+    class Session:
+        def __init__(self):
+            self.calls = 0
+
+        def get(self, url, headers=None, timeout=None):
+            self.calls += 1
+            return type('Response', (), {'status_code': 429, 'headers': {}})()
+
+    rendered = []
+    fetcher = TieredFetcher(browser_fetch=rendered.append, session=Session())
+    results = list(scheduler(fetcher.fetch_with_info, max_retries=3).run(['https://example.com/a']))
+
+    # Each retry is one static request; the throttled host never gets a browser render
+    assert fetcher.session.calls == 3
+    assert rendered == []
+    assert [(result.status, result.result.tier) for result in results] == [(429, STATIC)]
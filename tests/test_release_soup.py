@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from bs4.element import PageElement
+
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import PAGES_DIRECTORY, load_pages, retained_memory
+
+PAGES = load_pages([PAGES_DIRECTORY])
+
+PRODUCT_PAGE = '''<html><head><title>Widget</title>
+<script type="application/ld+json">{"@type": "Product", "name": "Widget",
+  "offers": {"@type": "Offer", "price": "9.99", "priceCurrency": "USD"}}</script>
+</head><body><h1>Widget</h1><p>A widget for every <a href="/uses">use</a>.</p></body></html>'''
+
+
+def tree_output(html_tree):
+    nodes = [(node.identifier, node.number, node.text, list(node.hrefs)) for node in html_tree.tree.all_nodes()]
+    mapping = {number: html_tree.node_identifier.get_csspath(number)
+               for number in html_tree.node_identifier.number_csspath_mapping}
+    return html_tree.get_string_tree(), nodes, mapping
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_tree_is_unchanged_without_its_soup(name, html):
+    html_tree = HTMLTree.from_html(html)
+    expected = tree_output(html_tree)
+
+    assert html_tree.release_soup() is html_tree
+    assert html_tree.soup is None
+    assert (html_tree.css_paths, html_tree.text_index, html_tree.href_index) == (None, None, None)
+    assert tree_output(html_tree) == expected
+    assert tree_output(HTMLTree.from_html(html, keep_soup=False)) == expected
+
+
+def test_nodes_keep_no_reference_to_the_soup():
+    html_tree = HTMLTree.from_html(PRODUCT_PAGE, keep_soup=False)
+    for node in html_tree.tree.all_nodes():
+        assert not any(isinstance(value, PageElement) for value in vars(node).values())
+    assert html_tree.tree.get_node(html_tree.tree.root).text == 'Widget'
+
+
+def test_structured_data_is_kept():
+    html_tree = HTMLTree.from_html(PRODUCT_PAGE, structured_data=True)
+    html_tree.release_soup()
+    html_tree.release_soup()
+    assert html_tree.extract_structured(['Price'])['Price']['info'] == '9.99'
+
+
+def test_released_soup_frees_its_memory():
+    name, html = max(PAGES, key=lambda page: len(page[1]))
+    kept, _ = retained_memory(HTMLTree.from_html, html)
+    released, _ = retained_memory(lambda: HTMLTree.from_html(html, keep_soup=False))
+    assert released < kept / 2
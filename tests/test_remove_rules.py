@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from DomBuilder.cleanHTML import clean_html, tags_to_remove
+from DomBuilder.removeRules import RuleSet
+
+PAGE = ('<html><body><nav><a href="/">Home</a></nav><div class="nav">Menu</div>'
+        '<p>Article text that stays</p></body></html>')
+
+
+def test_default_rules_remove_nav_by_name_and_class():
+    text = clean_html(PAGE).get_text()
+    assert 'Home' not in text
+    assert 'Menu' not in text
+    assert 'Article text that stays' in text
+
+
+def test_hits_are_counted_across_threads():
+    rule_set = RuleSet(tags_to_remove)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: clean_html(PAGE, rule_set), range(200)))
+    hits = {row['rule']: row['hits'] for row in rule_set.stats()}
+    assert hits['name:nav'] == 200
+    assert hits['class:nav'] == 200
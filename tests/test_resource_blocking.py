@@ -0,0 +1,28 @@
+from webScraper.resource_blocking import BlockingProfile
+
+
+class FakeDriver:
+    """Answers the resource collection script with fixed lists."""
+
+    def __init__(self, loaded, referenced):
+        self.resources = {'loaded': loaded, 'referenced': referenced}
+
+    def execute_script(self, script):
+        return self.resources
+
+
+def test_selenium_stats_are_marked_as_estimates():
+    driver = FakeDriver(loaded=['https://example.com/app.js'],
+                        referenced=['https://example.com/app.js', 'https://example.com/logo.png',
+                                    'https://doubleclick.net/ad.js'])
+    stats = BlockingProfile().estimate_selenium_stats(driver)
+    assert stats.estimated
+    assert stats.requests_allowed == 1
+    assert stats.requests_blocked == 2
+    assert stats.by_type['image'] == 1
+
+
+def test_new_stats_are_observed_counts():
+    stats = BlockingProfile().new_stats()
+    assert not stats.estimated
+    assert stats.requests_blocked == 0
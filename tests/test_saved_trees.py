@@ -0,0 +1,81 @@
+import copy
+import os
+import struct
+import sys
+import types
+from array import array
+
+import pytest
+
+from DomBuilder import compactTree
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import PAGES_DIRECTORY, load_pages
+from DomBuilder.compactTree import FORMAT_VERSION, MAGIC, SECTIONS, CompactTree
+
+PAGES = load_pages([PAGES_DIRECTORY])
+
+PRODUCT_PAGE = '''<html><head><title>Widget</title>
+<script type="application/ld+json">{"@type": "Product", "name": "Widget",
+  "offers": {"@type": "Offer", "price": "9.99", "priceCurrency": "USD"}}</script>
+</head><body><h1>Widget</h1><p>A widget for every <a href="/uses">use</a>.</p></body></html>'''
+
+
+def tree_output(html_tree):
+    mapping = {node.number: html_tree.node_identifier.get_csspath(node.number)
+               for node in html_tree.tree.all_nodes()}
+    return html_tree.get_string_tree(), mapping
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_saved_trees_load_unchanged(name, html, tmp_path):
+    html_tree = HTMLTree.from_html(html)
+    expected = tree_output(html_tree)
+    path = str(tmp_path / 'page.tree')
+    html_tree.save(path)
+
+    assert tree_output(HTMLTree.from_bytes(html_tree.to_bytes())) == expected
+    assert tree_output(HTMLTree.load(path)) == expected
+    mapped = HTMLTree.load(path, mmap=True)
+    assert tree_output(mapped) == expected
+    assert mapped.soup is None
+    del mapped
+
+
+def test_structured_data_is_saved_with_the_tree():
+    html_tree = HTMLTree.from_html(PRODUCT_PAGE, structured_data=True)
+    loaded = HTMLTree.from_bytes(html_tree.to_bytes())
+    assert [(payload.kind, payload.name, payload.data) for payload in loaded.structured_data] \
+        == [(payload.kind, payload.name, payload.data) for payload in html_tree.structured_data]
+    assert loaded.extract_structured(['Price'])['Price']['info'] == '9.99'
+
+
+def test_other_versions_and_files_are_refused():
+    data = bytearray(HTMLTree.from_html(PRODUCT_PAGE).to_bytes())
+    struct.pack_into('<I', data, len(MAGIC), FORMAT_VERSION + 1)
+    with pytest.raises(ValueError, match='version'):
+        HTMLTree.from_bytes(bytes(data))
+    with pytest.raises(ValueError, match='Not a saved'):
+        HTMLTree.from_bytes(b'<html></html>')
+
+    # Saved on a platform whose C ints are 8 bytes
+    data = HTMLTree.from_html(PRODUCT_PAGE).to_bytes().replace(b'["i", 4,', b'["i", 8,', 1)
+    with pytest.raises(ValueError, match='8 byte items'):
+        HTMLTree.from_bytes(data)
+
+
+def test_trees_saved_with_the_other_byte_order_are_converted(monkeypatch):
+    html_tree = HTMLTree.from_html(PRODUCT_PAGE)
+    compact = CompactTree.from_tree(html_tree.tree, html_tree.node_identifier.number_csspath_mapping)
+    swapped = copy.copy(compact)
+    for name, typecode in SECTIONS.items():
+        if typecode != 'B':
+            values = array(typecode, getattr(compact, name))
+            values.byteswap()
+            setattr(swapped, name, values)
+    other = 'big' if sys.byteorder == 'little' else 'little'
+    monkeypatch.setattr(compactTree, 'sys', types.SimpleNamespace(byteorder=other))
+    data = swapped.to_bytes()
+    monkeypatch.undo()
+
+    loaded = CompactTree.from_bytes(data)
+    assert loaded.to_bytes() == compact.to_bytes()
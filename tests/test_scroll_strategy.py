@@ -0,0 +1,92 @@
+from webScraper import scroll_strategy
+from webScraper.scroll_strategy import FixedDelayScroll, NoScroll, QuietWindowScroll
+
+
+class Clock:
+    """Stands in for time.monotonic and time.sleep; every scroll round advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeDriver:
+    """A page whose height grows by 1000 px on each of the first `growing_rounds` scrolls."""
+
+    def __init__(self, clock, growing_rounds, round_seconds=0.5):
+        self.clock = clock
+        self.growing_rounds = growing_rounds
+        self.round_seconds = round_seconds
+        self.height = 1000
+        self.waits = []
+        self.script_timeout = None
+
+    def set_script_timeout(self, seconds):
+        self.script_timeout = seconds
+
+    def _scroll(self):
+        if self.growing_rounds:
+            self.growing_rounds -= 1
+            self.height += 1000
+
+    def execute_script(self, script):
+        if script.startswith('window.scrollTo'):
+            self._scroll()
+        return self.height
+
+    def execute_async_script(self, script, quiet_ms, max_wait_ms):
+        self.waits.append((quiet_ms, max_wait_ms))
+        self.clock.now += self.round_seconds
+        self._scroll()
+        return {'height': self.height, 'events': 1}
+
+
+def install(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scroll_strategy.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(scroll_strategy.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_quiet_window_stops_at_the_end_of_the_page(monkeypatch):
+    driver = FakeDriver(install(monkeypatch), growing_rounds=3)
+    stats = QuietWindowScroll(quiet_ms=200, max_wait_ms=2000).scroll(driver)
+    assert (stats.rounds, stats.reason) == (4, 'end_of_page')
+    assert stats.elapsed_ms == 2000
+    assert driver.waits == [(200, 2000)] * 4
+    assert driver.script_timeout == 7
+
+
+def test_quiet_window_stops_after_max_scrolls(monkeypatch):
+    driver = FakeDriver(install(monkeypatch), growing_rounds=100)
+    stats = QuietWindowScroll(max_scrolls=5).scroll(driver)
+    assert (stats.rounds, stats.reason) == (5, 'max_scrolls')
+
+
+def test_quiet_window_stops_at_the_time_budget(monkeypatch):
+    driver = FakeDriver(install(monkeypatch), growing_rounds=100, round_seconds=1.5)
+    stats = QuietWindowScroll(max_wait_ms=3000, max_time=4).scroll(driver)
+    assert (stats.rounds, stats.reason) == (3, 'time_budget')
+    # The last round may only wait for what is left of the budget
+    assert [max_wait_ms for _, max_wait_ms in driver.waits] == [3000, 2500, 1000]
+
+
+def test_fixed_delay_sleeps_after_every_scroll(monkeypatch):
+    clock = install(monkeypatch)
+    driver = FakeDriver(clock, growing_rounds=2)
+    stats = FixedDelayScroll(delay=2).scroll(driver)
+    assert (stats.rounds, stats.reason) == (3, 'end_of_page')
+    assert clock.now == 6
+
+    stats = FixedDelayScroll(delay=2, max_time=5).scroll(FakeDriver(clock, growing_rounds=100))
+    assert (stats.rounds, stats.reason) == (3, 'time_budget')
+
+
+def test_no_scroll_does_not_touch_the_page():
+    stats = NoScroll().scroll(None)
+    assert (stats.rounds, stats.reason) == (0, 'disabled')
@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('selenium')
+pytest.importorskip('googlesearch')
+
+from webScraper.scroll_strategy import ScrollStats
+from webScraper.search_pipeline import SearchScraper
+from webScraper.web_scraper_module import ScrapeResult
+
+
+class FakeScraper:
+    """Renders every URL after a short delay, with scroll stats naming the URL."""
+
+    parser = None
+
+    def __init__(self, urls):
+        self.urls = urls
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def perform_google_search(self, query, num_results=10):
+        return self.urls
+
+    def scrape_with_info(self, url):
+        time.sleep(0.01)
+        return ScrapeResult(url, f'<html><body><p>{url}</p></body></html>', scroll_stats=ScrollStats(reason=url))
+
+    def close(self):
+        pass
+
+
+def test_each_page_keeps_its_own_stats():
+    urls = [f'https://example.com/{index}' for index in range(20)]
+    with SearchScraper(FakeScraper(urls), workers=8) as scraper:
+        pages = list(scraper.search_and_scrape('query'))
+    assert len(pages) == 20
+    assert all(page.scroll_stats.reason == page.url for page in pages)
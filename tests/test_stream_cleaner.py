@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+
+import pytest
+
+from DomBuilder.streamCleaner import preclean_html, preclean_stream
+
+
+def test_dropped_paragraph_ends_at_an_implied_end_tag():
+    html = '<body><p class="nav">Menu<div>Real content</div><p>More content</p></body>'
+    assert preclean_html(html) == '<body><div>Real content</div><p>More content</p></body>'
+
+
+def test_unclosed_dropped_list_item_ends_at_the_next_item():
+    html = '<ul><li class="nav">Menu<li>First item<li>Second item</ul><p>After the list</p>'
+    assert preclean_html(html) == '<ul><li>First item<li>Second item</ul><p>After the list</p>'
+
+
+def test_dropped_cell_ends_at_the_next_cell_or_row():
+    html = '<table><tr><td class="nav">Menu<td>Cell</tr><tr><td>Next row</table>'
+    assert preclean_html(html) == '<table><tr><td>Cell</tr><tr><td>Next row</table>'
+
+
+def test_implied_end_tags_inside_a_dropped_element_keep_it_dropped():
+    html = '<div class="nav"><p>Menu<div>Inner</div><ul><li>One<li>Two</ul></div><p>Kept</p>'
+    assert preclean_html(html) == '<p>Kept</p>'
+
+
+def bulky_chunks(megabytes, tag):
+    body = ('a{b:c} x<y; ' if tag == 'style' else 'var x = a<b; ') * ((megabytes << 20) // 12)
+    html = f'<html><body><p>Kept text</p><{tag}>{body}</{tag}><p>After</p></body></html>'.encode()
+    return [html[start:start + 65536] for start in range(0, len(html), 65536)]
+
+
+def preclean_seconds(chunks):
+    start = time.perf_counter()
+    html = preclean_stream(chunks)
+    elapsed = time.perf_counter() - start
+    assert html == '<html><body><p>Kept text</p><p>After</p></body></html>'
+    return elapsed
+
+
+@pytest.mark.parametrize('tag', ['style', 'script'])
+def test_time_is_linear_in_the_size_of_a_dropped_body(tag):
+    small, large = bulky_chunks(2, tag), bulky_chunks(8, tag)
+    small_seconds = min(preclean_seconds(small) for _ in range(3))
+    large_seconds = min(preclean_seconds(large) for _ in range(3))
+    # Four times the text; rescanning the body on every chunk made this sixteen times slower
+    assert large_seconds < 8 * small_seconds + 0.05
+
+
+@pytest.mark.parametrize('tag', ['style', 'script'])
+def test_peak_memory_does_not_grow_with_a_dropped_body(tag):
+    chunks = bulky_chunks(8, tag)
+    tracemalloc.start()
+    try:
+        preclean_stream(chunks)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < 1 << 20
+
+
+def test_script_with_html_or_payload_is_kept_across_chunks():
+    html = ('<script>' + 'var x = a<b; ' * 1000 + 'window.__STATE__ = {"name": "Widget"}; '
+            'var tpl = "<div><h2>Card</h2></div>";</script><p>After</p>')
+    for size in (1, 7, 4096):
+        payloads = []
+        cleaned = preclean_stream([html[start:start + size] for start in range(0, len(html), size)],
+                                  payloads=payloads)
+        assert '"<div><h2>Card</h2></div>"' in cleaned and cleaned.endswith('</script><p>After</p>')
+        assert [(payload.name, payload.data) for payload in payloads] == [('__STATE__', {'name': 'Widget'})]
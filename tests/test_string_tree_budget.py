@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from DomBuilder import helper
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.benchmark import list_page
+
+
+@pytest.fixture(scope='module')
+def html_tree():
+    return HTMLTree.from_html(list_page(200))
+
+
+def test_max_chars_keeps_whole_lines_within_the_budget(html_tree):
+    full = html_tree.get_string_tree()
+    lines = full.splitlines(keepends=True)
+    for max_chars in (0, 1, len(lines[0]) - 1, len(lines[0]), 500, 4321, len(full) - 1, len(full), len(full) + 100):
+        budgeted = html_tree.get_string_tree(max_chars=max_chars)
+        kept = budgeted.count('\n')
+        assert full.startswith(budgeted)
+        assert len(budgeted) <= max_chars
+        # The first line left out would not have fit
+        assert kept == len(lines) or len(budgeted) + len(lines[kept]) > max_chars
+
+
+def test_max_tokens_keeps_whole_lines_within_the_budget(html_tree):
+    full = html_tree.get_string_tree()
+    lines = full.splitlines(keepends=True)
+    for max_tokens in (0, 10, 1000, sum(map(helper.estimate_tokens, lines))):
+        budgeted = html_tree.get_string_tree(max_tokens=max_tokens)
+        kept = budgeted.count('\n')
+        used = sum(helper.estimate_tokens(line) for line in lines[:kept])
+        assert full.startswith(budgeted)
+        assert used <= max_tokens
+        assert kept == len(lines) or used + helper.estimate_tokens(lines[kept]) > max_tokens
+
+
+def test_the_tighter_budget_wins(html_tree):
+    by_chars = html_tree.get_string_tree(max_chars=2000)
+    by_tokens = html_tree.get_string_tree(max_tokens=100)
+    both = html_tree.get_string_tree(max_chars=2000, max_tokens=100)
+    assert both == min(by_chars, by_tokens, key=len)
+
+
+def test_custom_token_counter_is_used(html_tree):
+    counted = []
+
+    def one_token_per_line(line):
+        counted.append(line)
+        return 1
+    budgeted = html_tree.get_string_tree(max_tokens=7, count_tokens=one_token_per_line)
+    assert budgeted.count('\n') == 7
+    assert len(counted) == 8
+
+
+def test_writers_and_printers_share_the_budget(html_tree, capsys):
+    expected = html_tree.get_string_tree(max_chars=3000)
+    sink = io.StringIO()
+    assert html_tree.write_string_tree(sink, max_chars=3000) == len(expected)
+    assert sink.getvalue() == expected
+
+    html_tree.print_tree(max_chars=3000)
+    assert capsys.readouterr().out == expected
+    assert html_tree.get_string_tree(result='Page:\n', max_chars=3000) == 'Page:\n' + expected
@@ -0,0 +1,30 @@
+from DomBuilder.HTMLTree import HTMLTree
+from DomBuilder.structuredData import extract_info, find_payloads
+
+ORGANIZATION_FIRST = '''<html><head>
+<script type="application/ld+json">{"@type": "Organization", "name": "Acme Corp"}</script>
+<script type="application/ld+json">{"@type": "Product", "name": "Widget",
+  "offers": {"@type": "Offer", "price": "9.99", "priceCurrency": "USD"}}</script>
+</head><body><p>Widget</p></body></html>'''
+
+
+def test_ambiguous_keys_are_left_to_the_llm():
+    found = extract_info(find_payloads(ORGANIZATION_FIRST), ['Name', 'Title', 'Product name', 'Price'])
+    assert found['Name'] is None
+    assert found['Title'] is None
+    assert found['Product name']['info'] == 'Widget'
+    assert found['Price']['info'] == '9.99'
+
+
+def test_unambiguous_aliases_still_answer():
+    html = ('<script type="application/ld+json">{"@type": "Article", "headline": "Hello",'
+            ' "author": {"@type": "Person", "name": "Ann"}}</script>')
+    found = extract_info(find_payloads(html), ['Title', 'Author'])
+    assert found['Title']['info'] == 'Hello'
+    assert found['Author']['info'] == 'Ann'
+
+
+def test_trees_read_structured_data_only_when_asked():
+    assert HTMLTree.from_html(ORGANIZATION_FIRST).structured_data == []
+    assert len(HTMLTree.from_html(ORGANIZATION_FIRST, structured_data=True).structured_data) == 2
+    assert len(HTMLTree.from_stream([ORGANIZATION_FIRST], structured_data=True).structured_data) == 2
@@ -0,0 +1,56 @@
+import functools
+import os
+import warnings
+
+import pytest
+
+from DomBuilder import helper
+from DomBuilder.benchmark import PAGES_DIRECTORY, deep_page, list_page, load_pages
+from DomBuilder.cleanHTML import clean_html
+
+PAGES = load_pages([PAGES_DIRECTORY]) + [('list_page(100)', list_page(100)), ('deep_page(60)', deep_page(60))]
+# The helpers without an index take minutes on the 150-level fixture; deep_page(60) covers depth for them
+HELPER_PAGES = [(name, html) for name, html in PAGES if os.path.basename(name) != 'deep.html']
+HEADERS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+
+@functools.lru_cache(maxsize=None)
+def indexed(html):
+    soup = clean_html(html)
+    return soup, helper.TextIndex(soup)
+
+
+@pytest.mark.parametrize('name, html', PAGES, ids=[os.path.basename(name) for name, _ in PAGES])
+def test_statistics_match_the_tags(name, html):
+    soup, index = indexed(html)
+    for tag in [soup] + soup.find_all(True):
+        strings = list(tag.stripped_strings)
+        assert index.string_stats(tag) == (len(strings), sum(len(string) for string in strings))
+        assert index.header_count(tag) == len(tag.find_all(HEADERS))
+        assert index.first_header(tag) is tag.find(HEADERS)
+        assert index.text(tag) == tag.get_text(strip=True)
+
+
+@pytest.mark.parametrize('name, html', HELPER_PAGES, ids=[os.path.basename(name) for name, _ in HELPER_PAGES])
+def test_helpers_answer_the_same_with_the_index(name, html):
+    soup, index = indexed(html)
+    with warnings.catch_warnings():
+        # find_smallest_parent_with_extra_text uses find(text=True)
+        warnings.simplefilter('ignore', DeprecationWarning)
+        for tag in soup.find_all(True):
+            assert helper.isSingleTextNode(tag, index) == helper.isSingleTextNode(tag)
+            assert helper.isHeaderText(tag, index) == helper.isHeaderText(tag)
+            assert helper.getHeaderNode(tag, index) is helper.getHeaderNode(tag)
+            assert (helper.find_smallest_parent_with_extra_text(tag, index)
+                    is helper.find_smallest_parent_with_extra_text(tag))
+
+
+def test_tags_inserted_after_indexing_are_indexed_on_first_use():
+    soup = clean_html('<html><body><div><p>First paragraph</p></div></body></html>')
+    index = helper.TextIndex(soup)
+    section = soup.new_tag('section')
+    section.append(soup.new_tag('h2'))
+    section.h2.string = 'New header'
+    soup.body.append(section)
+    assert index.header_count(section) == 1 and index.is_header_text(section)
+    assert index.string_stats(section) == (1, len('New header'))
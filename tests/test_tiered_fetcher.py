@@ -0,0 +1,147 @@
+import datetime
+import json
+
+from webScraper.page_cache import PageCache
+from webScraper.tiered_fetcher import BROWSER, CACHE, STATIC, TieredFetcher, needs_javascript
+from DomBuilder.parserBackend import parse_html
+
+ARTICLE = ('<html><body><nav>Home About Contact</nav><article><h1>Title</h1><p>'
+           + 'Plenty of server rendered text. ' * 20 + '</p></article></body></html>')
+APP_SHELL = '<html><body><div id="root">Loading</div><script src="/app.js"></script></body></html>'
+# Unusual markup, so the raw HTML and str(BeautifulSoup(...)) of it differ
+RENDERED = '<HTML><BODY><P CLASS=x>Rendered text of the page<BR></BODY></HTML>'
+
+
+class Response:
+    def __init__(self, url, status_code=200, text='', headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = {'Content-Type': 'text/html; charset=utf-8'} if headers is None else headers
+        self.elapsed = datetime.timedelta(milliseconds=5)
+
+
+class Session:
+    """Fake requests.Session serving fixed pages; records every request."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        self.requests.append((url, headers or {}))
+        page = self.pages[url]
+        return page(headers or {}) if callable(page) else Response(url, text=page)
+
+
+class Browser:
+    def __init__(self, html=RENDERED):
+        self.html = html
+        self.urls = []
+
+    def __call__(self, url):
+        self.urls.append(url)
+        return self.html
+
+
+def test_needs_javascript_ignores_text_in_removed_tags():
+    assert needs_javascript(parse_html(ARTICLE)) is None
+    assert needs_javascript(parse_html(APP_SHELL)) == 'framework_root'
+    footer_only = '<html><body><p>Hi</p><footer>' + 'Footer links and legal text. ' * 20 + '</footer></body></html>'
+    assert needs_javascript(parse_html(footer_only)) == 'too_little_text'
+
+
+def test_static_page_is_not_rendered():
+    browser = Browser()
+    fetcher = TieredFetcher(browser_fetch=browser, session=Session({'https://a.example/1': ARTICLE}))
+    result = fetcher.fetch_with_info('https://a.example/1')
+    assert (result.tier, result.status) == (STATIC, 200)
+    assert result.soup.h1.get_text() == 'Title'
+    assert browser.urls == []
+    assert fetcher.domains['a.example']['mode'] == STATIC
+
+
+def test_page_needing_javascript_is_rendered_without_sending_the_domain_to_the_browser():
+    browser = Browser()
+    session = Session({'https://a.example/app': APP_SHELL, 'https://a.example/post': ARTICLE})
+    fetcher = TieredFetcher(browser_fetch=browser, session=session)
+    result = fetcher.fetch_with_info('https://a.example/app')
+    assert (result.tier, result.reason) == (BROWSER, 'framework_root')
+    assert result.soup.p.get_text() == 'Rendered text of the page'
+    assert fetcher.fetch_with_info('https://a.example/post').tier == STATIC
+    assert browser.urls == ['https://a.example/app']
+
+
+def test_domain_goes_to_the_browser_after_repeated_failures_and_is_rechecked_later(tmp_path):
+    decisions = str(tmp_path / 'decisions.json')
+    session = Session({f'https://spa.example/{page}': APP_SHELL for page in range(5)})
+    browser = Browser()
+    fetcher = TieredFetcher(browser_fetch=browser, session=session, browser_after=3, decisions_path=decisions)
+    for page in range(3):
+        assert fetcher.fetch_with_info(f'https://spa.example/{page}').tier == BROWSER
+    assert len(session.requests) == 3
+    assert json.load(open(decisions))['spa.example']['mode'] == BROWSER
+
+    # Sent to the browser: no static request any more
+    assert fetcher.fetch_with_info('https://spa.example/3').tier == BROWSER
+    assert len(session.requests) == 3
+
+    # A restarted fetcher keeps the decision until recheck_after has passed
+    restarted = TieredFetcher(browser_fetch=browser, session=session, decisions_path=decisions, recheck_after=60)
+    restarted.fetch_with_info('https://spa.example/3')
+    assert len(session.requests) == 3
+    restarted.domains['spa.example']['since'] -= 61
+    restarted.fetch_with_info('https://spa.example/4')
+    assert len(session.requests) == 4
+
+
+def test_success_in_between_resets_the_failure_count():
+    pages = {'https://a.example/app1': APP_SHELL, 'https://a.example/app2': APP_SHELL, 'https://a.example/post': ARTICLE}
+    fetcher = TieredFetcher(browser_fetch=Browser(), session=Session(pages), browser_after=2)
+    fetcher.fetch_with_info('https://a.example/app1')
+    fetcher.fetch_with_info('https://a.example/post')
+    fetcher.fetch_with_info('https://a.example/app2')
+    assert fetcher.domains['a.example']['mode'] == STATIC
+    assert fetcher.domains['a.example']['failures'] == 1
+
+
+def test_forbidden_pages_count_towards_the_browser():
+    forbidden = lambda headers: Response('https://guarded.example/', 403)
+    session = Session({f'https://guarded.example/{page}': forbidden for page in range(2)})
+    fetcher = TieredFetcher(browser_fetch=Browser(), session=session, browser_after=2)
+    assert fetcher.fetch_with_info('https://guarded.example/0').reason == 'http_403'
+    assert fetcher.domains['guarded.example']['mode'] is None
+    fetcher.fetch_with_info('https://guarded.example/1')
+    assert fetcher.domains['guarded.example']['mode'] == BROWSER
+
+
+def test_rendered_pages_are_cached_as_raw_html(tmp_path):
+    cache = PageCache(str(tmp_path), probe_validators=False)
+    browser = Browser()
+    fetcher = TieredFetcher(browser_fetch=browser, session=Session({'https://spa.example/': APP_SHELL}), cache=cache)
+    fetcher.fetch_with_info('https://spa.example/')
+    assert cache.get('https://spa.example/') == RENDERED
+
+    result = fetcher.fetch_with_info('https://spa.example/')
+    assert result.tier == CACHE
+    assert browser.urls == ['https://spa.example/']
+
+
+def test_static_pages_are_cached_and_revalidated(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=0, probe_validators=False)
+
+    def page(headers):
+        if headers.get('If-None-Match') == '"v1"':
+            return Response('https://a.example/', 304, headers={})
+        return Response('https://a.example/', text=ARTICLE, headers={'Content-Type': 'text/html', 'ETag': '"v1"'})
+
+    session = Session({'https://a.example/': page})
+    fetcher = TieredFetcher(browser_fetch=Browser(), session=session, cache=cache)
+    assert fetcher.fetch_with_info('https://a.example/').tier == STATIC
+    assert cache.read(cache.lookup('https://a.example/')) == ARTICLE
+
+    # The entry is stale at once (ttl=0), so it is revalidated with its ETag
+    result = fetcher.fetch_with_info('https://a.example/')
+    assert (result.tier, result.reason, result.status) == (CACHE, 'not_modified', 304)
+    assert session.requests[-1][1] == {'If-None-Match': '"v1"'}
+    assert result.soup.h1.get_text() == 'Title'